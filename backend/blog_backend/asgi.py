@@ -3,6 +3,10 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served by an ASGI server (e.g. ``uvicorn blog_backend.asgi:application``), the
+streamed AI suggestions (posts/streaming.py) are relayed on the event loop and
+hold no worker thread while the model is generating.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.server_timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -49,6 +50,12 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'blog_backend.urls'
 
+# En-tête Server-Timing et détection des N+1 (voir utils/server_timing.py) ;
+# l'en-tête de requête `X-Server-Timing: 0|1` prime sur SERVER_TIMING_ENABLED ;
+# l'en-tête de réponse n'est renvoyé qu'en DEBUG ou au staff
+SERVER_TIMING_ENABLED = config('SERVER_TIMING_ENABLED', default=True, cast=bool)
+SERVER_TIMING_N_PLUS_ONE_THRESHOLD = config('SERVER_TIMING_N_PLUS_ONE_THRESHOLD', default=10, cast=int)
+
 AUTH_USER_MODEL = 'users.User'
 
 TEMPLATES = [
@@ -69,6 +76,19 @@ TEMPLATES = [
 
 OPENROUTER_API_KEY = config('OPENROUTER_API_KEY')
 
+# Suggestions IA en arrière-plan (voir posts/jobs.py) : thread, external ou inline
+SUGGESTION_WORKER_MODE = config('SUGGESTION_WORKER_MODE', default='thread')
+SUGGESTION_WORKERS = config('SUGGESTION_WORKERS', default=4, cast=int)
+SUGGESTION_RECOVERY_INTERVAL = config('SUGGESTION_RECOVERY_INTERVAL', default=60, cast=int)  # mode thread
+
+# Garde-fous des appels sortants vers l'IA (voir posts/limits.py)
+AI_MAX_CONCURRENT_CALLS = config('AI_MAX_CONCURRENT_CALLS', default=4, cast=int)
+AI_QUEUE_TIMEOUT = config('AI_QUEUE_TIMEOUT', default=10, cast=float)
+AI_DAILY_TOKEN_BUDGET = config('AI_DAILY_TOKEN_BUDGET', default=50000, cast=int)  # par utilisateur, 0 = illimité
+AI_BREAKER_THRESHOLD = config('AI_BREAKER_THRESHOLD', default=5, cast=int)
+AI_BREAKER_WINDOW = config('AI_BREAKER_WINDOW', default=60, cast=int)
+AI_BREAKER_COOLDOWN = config('AI_BREAKER_COOLDOWN', default=30, cast=int)
+
 # Configuration PostgreSQL
 DATABASE_URL = config("DATABASE_URL", default=None)
 
@@ -92,7 +112,7 @@ else:
 # Configuration REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -108,6 +128,9 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Durée de vie de l'utilisateur authentifié en cache (voir users/authentication.py)
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=60, cast=int)
+
 # Configuration email
 EMAIL_BACKEND = 'utils.custom_email_backend.CustomEmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -117,6 +140,14 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 EMAIL_SSL_CONTEXT = ssl._create_unverified_context()
 
+# File d'envoi des emails (voir users/outbox.py) : thread, external ou inline
+EMAIL_OUTBOX_MODE = config('EMAIL_OUTBOX_MODE', default='thread')
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)  # doublé à chaque échec
+EMAIL_OUTBOX_POLL_INTERVAL = config('EMAIL_OUTBOX_POLL_INTERVAL', default=60, cast=int)  # mode thread
+EMAIL_OUTBOX_RETENTION = config('EMAIL_OUTBOX_RETENTION', default=7*24*60*60, cast=int)
+
 # Configuration CORS
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
@@ -196,6 +227,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'utils': {
+            'handlers': ['console'] if not DEBUG else ['posts_file'],
+            'level': 'WARNING',
+            'propagate': True,
+        },
     },
 }
 
@@ -203,6 +239,10 @@ LOGGING = {
 USE_REDIS = config('USE_REDIS', default=False, cast=bool)
 REDIS_URL = config('REDIS_URL', default='redis://127.0.0.1:6379/1')
 
+# Réécritures IA mémorisées par empreinte du contenu (voir posts/ai.py)
+SUGGESTION_CACHE_TIMEOUT = config('SUGGESTION_CACHE_TIMEOUT', default=7*24*60*60, cast=int)
+SUGGESTION_CACHE_MAX_ENTRIES = config('SUGGESTION_CACHE_MAX_ENTRIES', default=1000, cast=int)
+
 if USE_REDIS:
     CACHES = {
     'default': {
@@ -211,15 +251,40 @@ if USE_REDIS:
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         }
-     }
+     },
+    'suggestions': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'suggestions',
+        'TIMEOUT': SUGGESTION_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        }
+     },
   } 
 else:
     CACHES = {
         "default": {
             "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        }
+        },
+        "suggestions": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "suggestions",
+            "TIMEOUT": SUGGESTION_CACHE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": SUGGESTION_CACHE_MAX_ENTRIES},
+        },
     }
 
+# Durée de vie des réponses publiques mises en cache (invalidées par version, voir posts/cache.py)
+POSTS_CACHE_TIMEOUT = config('POSTS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Site public, pour les liens des flux de syndication (voir posts/feeds.py)
+FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:5173')
+
+# Sitemaps pré-rendus par `manage.py render_sitemaps`, servis par les vues de
+# posts/sitemaps.py (qui les produisent à la demande sans pré-rendu)
+SITEMAP_ROOT = config('SITEMAP_ROOT', default='')
+
 
 # Autres
 LANGUAGE_CODE = 'fr-fr'
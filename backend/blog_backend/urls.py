@@ -5,4 +5,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('users.urls')),
     path('api/posts/', include('posts.urls')),
+    path('', include('posts.feed_urls')),
+    path('', include('posts.sitemap_urls')),
 ]
\ No newline at end of file
@@ -0,0 +1,31 @@
+# Configuration gunicorn, lue automatiquement depuis le répertoire de lancement (voir Procfile).
+import os
+import sys
+
+# AI_WARMUP=False pour désactiver le préchargement
+AI_WARMUP = os.environ.get('AI_WARMUP', 'True').lower() not in ('false', '0', 'no')
+
+
+def on_starting(server):
+    """Charge les tables BPE de tiktoken dans le master : les workers forkés en héritent."""
+    if not AI_WARMUP:
+        return
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_backend.settings')
+    try:
+        from posts.ai import warm_up
+        elapsed = warm_up()
+    except Exception as exc:
+        # Sans réseau ni cache tiktoken : chargement différé au premier appel
+        server.log.warning(f"Préchargement de tiktoken impossible : {exc}")
+        return
+    if elapsed is not None:
+        server.log.info(f"tiktoken préchargé en {elapsed * 1000:.1f} ms")
+
+
+def post_worker_init(worker):
+    """Files en mode thread : reprend le travail laissé par un worker arrêté et draine périodiquement."""
+    from posts import jobs
+    from users import outbox
+    outbox.start()
+    jobs.start()
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Post, Comment, Reaction
+from .models import Post, Comment, Reaction, SuggestionJob, AuthorStats
+from . import search
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -8,6 +9,14 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('title', 'content')
     ordering = ('-published_at',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Sous PostgreSQL, l'index GIN remplace le icontains sur title/content
+        if search_term and search.uses_postgres():
+            from django.contrib.postgres.search import SearchQuery
+            query = SearchQuery(search_term, config=search.SEARCH_CONFIG, search_type='websearch')
+            return queryset.filter(search_vector=query), False
+        return super().get_search_results(request, queryset, search_term)
+
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('post', 'author', 'created_at')
@@ -19,4 +28,15 @@ class CommentAdmin(admin.ModelAdmin):
 class ReactionAdmin(admin.ModelAdmin):
     list_display = ('post', 'user', 'emoji', 'created_at')
     list_filter = ('emoji', 'created_at')
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+
+@admin.register(SuggestionJob)
+class SuggestionJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'post', 'user', 'status', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    ordering = ('-created_at',)
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ('author', 'post_count', 'comment_count', 'last_published_at', 'refreshed_at')
+    ordering = ('-post_count',)
@@ -0,0 +1,278 @@
+"""
+Appels à l'IA de réécriture (Deepseek via OpenRouter), partagés par les vues
+et le worker des suggestions (voir posts/jobs.py).
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+
+from . import limits, metrics
+
+logger = logging.getLogger('posts')
+
+# Limites de tokens pour réduire les coûts
+MAX_INPUT_TOKENS = 3000
+MAX_RESPONSE_TOKENS = 500
+ENCODING_NAME = "cl100k_base"
+
+MODEL_NAME = "deepseek/deepseek-r1-0528:free"
+PROMPT_TEMPLATE = (
+    "Réécris ce paragraphe en français, de manière fluide et enrichie, "
+    "prêt à être publié. Ne renvoie que le texte, sans balises, sans code, "
+    "sans explications :\n\n"
+    "{text}"
+)
+SAMPLING_PARAMS = {
+    "max_tokens": MAX_RESPONSE_TOKENS,
+    "temperature": 0.5,
+    "top_p": 1.0,
+    "frequency_penalty": 0.0,
+    "presence_penalty": 0.0,
+}
+REQUEST_TIMEOUT = 60
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+CLIENT_TIMEOUT = 30
+
+# tiktoken et openai sont lourds à importer : ils ne le sont qu'au premier appel,
+# pas au démarrage des workers ni des commandes manage.py.
+# Encodeur et clients sont créés une seule fois par processus, puis réutilisés
+# (le pool de connexions HTTP du client aussi).
+_init_lock = threading.Lock()
+_encoding = None
+_client = None
+_async_client = None
+
+# Durées mesurées (voir posts/metrics.py et GET /api/posts/suggestions/metrics/)
+TIMING_METRICS = ('ai.encoding_load', 'ai.client_init', 'ai.truncate', 'ai.queue_wait', 'ai.completion')
+
+
+def _load_encoding():
+    global _encoding
+    if _encoding is None:
+        with _init_lock:
+            if _encoding is None:
+                import tiktoken
+                start = time.perf_counter()
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                elapsed = time.perf_counter() - start
+                logger.info(f"Encodeur {ENCODING_NAME} chargé en {elapsed * 1000:.1f} ms")
+                return _encoding, elapsed
+    return _encoding, None
+
+
+def get_encoding():
+    encoding, elapsed = _load_encoding()
+    if elapsed is not None:
+        metrics.record_duration('ai.encoding_load', elapsed)
+    return encoding
+
+
+def _client_kwargs():
+    return {"base_url": OPENROUTER_BASE_URL, "api_key": settings.OPENROUTER_API_KEY, "timeout": CLIENT_TIMEOUT}
+
+
+def get_client():
+    """Client OpenAI (Deepseek via OpenRouter) partagé par les threads du processus."""
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                start = time.perf_counter()
+                from openai import OpenAI
+                _client = OpenAI(**_client_kwargs())
+                metrics.record_duration('ai.client_init', time.perf_counter() - start)
+    return _client
+
+
+def get_async_client():
+    """Client asynchrone pour le streaming servi par l'application ASGI (voir posts/streaming.py)."""
+    global _async_client
+    if _async_client is None:
+        with _init_lock:
+            if _async_client is None:
+                start = time.perf_counter()
+                from openai import AsyncOpenAI
+                _async_client = AsyncOpenAI(**_client_kwargs())
+                metrics.record_duration('ai.client_init', time.perf_counter() - start)
+    return _async_client
+
+
+def warm_up():
+    """
+    Charge les tables BPE de tiktoken. Appelée dans le master gunicorn avant le fork
+    (voir gunicorn.conf.py) : les workers en héritent sans les relire.
+    Renvoie la durée du chargement en secondes, None si elles l'étaient déjà.
+    """
+    return _load_encoding()[1]
+
+
+class EmptyCompletionError(Exception):
+    """Le modèle a répondu sans texte."""
+
+
+@lru_cache(maxsize=64)
+def truncate_text(text: str, max_tokens: int) -> str:
+    """
+    Tronque le texte pour qu'il ne dépasse pas max_tokens.
+    Mémorisé : la clé de cache et le prompt d'une même demande tronquent le même texte.
+    """
+    with metrics.timed('ai.truncate'):
+        encoding = get_encoding()
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        truncated = encoding.decode(tokens[:max_tokens])
+    logger.info(f"Texte tronqué de {len(tokens)} à {max_tokens} tokens pour optimiser les coûts.")
+    return truncated
+
+
+@lru_cache(maxsize=64)
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+def build_prompt(text: str) -> str:
+    # Tronquer pour limiter la consommation de tokens
+    return PROMPT_TEMPLATE.format(text=truncate_text(text, MAX_INPUT_TOKENS))
+
+
+def suggestion_cache_key(text: str) -> str:
+    """Empreinte de tout ce qui détermine la réponse : texte tronqué, prompt, modèle, paramètres."""
+    payload = json.dumps(
+        {
+            "text": truncate_text(text, MAX_INPUT_TOKENS),
+            "prompt": PROMPT_TEMPLATE,
+            "model": MODEL_NAME,
+            "params": SAMPLING_PARAMS,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return f"rewrite:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def get_cached_rewrite(key):
+    cached = caches['suggestions'].get(key)
+    if cached is not None:
+        _touch(key)
+    return cached
+
+
+def store_rewrite(key, rewritten):
+    caches['suggestions'].set(key, rewritten)
+    _touch(key)
+
+
+def _touch(key):
+    """
+    Borne le nombre d'entrées sous Redis (LRU via un sorted set d'horodatages).
+    En mémoire locale, MAX_ENTRIES du cache `suggestions` s'en charge déjà.
+    """
+    suggestion_cache = caches['suggestions']
+    if not suggestion_cache.__class__.__module__.startswith('django_redis'):
+        return
+    from django_redis import get_redis_connection
+    conn = get_redis_connection('suggestions')
+    index = suggestion_cache.make_key('rewrite-index')
+    conn.zadd(index, {suggestion_cache.make_key(key): time.time()})
+    overflow = conn.zcard(index) - settings.SUGGESTION_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        evicted = conn.zrange(index, 0, overflow - 1)
+        conn.delete(*evicted)
+        conn.zrem(index, *evicted)
+
+
+def completion_kwargs(text: str, **extra) -> dict:
+    """Paramètres communs à l'appel bloquant et au streaming (même prompt, même budget)."""
+    return {
+        "model": MODEL_NAME,
+        "prompt": build_prompt(text),
+        "timeout": REQUEST_TIMEOUT,
+        **SAMPLING_PARAMS,
+        **extra,
+    }
+
+
+def rewrite(text: str, user_id=None) -> str:
+    """
+    Renvoie le texte réécrit. Lève les exceptions du client OpenAI,
+    EmptyCompletionError ou celles de posts/limits.py (limiteur, budget,
+    disjoncteur) ; `error_response` les traduit en réponse HTTP.
+    """
+    kwargs = completion_kwargs(text)
+    prompt_tokens = count_tokens(kwargs["prompt"])
+    limits.admit(user_id, prompt_tokens, MAX_RESPONSE_TOKENS)
+    try:
+        with metrics.timed('ai.completion'):
+            response = get_client().completions.create(**kwargs)
+    except Exception as exc:
+        limits.record_failure(exc)
+        raise
+    finally:
+        limits.release_slot()
+    limits.record_success()
+    rewritten = (response.choices[0].text or "").strip()
+    limits.charge(user_id, prompt_tokens + count_tokens(rewritten))
+    if not rewritten:
+        raise EmptyCompletionError()
+    return rewritten
+
+
+def rewrite_cached(text: str, user_id=None):
+    """Comme `rewrite`, mais mémorisé par empreinte. Renvoie (texte réécrit, trouvé en cache)."""
+    key = suggestion_cache_key(text)
+    cached = get_cached_rewrite(key)
+    if cached is not None:
+        return cached, True
+    rewritten = rewrite(text, user_id)
+    store_rewrite(key, rewritten)
+    return rewritten, False
+
+
+def error_response(exc):
+    """
+    Traduit une erreur d'appel IA en (statut HTTP, corps, en-têtes).
+    APITimeoutError est testée avant APIError, dont elle hérite.
+    """
+    from openai import OpenAIError, RateLimitError, APIError, APITimeoutError
+    if isinstance(exc, limits.AIUnavailableError):
+        retry_after = str(exc.retry_after)
+        if isinstance(exc, limits.TokenBudgetExceeded):
+            logger.warning("Budget quotidien de tokens IA épuisé")
+            code, message = status.HTTP_429_TOO_MANY_REQUESTS, "Budget quotidien de tokens IA épuisé"
+        elif isinstance(exc, limits.CircuitOpenError):
+            code, message = status.HTTP_503_SERVICE_UNAVAILABLE, "Service IA suspendu après des erreurs répétées"
+        else:
+            logger.warning("Trop d'appels IA simultanés")
+            code, message = status.HTTP_503_SERVICE_UNAVAILABLE, "Trop de demandes IA en cours"
+        return code, {"error": message, "retry_after": retry_after}, {"Retry-After": retry_after}
+    if isinstance(exc, RateLimitError):
+        retry_after = exc.response.headers.get("Retry-After", "60")
+        logger.warning(f"Rate limit atteint, retry_after={retry_after}s")
+        return (
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            {"error": "Limite de débit atteinte", "retry_after": retry_after},
+            {"Retry-After": retry_after},
+        )
+    if isinstance(exc, EmptyCompletionError):
+        logger.error("Deepseek a renvoyé un texte vide")
+        return status.HTTP_502_BAD_GATEWAY, {"error": "Réponse IA vide"}, {}
+    if isinstance(exc, APITimeoutError):
+        logger.error(f"Timeout IA : {exc}")
+        return status.HTTP_504_GATEWAY_TIMEOUT, {"error": "Le service IA a mis trop de temps à répondre"}, {}
+    if isinstance(exc, APIError):
+        logger.error(f"Erreur API Deepseek : {exc}")
+        return status.HTTP_502_BAD_GATEWAY, {"error": "Service IA temporairement indisponible"}, {}
+    if isinstance(exc, OpenAIError):
+        logger.exception(f"OpenAIError : {exc}")
+        return status.HTTP_500_INTERNAL_SERVER_ERROR, {"error": "Erreur interne IA"}, {}
+    logger.exception(f"Erreur inattendue : {exc}")
+    return status.HTTP_500_INTERNAL_SERVER_ERROR, {"error": "Erreur serveur inattendue"}, {}
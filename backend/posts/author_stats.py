@@ -0,0 +1,94 @@
+"""
+Maintenance des agrégats de `AuthorStats` (page auteur).
+
+Les compteurs de commentaires et de réactions suivent ceux des posts : chaque
+vue qui incrémente un compteur de post incrémente aussi celui de son auteur
+(`increment`). Nombre de posts et date de dernière publication sont recalculés
+par `refresh` à partir des compteurs stockés des posts : une seule requête
+groupée par `author_id`, sans parcourir commentaires ni réactions.
+
+Seuls les auteurs qui ont des posts ont une ligne. Une lecture n'écrit jamais :
+pour un auteur sans ligne, `get` calcule les statistiques sans les enregistrer,
+et une publication programmée qui arrive dans le fil pendant un GET n'est
+reportée dans les statistiques qu'au prochain `manage.py refresh_author_stats`.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Coalesce
+
+from users.models import User
+
+from .models import AuthorStats, Post, counter_fields
+
+STATS_FIELDS = ['post_count', *counter_fields(), 'last_published_at']
+
+
+def compute(author_ids):
+    """{author_id: {champ: valeur}} recalculés depuis les posts publiés."""
+    aggregates = {field: Coalesce(Sum(field), 0) for field in counter_fields()}
+    rows = (
+        Post.objects.published()
+        .filter(author_id__in=author_ids)
+        .order_by()
+        .values('author_id')
+        .annotate(post_count=Count('id'), last_published_at=Max('published_at'), **aggregates)
+    )
+    empty = {field: 0 for field in STATS_FIELDS}
+    empty['last_published_at'] = None
+    stats = {author_id: dict(empty) for author_id in author_ids}
+    for row in rows:
+        stats[row.pop('author_id')] = row
+    return stats
+
+
+def refresh(author_ids, check_authors=True):
+    """Recalcule et enregistre les statistiques de ces auteurs (upsert par lot)."""
+    author_ids = list(author_ids)
+    if check_authors:
+        # Un auteur supprimé entre-temps (cascade sur ses posts) n'a plus de ligne à tenir
+        author_ids = list(User.objects.filter(pk__in=author_ids).values_list('pk', flat=True))
+    if not author_ids:
+        return 0
+    stats = compute(author_ids)
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(author_id=author_id, **values) for author_id, values in stats.items()],
+        update_conflicts=True,
+        unique_fields=['author'],
+        update_fields=[*STATS_FIELDS, 'refreshed_at'],
+    )
+    return len(stats)
+
+
+def refresh_all(batch_size=1000):
+    """
+    Recalcule les auteurs qui ont des posts, par lots d'ids ; renvoie leur nombre.
+    Les lignes des auteurs qui n'en ont plus aucun sont supprimées.
+    """
+    AuthorStats.objects.exclude(author__in=Post.objects.values('author_id')).delete()
+    authors = Post.objects.order_by('author_id').values_list('author_id', flat=True).distinct()
+    refreshed = last_id = 0
+    while True:
+        ids = list(authors.filter(author_id__gt=last_id)[:batch_size])
+        if not ids:
+            return refreshed
+        last_id = ids[-1]
+        refreshed += refresh(ids)
+
+
+def refresh_after_commit(author_id, check_author=True):
+    transaction.on_commit(lambda: refresh([author_id], check_authors=check_author))
+
+
+def increment(author_id, field, delta=1):
+    """Suit un `Post.increment_counter` ; crée la ligne de l'auteur si elle manque."""
+    updated = AuthorStats.objects.filter(pk=author_id).update(**{field: F(field) + delta})
+    if not updated:
+        refresh([author_id])
+
+
+def get(author_id):
+    """Statistiques stockées de l'auteur ; calculées sans être enregistrées si absentes."""
+    stats = AuthorStats.objects.filter(pk=author_id).first()
+    if stats is None:
+        stats = AuthorStats(author_id=author_id, **compute([author_id])[author_id])
+    return stats
@@ -0,0 +1,275 @@
+"""
+Banc de mesure des endpoints (voir `manage.py benchmark_routes`).
+
+Chaque route nommée de posts/urls.py, posts/feed_urls.py, posts/sitemap_urls.py et
+users/urls.py a un scénario : une requête rejouée via le client de test sur un jeu
+de données synthétique (users/seeding.py). Pour chaque route on relève la latence
+(p50/p95), le nombre de requêtes SQL et la taille de la réponse, puis on compare
+aux budgets de ROUTE_BUDGETS.
+
+Le budget de requêtes ne dépend pas de la taille du jeu de données : une route
+dont le nombre de requêtes grandit avec les données (N+1) le dépasse dès le
+deuxième palier. Le cache des réponses est vidé avant chaque requête : on mesure
+le chemin froid, celui qui touche la base.
+"""
+import statistics
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.core.cache import cache, caches
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from posts import ai, author_stats, timeline
+from posts.models import Post, SuggestionJob, Tag
+from users.models import PasswordResetToken, User
+
+BENCHMARK_TEXT = "Texte de référence pour le banc de mesure."
+BENCHMARK_PASSWORD = "Password123!"
+# Modules d'URL dont chaque route nommée doit avoir un scénario
+URL_MODULES = ("posts.urls", "posts.feed_urls", "posts.sitemap_urls", "users.urls")
+
+# Budgets par route : (requêtes SQL max, p95 max en ms)
+ROUTE_BUDGETS = {
+    "post-suggestions": (4, 250),
+    "post-suggestions-stream": (3, 250),
+    "post-suggestion-job": (3, 250),
+    "suggestion_metrics": (2, 250),
+    "post_list": (3, 250),
+    "post_search": (3, 500),
+    "post_detail": (5, 250),
+    # Tags écrits en un nombre fixe de requêtes, quel que soit leur nombre ;
+    # statistiques auteur recalculées au commit (agrégat et upsert)
+    "post_create": (17, 500),
+    "post_update": (20, 500),
+    "comment_list": (3, 250),
+    "comment_create": (9, 250),
+    "reaction_toggle": (13, 500),
+    "about_author": (4, 250),
+    "tag_list": (2, 250),
+    "cache_stats": (2, 250),
+    # Flux : objet de l'URL, posts et tags préchargés
+    "feed_rss": (2, 250),
+    "feed_atom": (2, 250),
+    "feed_json": (2, 250),
+    "tag_feed_rss": (3, 250),
+    "tag_feed_atom": (3, 250),
+    "tag_feed_json": (3, 250),
+    "author_feed_rss": (3, 250),
+    "author_feed_atom": (3, 250),
+    "author_feed_json": (3, 250),
+    # Sitemaps en flux : une requête groupée pour l'index, existence puis curseur pour un fichier
+    "sitemap_index": (1, 250),
+    "sitemap_posts": (2, 500),
+    # Hachage PBKDF2 du mot de passe : plusieurs centaines de ms par conception
+    "register": (6, 1500),
+    "login": (3, 1500),
+    "token_refresh": (10, 250),
+    "logout": (8, 250),
+    "password_reset_request": (4, 250),
+    "password_reset_confirm": (5, 1500),
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    url: Callable
+    expected_status: int = 200
+    auth: bool = False
+    data: Optional[Callable] = None
+    # Préparation hors chronométrage, renvoie des kwargs pour le client (cookies...)
+    prepare: Optional[Callable] = None
+
+
+class Context:
+    """Objets de référence pour les scénarios, choisis dans le pire cas (post le plus commenté...)."""
+
+    def __init__(self):
+        self.admin = User.objects.create_superuser(
+            f"bench_{uuid.uuid4().hex[:8]}", f"bench_{uuid.uuid4().hex[:8]}@example.com", BENCHMARK_PASSWORD
+        )
+        self.token = str(RefreshToken.for_user(self.admin).access_token)
+        self.own_post = Post.objects.create(title="Banc de mesure", content=BENCHMARK_TEXT, author=self.admin)
+        self.post = Post.objects.published().exclude(pk=self.own_post.pk).order_by("-comment_count").first()
+        self.post = self.post or self.own_post
+        # Auteur le plus prolifique : la page la plus chargée en statistiques et en posts
+        self.top_author_id = (
+            User.objects.annotate(n=Count("posts")).order_by("-n").values_list("pk", flat=True).first()
+        )
+        # Statistiques déjà tenues à jour, comme après le commit des posts en production
+        author_stats.refresh([self.top_author_id])
+        # Tag le plus utilisé : le flux par tag le plus rempli
+        self.tag = Tag.objects.annotate(n=Count("posts")).order_by("-n").first()
+        if self.tag is None:
+            self.tag = Tag.objects.create(name="Banc de mesure")
+            self.own_post.tags.add(self.tag)
+        self.job = SuggestionJob.objects.create(post=self.own_post, user=self.admin, text=BENCHMARK_TEXT)
+        # Réécriture déjà en cache : aucun appel à l'IA pendant la mesure
+        caches["suggestions"].set(ai.suggestion_cache_key(BENCHMARK_TEXT), BENCHMARK_TEXT)
+
+    def unique(self):
+        return uuid.uuid4().hex[:12]
+
+    def refresh_cookie(self):
+        return {"refresh_token": str(RefreshToken.for_user(self.admin))}
+
+    def reset_token(self):
+        return PasswordResetToken.objects.create(user=self.admin).token
+
+
+def scenarios():
+    return [
+        Scenario("post_list", "get", lambda c: reverse("post_list")),
+        Scenario("post_search", "get", lambda c: reverse("post_search") + "?q=performance"),
+        Scenario("post_detail", "get", lambda c: reverse("post_detail", args=[c.post.pk])),
+        Scenario("comment_list", "get", lambda c: reverse("comment_list", args=[c.post.pk])),
+        Scenario("about_author", "get", lambda c: reverse("about_author", args=[c.top_author_id])),
+        Scenario("tag_list", "get", lambda c: reverse("tag_list")),
+        Scenario("feed_rss", "get", lambda c: reverse("feed_rss")),
+        Scenario("feed_atom", "get", lambda c: reverse("feed_atom")),
+        Scenario("feed_json", "get", lambda c: reverse("feed_json")),
+        Scenario("tag_feed_rss", "get", lambda c: reverse("tag_feed_rss", args=[c.tag.slug])),
+        Scenario("tag_feed_atom", "get", lambda c: reverse("tag_feed_atom", args=[c.tag.slug])),
+        Scenario("tag_feed_json", "get", lambda c: reverse("tag_feed_json", args=[c.tag.slug])),
+        Scenario("author_feed_rss", "get", lambda c: reverse("author_feed_rss", args=[c.top_author_id])),
+        Scenario("author_feed_atom", "get", lambda c: reverse("author_feed_atom", args=[c.top_author_id])),
+        Scenario("author_feed_json", "get", lambda c: reverse("author_feed_json", args=[c.top_author_id])),
+        Scenario("sitemap_index", "get", lambda c: reverse("sitemap_index")),
+        Scenario("sitemap_posts", "get", lambda c: reverse("sitemap_posts", args=[0])),
+        Scenario("cache_stats", "get", lambda c: reverse("cache_stats"), auth=True),
+        Scenario("suggestion_metrics", "get", lambda c: reverse("suggestion_metrics"), auth=True),
+        Scenario(
+            "post_create", "post", lambda c: reverse("post_create"), expected_status=201, auth=True,
+            data=lambda c: {"title": f"Post {c.unique()}", "content": BENCHMARK_TEXT,
+                            "tag_names": ["Django", "Data", c.unique()]},
+        ),
+        Scenario(
+            "post_update", "put", lambda c: reverse("post_update", args=[c.own_post.pk]), auth=True,
+            data=lambda c: {"title": f"Post {c.unique()}", "tag_names": ["Django", c.unique()]},
+        ),
+        Scenario(
+            "comment_create", "post", lambda c: reverse("comment_create", args=[c.post.pk]),
+            expected_status=201, auth=True, data=lambda c: {"content": "Commentaire de mesure"},
+        ),
+        Scenario(
+            "reaction_toggle", "post", lambda c: reverse("reaction_toggle", args=[c.post.pk, "LIKE"]), auth=True,
+        ),
+        Scenario(
+            "post-suggestions", "post", lambda c: reverse("post-suggestions", args=[c.own_post.pk]), auth=True,
+            data=lambda c: {"text": BENCHMARK_TEXT},
+        ),
+        Scenario(
+            "post-suggestions-stream", "post", lambda c: reverse("post-suggestions-stream", args=[c.own_post.pk]),
+            auth=True, data=lambda c: {"text": BENCHMARK_TEXT},
+        ),
+        Scenario(
+            "post-suggestion-job", "get", lambda c: reverse("post-suggestion-job", args=[c.own_post.pk, c.job.pk]),
+            auth=True,
+        ),
+        Scenario(
+            "register", "post", lambda c: reverse("register"), expected_status=201,
+            data=lambda c: {"username": f"u{c.unique()}", "email": f"{c.unique()}@example.com",
+                            "password": BENCHMARK_PASSWORD},
+        ),
+        Scenario(
+            "login", "post", lambda c: reverse("login"),
+            data=lambda c: {"username": c.admin.username, "password": BENCHMARK_PASSWORD},
+        ),
+        Scenario(
+            "token_refresh", "post", lambda c: reverse("token_refresh"),
+            prepare=lambda c: {"cookies": c.refresh_cookie()},
+        ),
+        Scenario(
+            "logout", "post", lambda c: reverse("logout"), expected_status=205,
+            prepare=lambda c: {"cookies": c.refresh_cookie()},
+        ),
+        Scenario(
+            "password_reset_request", "post", lambda c: reverse("password_reset_request"),
+            data=lambda c: {"email": c.admin.email},
+        ),
+        Scenario(
+            "password_reset_confirm", "post", None,
+            prepare=lambda c: {"url": reverse("password_reset_confirm", args=[c.reset_token()])},
+            data=lambda c: {"password": BENCHMARK_PASSWORD},
+        ),
+    ]
+
+
+def uncovered_routes():
+    """Routes nommées de URL_MODULES sans scénario : le banc doit les couvrir toutes."""
+    names = set()
+    for pattern in get_resolver().url_patterns:
+        module = getattr(pattern, "urlconf_name", None)
+        if getattr(module, "__name__", None) in URL_MODULES:
+            names.update(p.name for p in module.urlpatterns if p.name)
+    return sorted(names - {s.name for s in scenarios()})
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def run_scenario(scenario, ctx, iterations, budget):
+    client = Client()
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {ctx.token}"} if scenario.auth else {}
+    timings, queries, sizes, statuses = [], [], [], set()
+    for _ in range(iterations):
+        extra = scenario.prepare(ctx) if scenario.prepare else {}
+        client.cookies.clear()
+        for name, value in extra.get("cookies", {}).items():
+            client.cookies[name] = value
+        url = extra.get("url") or scenario.url(ctx)
+        kwargs = dict(headers)
+        if scenario.data:
+            kwargs.update(data=scenario.data(ctx), content_type="application/json")
+        cache.clear()
+        # Le cache vidé emporte l'index du fil : il est reconstruit une fois en production, pas à chaque requête
+        timeline.ensure_built()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, scenario.method)(url, **kwargs)
+            body = b"".join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - start
+        timings.append(elapsed * 1000)
+        queries.append(len(captured.captured_queries))
+        sizes.append(len(body))
+        statuses.add(response.status_code)
+
+    max_queries, max_p95 = budget
+    result = {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "queries": max(queries),
+        "bytes": max(sizes),
+        "statuses": sorted(statuses),
+        "budget": {"queries": max_queries, "p95_ms": max_p95},
+    }
+    violations = []
+    if statuses != {scenario.expected_status}:
+        violations.append(f"status {sorted(statuses)} != {scenario.expected_status}")
+    if result["queries"] > max_queries:
+        violations.append(f"{result['queries']} queries > {max_queries}")
+    if result["p95_ms"] > max_p95:
+        violations.append(f"p95 {result['p95_ms']} ms > {max_p95} ms")
+    result["violations"] = violations
+    return result
+
+
+def run(iterations, budgets=None, only=None):
+    """Mesure les routes sur les données en base ; renvoie {route: résultat}."""
+    budgets = {**ROUTE_BUDGETS, **(budgets or {})}
+    ctx = Context()
+    return {
+        scenario.name: run_scenario(scenario, ctx, iterations, budgets[scenario.name])
+        for scenario in scenarios()
+        if not only or scenario.name in only
+    }
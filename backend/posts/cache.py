@@ -0,0 +1,111 @@
+"""
+Cache des réponses des endpoints publics en lecture.
+
+Chaque réponse est stockée sous une clé qui contient l'URL normalisée et les
+numéros de version des portées dont elle dépend (`global`, `tags`,
+`post:<id>`, `author:<id>`). Les signaux d'écriture (voir posts/signals.py)
+incrémentent ces versions : les anciennes entrées deviennent inaccessibles et
+expirent d'elles-mêmes, sans jamais parcourir les clés.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+KEY_PREFIX = 'posts'
+STATS_KEYS = {
+    'hits': f'{KEY_PREFIX}:stats:hits',
+    'misses': f'{KEY_PREFIX}:stats:misses',
+}
+
+
+def _version_key(scope):
+    return f'{KEY_PREFIX}:v:{scope}'
+
+
+def _initial_version():
+    # Une version évincée ne doit jamais retomber sur une valeur déjà utilisée
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Invalide en O(1) toutes les réponses qui dépendent de ces portées."""
+    now = timezone.now()
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+        cache.set(f'{key}:at', now, None)
+
+
+def last_bumped(scope):
+    """Date de la dernière écriture connue sur cette portée (None si inconnue)."""
+    return cache.get(f'{_version_key(scope)}:at')
+
+
+def _count(name):
+    try:
+        cache.incr(STATS_KEYS[name])
+    except ValueError:
+        cache.add(STATS_KEYS[name], 1, None)
+
+
+def cache_stats():
+    values = cache.get_many(list(STATS_KEYS.values()))
+    stats = {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / total, 4) if total else None
+    return stats
+
+
+def _response_key(request, versions):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    raw = f'{request.get_host()}{request.path}?{query}|{":".join(map(str, versions))}'
+    return f'{KEY_PREFIX}:resp:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cache_response(*scopes):
+    """
+    Décorateur pour les méthodes `get` d'APIView publiques.
+    Les portées peuvent référencer les paramètres d'URL : `cache_response('post:{pk}')`.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            versions = get_versions([scope.format(**kwargs) for scope in scopes])
+            key = _response_key(request, versions)
+            cached = cache.get(key)
+            if cached is not None:
+                _count('hits')
+                data, headers = cached
+                response = Response(data, status=status.HTTP_200_OK, headers=headers)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count('misses')
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                headers = {name: value for name, value in response.items()}
+                cache.set(key, (response.data, headers), settings.POSTS_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,71 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) sur les endpoints de lecture des posts.
+
+Les validateurs sont calculés sans sérialiser le post : une requête légère pour le
+détail, les versions du cache (voir posts/cache.py) pour le fil. Un
+`If-None-Match` ou `If-Modified-Since` satisfait renvoie 304 avant la vue.
+
+Le détail n'a qu'un ETag : la suppression d'une réaction ne laisse aucun
+horodatage, un Last-Modified ne la verrait pas et un client qui n'envoie que
+`If-Modified-Since` recevrait un 304 périmé.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import cache
+from .models import Post, counter_fields
+
+
+def _detail_validators(request, pk):
+    if not hasattr(request, '_post_validators'):
+        request._post_validators = (
+            Post.objects.published()
+            .filter(pk=pk)
+            .with_last_activity()
+            .values('updated_at', 'last_comment_at', 'last_reaction_at', *counter_fields())
+            .first()
+        )
+    return request._post_validators
+
+
+def post_detail_etag(request, pk):
+    row = _detail_validators(request, pk)
+    if row is None:
+        return None
+    # Les compteurs couvrent les suppressions de réactions, qui ne laissent pas d'horodatage
+    raw = f'{pk}|' + '|'.join(str(row[key]) for key in sorted(row))
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def post_list_etag(request):
+    [version] = cache.get_versions(['global'])
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    raw = f'{version}|{request.path}?{query}'
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def post_list_last_modified(request):
+    return cache.last_bumped('global')
+
+
+def conditional_response(etag_func, last_modified_func):
+    """
+    `condition()` de Django pour les méthodes d'APIView, avec `Cache-Control: no-cache`
+    pour que le navigateur revalide toujours au lieu de servir une copie périmée.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            @condition(etag_func=etag_func, last_modified_func=last_modified_func)
+            def handler(request, *args, **kwargs):
+                return method(view, request, *args, **kwargs)
+
+            response = handler(request, *args, **kwargs)
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,15 @@
+from django.urls import path
+from . import feeds
+
+# Flux de syndication, servis à la racine du site (voir posts/feeds.py)
+urlpatterns = [
+    path('feed.xml', feeds.rss_feed, name='feed_rss'),
+    path('atom.xml', feeds.atom_feed, name='feed_atom'),
+    path('feed.json', feeds.json_feed, name='feed_json'),
+    path('tags/<slug:tag>/feed.xml', feeds.rss_feed, name='tag_feed_rss'),
+    path('tags/<slug:tag>/atom.xml', feeds.atom_feed, name='tag_feed_atom'),
+    path('tags/<slug:tag>/feed.json', feeds.json_feed, name='tag_feed_json'),
+    path('authors/<int:author_id>/feed.xml', feeds.rss_feed, name='author_feed_rss'),
+    path('authors/<int:author_id>/atom.xml', feeds.atom_feed, name='author_feed_atom'),
+    path('authors/<int:author_id>/feed.json', feeds.json_feed, name='author_feed_json'),
+]
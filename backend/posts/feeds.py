@@ -0,0 +1,195 @@
+"""
+Flux de syndication : RSS 2.0 (/feed.xml), Atom (/atom.xml) et JSON Feed 1.1
+(/feed.json), pour tout le blog, par tag (/tags/<slug>/...) ou par auteur
+(/authors/<id>/...). Les agrégateurs et l'outil de newsletter les interrogent
+à la place de GET /api/posts/.
+
+Le flux rendu est mis en cache sous les versions des portées dont il dépend
+(voir posts/cache.py) et l'ETag est dérivé de ces mêmes versions : un robot
+qui renvoie son `If-None-Match` reçoit un 304 sans aucune requête SQL. Les
+posts sont lus par un curseur (`iterator`), un lot de FEED_SIZE posts.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache as django_cache
+from django.db.models.functions import Left
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed, SyndicationFeed, rfc3339_date
+from django.views.decorators.http import condition
+
+from users.models import User
+
+from . import cache, timeline
+from .models import Post, Tag
+
+FEED_SIZE = 20
+# Extrait publié dans les flux (le texte complet reste sur la page du post)
+FEED_EXCERPT_LENGTH = 500
+
+
+def post_url(post_id):
+    """Page publique d'un post sur le site (flux et sitemaps)."""
+    return f"{settings.FRONTEND_URL}/posts/{post_id}"
+
+
+class JSONFeed(SyndicationFeed):
+    """Générateur JSON Feed 1.1 (https://jsonfeed.org/version/1.1)."""
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def write(self, outfile, encoding):
+        feed = {
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': self.feed['title'],
+            'home_page_url': self.feed['link'],
+            'feed_url': self.feed['feed_url'],
+            'description': self.feed['description'],
+            'language': self.feed['language'],
+            'items': [self.item(item) for item in self.items],
+        }
+        outfile.write(json.dumps(feed, ensure_ascii=False).encode(encoding))
+
+    def item(self, item):
+        data = {
+            'id': item['unique_id'] or item['link'],
+            'url': item['link'],
+            'title': item['title'],
+            'summary': item['description'],
+            'content_text': item['description'],
+            'tags': list(item['categories']),
+        }
+        if item['pubdate']:
+            data['date_published'] = rfc3339_date(item['pubdate'])
+        if item['updateddate']:
+            data['date_modified'] = rfc3339_date(item['updateddate'])
+        if item['author_name']:
+            data['authors'] = [{'name': item['author_name']}]
+        return data
+
+
+class PostFeed(Feed):
+    feed_type = Rss201rev2Feed
+
+    def get_object(self, request, tag=None, author_id=None):
+        if tag is not None:
+            return get_object_or_404(Tag, slug=tag)
+        if author_id is not None:
+            return get_object_or_404(User, pk=author_id)
+        return None
+
+    def title(self, obj):
+        if isinstance(obj, Tag):
+            return f"Solange Glow Blog : {obj.name}"
+        if isinstance(obj, User):
+            return f"Solange Glow Blog : articles de {obj.username}"
+        return "Solange Glow Blog"
+
+    def link(self, obj):
+        return f"{settings.FRONTEND_URL}/blog"
+
+    def description(self, obj):
+        return "Derniers articles publiés"
+
+    def items(self, obj):
+        posts = (
+            Post.objects.published()
+            .select_related('author')
+            .prefetch_related('tags')
+            .annotate(excerpt=Left('content', FEED_EXCERPT_LENGTH))
+            .defer('content')
+            .order_by('-published_at', '-id')
+        )
+        if isinstance(obj, Tag):
+            posts = posts.tagged([obj.slug])
+        elif isinstance(obj, User):
+            posts = posts.filter(author=obj)
+        return posts[:FEED_SIZE].iterator(chunk_size=FEED_SIZE)
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_link(self, item):
+        return post_url(item.pk)
+
+    def item_pubdate(self, item):
+        return item.published_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_categories(self, item):
+        return [tag.name for tag in item.tags.all()]
+
+
+class AtomPostFeed(PostFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class JSONPostFeed(PostFeed):
+    feed_type = JSONFeed
+
+
+def feed_scopes(kwargs):
+    # Un flux auteur ne dépend que des posts de l'auteur ; les autres de tout le blog
+    if 'author_id' in kwargs:
+        return [f"author:{kwargs['author_id']}"]
+    return ['global']
+
+
+def feed_etag(request, **kwargs):
+    if not hasattr(request, '_feed_etag'):
+        versions = cache.get_versions(feed_scopes(kwargs))
+        raw = f"{':'.join(map(str, versions))}|{request.path}"
+        request._feed_etag = f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+    return request._feed_etag
+
+
+def feed_last_modified(request, **kwargs):
+    return cache.last_bumped(feed_scopes(kwargs)[0])
+
+
+def cached_feed(feed_class):
+    """Vue du flux : 304 sur les versions du cache, sinon flux rendu servi depuis le cache."""
+    feed = feed_class()
+
+    @condition(etag_func=feed_etag, last_modified_func=feed_last_modified)
+    def render(request, **kwargs):
+        key = f"{cache.KEY_PREFIX}:feed:{feed_etag(request, **kwargs)[1:-1]}"
+        cached = django_cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = feed(request, **kwargs)
+        if response.status_code == 200:
+            django_cache.set(key, (response.content, response['Content-Type']), settings.POSTS_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def view(request, **kwargs):
+        # Avant les validateurs : un post programmé qui vient d'être publié change la version
+        timeline.publish_due()
+        response = render(request, **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    return view
+
+
+rss_feed = cached_feed(PostFeed)
+atom_feed = cached_feed(AtomPostFeed)
+json_feed = cached_feed(JSONPostFeed)
@@ -0,0 +1,143 @@
+"""
+File d'attente des suggestions IA, stockée en base (SuggestionJob).
+
+La requête HTTP ne fait qu'insérer une ligne ; l'appel à l'IA est fait par :
+- `thread` (défaut) : un pool de threads dans chaque worker gunicorn, qui ne bloque
+  pas le thread de requête ; au démarrage du worker puis toutes les
+  SUGGESTION_RECOVERY_INTERVAL secondes, les jobs orphelins sont repris (`recover`) ;
+- `external` : un processus séparé, `manage.py process_suggestion_jobs --loop` ;
+- `inline` : exécution synchrone après commit (tests, développement).
+Mode et taille du pool : SUGGESTION_WORKER_MODE et SUGGESTION_WORKERS.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import ai
+from .models import SuggestionJob
+
+logger = logging.getLogger('posts')
+
+# Un job `running` depuis plus de deux fois le timeout d'appel a perdu son worker
+STALE_AFTER = timedelta(seconds=ai.REQUEST_TIMEOUT * 2)
+
+_executor = None
+_executor_lock = threading.Lock()
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def _get_executor():
+    # Créé à la demande : jamais dans le master gunicorn, un pool par worker après le fork
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.SUGGESTION_WORKERS,
+                    thread_name_prefix='suggestions',
+                )
+    return _executor
+
+
+def enqueue(post, user, text):
+    """Crée le job ; s'il est déjà en cache, il est créé terminé et rien n'est mis en file."""
+    cached = ai.get_cached_rewrite(ai.suggestion_cache_key(text))
+    if cached is not None:
+        now = timezone.now()
+        return SuggestionJob.objects.create(
+            post=post, user=user, text=text, status=SuggestionJob.DONE,
+            result=cached, cached=True, started_at=now, finished_at=now,
+        )
+    job = SuggestionJob.objects.create(post=post, user=user, text=text)
+    mode = settings.SUGGESTION_WORKER_MODE
+    if mode == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+    elif mode == 'inline':
+        transaction.on_commit(lambda: run_job(job.pk))
+    return job
+
+
+def start():
+    """Mode thread, au démarrage du worker (voir gunicorn.conf.py) : reprise immédiate puis périodique."""
+    if settings.SUGGESTION_WORKER_MODE == 'thread':
+        _recover_in_thread()
+
+
+def recover():
+    """Remet en file les jobs orphelins ; renvoie les ids des jobs en attente à relancer."""
+    requeue_stale(STALE_AFTER)
+    pending = SuggestionJob.objects.filter(status=SuggestionJob.PENDING).order_by('created_at')
+    return list(pending.values_list('pk', flat=True))
+
+
+def _recover_in_thread():
+    close_old_connections()
+    try:
+        # Dans le pool : `claim` empêche un job d'être exécuté deux fois
+        for job_id in recover():
+            _get_executor().submit(_run_in_thread, job_id)
+    except Exception:
+        logger.exception("Échec de la reprise des suggestions en attente")
+    finally:
+        close_old_connections()
+        _arm_timer()
+
+
+def _arm_timer():
+    global _timer
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(settings.SUGGESTION_RECOVERY_INTERVAL, _recover_in_thread)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def claim(job_id):
+    """Passe le job en `running` ; False si un autre worker l'a déjà pris."""
+    return SuggestionJob.objects.filter(pk=job_id, status=SuggestionJob.PENDING).update(
+        status=SuggestionJob.RUNNING, started_at=timezone.now()
+    ) == 1
+
+
+def run_job(job_id):
+    """Exécute le job s'il est encore en attente. Renvoie True s'il a été traité ici."""
+    if not claim(job_id):
+        return False
+    job = SuggestionJob.objects.get(pk=job_id)
+    try:
+        job.result, job.cached = ai.rewrite_cached(job.text, job.user_id)
+        job.status = SuggestionJob.DONE
+    except Exception as exc:
+        job.error_status, job.error, _ = ai.error_response(exc)
+        job.status = SuggestionJob.FAILED
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'cached', 'status', 'error', 'error_status', 'finished_at'])
+    return True
+
+
+def run_pending(limit=None):
+    """Traite les jobs en attente, du plus ancien au plus récent. Renvoie le nombre traité."""
+    pending = SuggestionJob.objects.filter(status=SuggestionJob.PENDING).order_by('created_at')
+    return sum(run_job(job_id) for job_id in pending.values_list('pk', flat=True)[:limit])
+
+
+def requeue_stale(older_than):
+    """Remet en attente les jobs `running` abandonnés (worker arrêté en cours d'appel)."""
+    return SuggestionJob.objects.filter(
+        status=SuggestionJob.RUNNING, started_at__lt=timezone.now() - older_than
+    ).update(status=SuggestionJob.PENDING, started_at=None)
@@ -0,0 +1,177 @@
+"""
+Garde-fous des appels sortants vers l'IA, partagés entre workers via le cache
+par défaut (Redis en production) :
+
+- limiteur de concurrence : au plus AI_MAX_CONCURRENT_CALLS appels en cours ;
+  au-delà, on attend une place jusqu'à AI_QUEUE_TIMEOUT secondes, puis 503 ;
+- budget de tokens par utilisateur et par jour (prompt + réponse, comptés avec
+  l'encodeur tiktoken de posts/ai.py) ; dépassé, 429 jusqu'à minuit ;
+- disjoncteur : après AI_BREAKER_THRESHOLD erreurs API ou timeouts en
+  AI_BREAKER_WINDOW secondes, les appels échouent aussitôt en 503 pendant
+  AI_BREAKER_COOLDOWN secondes ; ensuite un seul appel d'essai est laissé passer.
+
+Les compteurs ont une durée de vie : une place non rendue (worker tué en plein
+appel) finit par expirer au lieu de bloquer le limiteur pour toujours. Celle du
+compteur de places est repoussée à chaque réservation : il n'expire qu'après
+SLOT_TTL secondes sans nouvel appel, jamais sous des appels encore en cours.
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import metrics
+
+KEY_PREFIX = 'posts:ai'
+INFLIGHT_KEY = f'{KEY_PREFIX}:inflight'
+BREAKER_FAILURES_KEY = f'{KEY_PREFIX}:breaker:failures'
+BREAKER_OPEN_UNTIL_KEY = f'{KEY_PREFIX}:breaker:open_until'
+BREAKER_PROBE_KEY = f'{KEY_PREFIX}:breaker:probe'
+QUEUE_POLL_INTERVAL = 0.1
+# Durée de vie d'une place : au-delà du timeout des requêtes IA
+SLOT_TTL = 120
+
+TOTAL_METRICS = (
+    'ai.tokens', 'ai.rejected.busy', 'ai.rejected.budget', 'ai.rejected.circuit_open',
+    'ai.breaker.opened',
+)
+
+
+class AIUnavailableError(Exception):
+    """Appel refusé avant d'atteindre le fournisseur ; `retry_after` en secondes."""
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = max(1, int(retry_after))
+
+
+class ConcurrencyLimitError(AIUnavailableError):
+    """Aucune place libérée dans le délai d'attente."""
+
+
+class CircuitOpenError(AIUnavailableError):
+    """Disjoncteur ouvert après des erreurs répétées du fournisseur."""
+
+
+class TokenBudgetExceeded(AIUnavailableError):
+    """Budget quotidien de tokens de l'utilisateur épuisé."""
+
+
+def _incr(key, delta=1, timeout=None):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout):
+            return delta
+        return cache.incr(key, delta)
+
+
+# Limiteur de concurrence
+
+def acquire_slot():
+    """Réserve une place pour un appel ; à rendre avec `release_slot`."""
+    start = time.monotonic()
+    deadline = start + settings.AI_QUEUE_TIMEOUT
+    while True:
+        in_flight = _incr(INFLIGHT_KEY, timeout=SLOT_TTL)
+        # Expiration fixée à la création seulement : sous un trafic continu, le
+        # compteur repartirait de zéro avec des appels en cours et en admettrait trop
+        cache.touch(INFLIGHT_KEY, SLOT_TTL)
+        if in_flight <= settings.AI_MAX_CONCURRENT_CALLS:
+            metrics.record_duration('ai.queue_wait', time.monotonic() - start)
+            return
+        release_slot()
+        if time.monotonic() >= deadline:
+            metrics.record('ai.rejected.busy', 1)
+            raise ConcurrencyLimitError(settings.AI_QUEUE_TIMEOUT)
+        time.sleep(QUEUE_POLL_INTERVAL)
+
+
+def release_slot():
+    try:
+        if cache.decr(INFLIGHT_KEY) < 0:
+            cache.set(INFLIGHT_KEY, 0, SLOT_TTL)
+    except ValueError:
+        # Compteur expiré entre-temps : rien à rendre
+        pass
+
+
+# Budget de tokens
+
+def _budget_key(user_id):
+    return f'{KEY_PREFIX}:budget:{user_id}:{timezone.localdate().isoformat()}'
+
+
+def _seconds_until_midnight():
+    now = timezone.localtime()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), now.tzinfo)
+    return (midnight - now).total_seconds()
+
+
+def tokens_spent_today(user_id):
+    return cache.get(_budget_key(user_id), 0)
+
+
+def check_budget(user_id, tokens):
+    """Lève TokenBudgetExceeded si `tokens` de plus dépasseraient le budget du jour."""
+    budget = settings.AI_DAILY_TOKEN_BUDGET
+    if not budget or user_id is None:
+        return
+    if tokens_spent_today(user_id) + tokens > budget:
+        metrics.record('ai.rejected.budget', 1)
+        raise TokenBudgetExceeded(_seconds_until_midnight())
+
+
+def charge(user_id, tokens):
+    metrics.record('ai.tokens', tokens)
+    if user_id is not None:
+        _incr(_budget_key(user_id), tokens, timeout=2 * 24 * 60 * 60)
+
+
+# Disjoncteur
+
+def before_call():
+    """Lève CircuitOpenError tant que le disjoncteur est ouvert (hors appel d'essai)."""
+    open_until = cache.get(BREAKER_OPEN_UNTIL_KEY)
+    if open_until is None:
+        return
+    remaining = open_until - time.time()
+    # Refroidissement écoulé : un seul appel d'essai à la fois
+    if remaining > 0 or not cache.add(BREAKER_PROBE_KEY, True, SLOT_TTL):
+        metrics.record('ai.rejected.circuit_open', 1)
+        raise CircuitOpenError(remaining if remaining > 0 else settings.AI_BREAKER_COOLDOWN)
+
+
+def record_success():
+    if cache.get(BREAKER_OPEN_UNTIL_KEY) is not None or cache.get(BREAKER_FAILURES_KEY):
+        cache.delete_many([BREAKER_FAILURES_KEY, BREAKER_OPEN_UNTIL_KEY, BREAKER_PROBE_KEY])
+
+
+def record_failure(exc):
+    """Compte les erreurs API et timeouts ; les autres erreurs n'ouvrent pas le disjoncteur."""
+    from openai import APIError
+    if not isinstance(exc, APIError):
+        return
+    # Échec de l'appel d'essai : le disjoncteur se rouvre aussitôt
+    half_open = cache.get(BREAKER_OPEN_UNTIL_KEY) is not None
+    if half_open or _incr(BREAKER_FAILURES_KEY, timeout=settings.AI_BREAKER_WINDOW) >= settings.AI_BREAKER_THRESHOLD:
+        cache.set(BREAKER_OPEN_UNTIL_KEY, time.time() + settings.AI_BREAKER_COOLDOWN, None)
+        cache.delete_many([BREAKER_FAILURES_KEY, BREAKER_PROBE_KEY])
+        metrics.record('ai.breaker.opened', 1)
+
+
+def admit(user_id, prompt_tokens, max_response_tokens):
+    """
+    Contrôles avant un appel : budget (réponse maximale réservée), disjoncteur,
+    puis place dans le limiteur. L'appelant rend la place avec `release_slot`.
+    """
+    check_budget(user_id, prompt_tokens + max_response_tokens)
+    before_call()
+    try:
+        acquire_slot()
+    except ConcurrencyLimitError:
+        # L'éventuel appel d'essai n'aura pas lieu : un autre pourra le tenter
+        cache.delete(BREAKER_PROBE_KEY)
+        raise
@@ -0,0 +1,102 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from posts import benchmarks
+from users import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every posts/users route on synthetic datasets of increasing size, in a "
+        "throwaway test database. Fails when a route exceeds its query or latency budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="200,2000",
+            help="Comma-separated numbers of posts for each dataset (users = posts / 10).",
+        )
+        parser.add_argument("--iterations", type=int, default=20, help="Requests per route and dataset.")
+        parser.add_argument("--output", default="benchmark-report.json", help="Path of the JSON report.")
+        parser.add_argument(
+            "--budgets",
+            default=None,
+            help='JSON file overriding budgets: {"post_list": [3, 250], ...} (queries, p95 ms).',
+        )
+        parser.add_argument("--route", action="append", dest="routes", help="Only benchmark this route (repeatable).")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed of the synthetic datasets.")
+
+    def handle(self, *args, **options):
+        uncovered = benchmarks.uncovered_routes()
+        if uncovered:
+            raise CommandError(f"Routes without a benchmark scenario: {', '.join(uncovered)}")
+        budgets = {}
+        if options["budgets"]:
+            with open(options["budgets"]) as f:
+                budgets = {name: tuple(value) for name, value in json.load(f).items()}
+        sizes = [int(size) for size in options["sizes"].split(",")]
+
+        report = {"iterations": options["iterations"], "datasets": []}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Pas d'appel réseau ni de limite de débit pendant la mesure. Le banc vide le cache
+            # avant chaque requête : jamais le cache configuré (FLUSHDB sur le Redis de production)
+            with override_settings(
+                RATELIMIT_ENABLE=False, SUGGESTION_WORKER_MODE="external", EMAIL_OUTBOX_MODE="external",
+                CACHES={
+                    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"bench-{alias}"}
+                    for alias in settings.CACHES
+                },
+            ):
+                seeded = 0
+                for size in sizes:
+                    start = time.monotonic()
+                    # Les paliers s'ajoutent : on ne génère que la différence
+                    seeding.generate(
+                        users=max(1, (size - seeded) // 10), posts=size - seeded, comments_per_post=3,
+                        reactions_per_post=5, workers=1, chunk_size=2000, seed=options["seed"] + size,
+                        stdout=_Silent(),
+                    )
+                    seeded = size
+                    self.stdout.write(f"Dataset {size} posts seeded in {time.monotonic() - start:.1f}s")
+                    routes = benchmarks.run(options["iterations"], budgets, options["routes"])
+                    report["datasets"].append({"posts": size, "routes": routes})
+                    for name, result in routes.items():
+                        line = (
+                            f"  {name:<25} p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  "
+                            f"{result['queries']:>3} queries  {result['bytes']:>8} bytes"
+                        )
+                        if result["violations"]:
+                            line += "  FAIL: " + "; ".join(result["violations"])
+                            self.stdout.write(self.style.ERROR(line))
+                        else:
+                            self.stdout.write(line)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"Report written to {options['output']}")
+
+        failures = [
+            f"{name} ({dataset['posts']} posts): {'; '.join(result['violations'])}"
+            for dataset in report["datasets"]
+            for name, result in dataset["routes"].items()
+            if result["violations"]
+        ]
+        if failures:
+            raise CommandError("Budgets exceeded:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("All routes within budget"))
+
+
+class _Silent:
+    def write(self, *args, **kwargs):
+        pass
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import jobs
+
+
+class Command(BaseCommand):
+    help = "Process pending AI suggestion jobs (for SUGGESTION_WORKER_MODE=external)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new jobs instead of exiting when the queue is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls in --loop mode.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Maximum number of jobs processed per poll.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            requeued = jobs.requeue_stale(jobs.STALE_AFTER)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Requeued stale jobs: {requeued}"))
+            processed = jobs.run_pending(limit=options["batch_size"])
+            total += processed
+            if not options["loop"]:
+                break
+            if not processed:
+                time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(f"Jobs processed: {total}"))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import author_stats, cache
+from posts.models import Post, counter_fields
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized comment/reaction counters on posts and repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of posts checked and updated per batch.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted posts without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        fields = counter_fields()
+        checked = repaired = 0
+        last_id = 0
+
+        while True:
+            # Parcours par clé primaire : chaque lot est une requête agrégée bornée
+            batch = list(
+                Post.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .with_computed_counts()
+                .only("pk", "author_id", *fields)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].pk
+            checked += len(batch)
+
+            drifted = []
+            for post in batch:
+                changed = False
+                for field in fields:
+                    expected = getattr(post, f"computed_{field}")
+                    if getattr(post, field) != expected:
+                        setattr(post, field, expected)
+                        changed = True
+                if changed:
+                    drifted.append(post)
+
+            if drifted and not options["dry_run"]:
+                author_ids = {post.author_id for post in drifted}
+                with transaction.atomic():
+                    Post.objects.bulk_update(drifted, fields)
+                    author_stats.refresh(author_ids)
+                # bulk_update n'envoie pas de signaux : réponses en cache et ETags invalidés à la main
+                cache.bump(
+                    "global",
+                    *[f"post:{post.pk}" for post in drifted],
+                    *[f"author:{author_id}" for author_id in author_ids],
+                )
+            repaired += len(drifted)
+
+        verb = "would be repaired" if options["dry_run"] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"Posts checked: {checked}, {verb}: {repaired}"))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import author_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored per-author statistics (post count, comments, reactions, last publication). "
+        "Run periodically to pick up scheduled publications and repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of authors recomputed per grouped query.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        refreshed = author_stats.refresh_all(max(1, options["batch_size"]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Authors refreshed: {refreshed} ({time.monotonic() - start:.1f}s)"
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-render the sitemap index and the post sitemaps, plain and gzipped, into SITEMAP_ROOT "
+        "so the sitemap views serve them without touching the database. Run after deploys and "
+        "periodically; files are replaced atomically and served as soon as they are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.SITEMAP_ROOT,
+            help="Target directory (defaults to SITEMAP_ROOT).",
+        )
+        parser.add_argument(
+            "--base-url",
+            required=True,
+            help="Public URL the sitemap files are served from, e.g. https://api.blog.solangeglow.com.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("No output directory: set SITEMAP_ROOT or pass --output.")
+        start = time.monotonic()
+        written = sitemaps.write_files(options["output"], options["base_url"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sitemap files written: {len(written)} ({time.monotonic() - start:.1f}s)"
+        ))
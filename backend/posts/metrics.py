@@ -0,0 +1,59 @@
+"""
+Mesures des appels IA, partagées entre workers via le cache par défaut
+(mêmes compteurs `incr` que les statistiques de posts/cache.py).
+
+Une mesure = un nombre d'occurrences et un total ; les durées sont stockées
+en microsecondes pour rester des entiers incrémentables.
+"""
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'posts:metrics'
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def record(name, value):
+    """Ajoute une occurrence de `value` (entier) à la mesure `name`."""
+    _incr(f'{KEY_PREFIX}:{name}:count', 1)
+    _incr(f'{KEY_PREFIX}:{name}:total', value)
+
+
+def record_duration(name, seconds):
+    record(name, int(seconds * 1_000_000))
+
+
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_duration(name, time.perf_counter() - start)
+
+
+def snapshot(durations=(), totals=()):
+    """Moyennes en millisecondes pour les durées, totaux bruts pour les autres mesures."""
+    names = list(durations) + list(totals)
+    keys = [f'{KEY_PREFIX}:{name}:{part}' for name in names for part in ('count', 'total')]
+    values = cache.get_many(keys)
+    result = {}
+    for name in names:
+        count = values.get(f'{KEY_PREFIX}:{name}:count', 0)
+        total = values.get(f'{KEY_PREFIX}:{name}:total', 0)
+        if name in durations:
+            result[name] = {
+                'count': count,
+                'avg_ms': round(total / count / 1000, 3) if count else None,
+            }
+        else:
+            result[name] = {'count': count, 'total': total}
+    return result
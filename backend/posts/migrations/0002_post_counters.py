@@ -0,0 +1,68 @@
+# Generated by Django 5.2 on 2026-10-17 19:58
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+EMOJIS = ['LIKE', 'LOVE', 'HAHA', 'WOW', 'SAD', 'ANGRY']
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Reaction = apps.get_model('posts', 'Reaction')
+
+    def count_of(queryset):
+        subquery = queryset.filter(post=OuterRef('pk')).order_by().values('post').annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+    Post.objects.update(comment_count=count_of(Comment.objects.all()))
+    for emoji in EMOJIS:
+        Post.objects.update(**{f"{emoji.lower()}_count": count_of(Reaction.objects.filter(emoji=emoji))})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='angry_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='haha_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='love_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='sad_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='wow_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
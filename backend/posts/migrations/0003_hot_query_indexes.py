@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-17 20:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_post_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-published_at', '-id'], name='post_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-published_at', '-id'], name='post_author_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['post', 'emoji'], name='reaction_post_emoji_idx'),
+        ),
+        # Filtre ?tag= : partir du tag pour trouver ses posts. La table de liaison
+        # auto-générée n'accepte pas de Meta.indexes, d'où le SQL brut.
+        migrations.RunSQL(
+            'CREATE INDEX post_tags_tag_post_idx ON posts_post_tags (tag_id, post_id);',
+            reverse_sql='DROP INDEX post_tags_tag_post_idx;',
+        ),
+    ]
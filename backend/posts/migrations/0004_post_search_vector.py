@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-17 20:07
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Trigger plutôt que signal : couvre aussi bulk_create et les écritures SQL directes
+CREATE_SQL = """
+CREATE FUNCTION posts_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('french', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER posts_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON posts_post
+    FOR EACH ROW EXECUTE FUNCTION posts_post_search_vector_update();
+
+UPDATE posts_post SET search_vector =
+    setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('french', coalesce(content, '')), 'B');
+
+CREATE INDEX post_search_vector_idx ON posts_post USING gin (search_vector);
+"""
+
+DROP_SQL = """
+DROP INDEX IF EXISTS post_search_vector_idx;
+DROP TRIGGER IF EXISTS posts_post_search_vector_trigger ON posts_post;
+DROP FUNCTION IF EXISTS posts_post_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    # Hors PostgreSQL, posts/search.py utilise un index en mémoire
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
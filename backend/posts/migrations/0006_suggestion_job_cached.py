@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_suggestion_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suggestionjob',
+            name='cached',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-17 20:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_suggestion_job_cached'),
+        ('users', '0003_outbound_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('like_count', models.PositiveIntegerField(default=0)),
+                ('love_count', models.PositiveIntegerField(default=0)),
+                ('haha_count', models.PositiveIntegerField(default=0)),
+                ('wow_count', models.PositiveIntegerField(default=0)),
+                ('sad_count', models.PositiveIntegerField(default=0)),
+                ('angry_count', models.PositiveIntegerField(default=0)),
+                ('last_published_at', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Statistiques auteur',
+                'verbose_name_plural': 'Statistiques auteurs',
+            },
+        ),
+    ]
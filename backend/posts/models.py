@@ -1,6 +1,14 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from users.models import User
+import uuid
+
+
+def tag_slug(name):
+    return name.lower().replace(' ', '-')
 
 
 class Tag(models.Model):
@@ -9,7 +17,7 @@ class Tag(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = self.name.lower().replace(' ', '-')
+            self.slug = tag_slug(self.name)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -19,6 +27,93 @@ class Tag(models.Model):
         verbose_name = "Tag"
         verbose_name_plural = "Tags"
 
+# Nombre de commentaires embarqués dans le détail d'un post (première page)
+COMMENT_PAGE_SIZE = 5
+
+
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(published_at__lte=timezone.now())
+
+    def tagged(self, slugs, match_all=False):
+        """
+        Posts portant un des tags (`match_all=False`) ou tous les tags de `slugs`.
+        Filtré par `pk IN (sous-requête)` sur la table de liaison : pas de jointure
+        qui dupliquerait les lignes, et le cas « tous » tient en un seul
+        `GROUP BY post_id HAVING COUNT(*) = n`, quel que soit le nombre de tags.
+        """
+        slugs = set(slugs)
+        links = Post.tags.through.objects.filter(tag__slug__in=slugs).values('post_id')
+        if match_all:
+            links = links.annotate(matched=Count('tag_id')).filter(matched=len(slugs))
+        return self.filter(pk__in=links.values('post_id'))
+
+    def with_computed_counts(self):
+        """
+        Recalcule depuis les tables `Comment` et `Reaction` les compteurs stockés sur
+        chaque post, annotés sous `computed_<champ>` (ex. `computed_like_count`).
+        Sert à détecter et réparer une dérive ; les lectures utilisent les champs stockés.
+        """
+        comments = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        reaction_counts = {
+            f"computed_{reaction_count_field(emoji)}": Count('reactions', filter=Q(reactions__emoji=emoji))
+            for emoji, _ in Reaction.EMOJI_CHOICES
+        }
+        return self.annotate(
+            computed_comment_count=Coalesce(Subquery(comments, output_field=IntegerField()), 0),
+            **reaction_counts,
+        )
+
+    def with_last_activity(self):
+        """Annote `last_comment_at` et `last_reaction_at` par sous-requêtes indexées sur `post_id`."""
+        last_comment = Comment.objects.filter(post=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+        last_reaction = Reaction.objects.filter(post=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+        return self.annotate(
+            last_comment_at=Subquery(last_comment),
+            last_reaction_at=Subquery(last_reaction),
+        )
+
+    def with_details(self):
+        """
+        Tout ce dont `PostSerializer` a besoin, en un nombre constant de requêtes
+        quel que soit le nombre de posts, commentaires ou réactions. Seule la
+        première page de commentaires est chargée (voir CommentListView).
+        """
+        return (
+            self.select_related('author')
+            .prefetch_related(
+                Prefetch(
+                    'comments',
+                    queryset=Comment.objects.select_related('author').order_by('created_at', 'id')[:COMMENT_PAGE_SIZE],
+                    to_attr='first_comments',
+                ),
+                'reactions',
+                'tags',
+            )
+        )
+
+
+class PostManager(models.Manager.from_queryset(PostQuerySet)):
+    def get_queryset(self):
+        # Le vecteur de recherche ne sert qu'en SQL : inutile de le transférer
+        return super().get_queryset().defer('search_vector')
+
+
+def reaction_count_field(emoji):
+    return f"{emoji.lower()}_count"
+
+
+def counter_fields():
+    """Champs compteurs dénormalisés de `Post`, maintenus à l'écriture."""
+    return ['comment_count'] + [reaction_count_field(emoji) for emoji, _ in Reaction.EMOJI_CHOICES]
+
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
@@ -28,13 +123,38 @@ class Post(models.Model):
     published_at = models.DateTimeField(default=timezone.now)
     tags = models.ManyToManyField(Tag, related_name='posts', blank=True)
 
+    # Compteurs dénormalisés, mis à jour avec F() par les vues d'écriture
+    # (un champ par emoji de Reaction.EMOJI_CHOICES, voir reaction_count_field)
+    comment_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    haha_count = models.PositiveIntegerField(default=0)
+    wow_count = models.PositiveIntegerField(default=0)
+    sad_count = models.PositiveIntegerField(default=0)
+    angry_count = models.PositiveIntegerField(default=0)
+
+    # tsvector (config french) maintenu par trigger sous PostgreSQL, voir posts/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostManager()
+
     def __str__(self):
         return self.title
 
+    def increment_counter(self, field, delta=1):
+        """Incrémente un compteur de façon atomique, sans relire la ligne."""
+        Post.objects.filter(pk=self.pk).update(**{field: models.F(field) + delta})
+
     class Meta:
         ordering = ['-published_at']
         verbose_name = "Post"
         verbose_name_plural = "Posts"
+        indexes = [
+            # Fil : ORDER BY -published_at, -id avec published_at <= now()
+            models.Index(fields=['-published_at', '-id'], name='post_published_idx'),
+            # Page auteur : author_id = ? ORDER BY -published_at
+            models.Index(fields=['author', '-published_at', '-id'], name='post_author_published_idx'),
+        ]
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
@@ -50,6 +170,9 @@ class Comment(models.Model):
         ordering = ['created_at']
         verbose_name = "Commentaire"
         verbose_name_plural = "Commentaires"
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+        ]
 
 class Reaction(models.Model):
     EMOJI_CHOICES = [
@@ -70,7 +193,76 @@ class Reaction(models.Model):
         unique_together = ('post', 'user', 'emoji')  
         verbose_name = "Réaction"
         verbose_name_plural = "Réactions"
+        indexes = [
+            models.Index(fields=['post', 'emoji'], name='reaction_post_emoji_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} reacted {self.emoji} to {self.post.title}"
-    
\ No newline at end of file
+    
+
+
+class AuthorStats(models.Model):
+    """
+    Agrégats d'un auteur sur ses posts publiés, stockés pour que la page auteur
+    ne recompte rien. Tenus à jour par posts/author_stats.py : incrémentés avec
+    les compteurs des posts, recalculés à chaque écriture d'un post de l'auteur
+    et par `manage.py refresh_author_stats` (publications programmées, dérive).
+    """
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='post_stats')
+    post_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    haha_count = models.PositiveIntegerField(default=0)
+    wow_count = models.PositiveIntegerField(default=0)
+    sad_count = models.PositiveIntegerField(default=0)
+    angry_count = models.PositiveIntegerField(default=0)
+    last_published_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Statistiques auteur"
+        verbose_name_plural = "Statistiques auteurs"
+
+    def __str__(self):
+        return f"Statistiques de {self.author_id}"
+
+
+class SuggestionJob(models.Model):
+    """Demande de réécriture IA traitée en arrière-plan (voir posts/jobs.py)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'En attente'),
+        (RUNNING, 'En cours'),
+        (DONE, 'Terminée'),
+        (FAILED, 'Échouée'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='suggestion_jobs')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='suggestion_jobs')
+    text = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    result = models.TextField(blank=True)
+    # Réponse servie depuis le cache des réécritures, sans appel à l'IA
+    cached = models.BooleanField(default=False)
+    error = models.JSONField(null=True, blank=True)
+    error_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = "Suggestion IA"
+        verbose_name_plural = "Suggestions IA"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='suggestion_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Suggestion {self.id} ({self.status}) pour {self.post_id}"
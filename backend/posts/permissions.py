@@ -1,15 +1,14 @@
 # posts/permissions.py
 from rest_framework import permissions
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from django.contrib.auth import get_user_model
-
-User = get_user_model()
+from users.authentication import get_cached_user, user_id_from_refresh_token
 
 class IsAuthenticatedByRefreshToken(permissions.BasePermission):
     message = "Vous devez être connecté pour effectuer cette action."  
 
     def has_permission(self, request, view):
+        # Utilisateur déjà résolu par JWTAuthentication : token décodé une seule fois
         if request.user and request.user.is_authenticated:
             return True
 
@@ -23,18 +22,10 @@ class IsAuthenticatedByRefreshToken(permissions.BasePermission):
                     if not user_id:
                         self.message = "Utilisateur non trouvé dans le token."
                         return False
-                    user = User.objects.get(id=user_id)
-                    if not user.is_active:
-                        self.message = "Cet utilisateur est désactivé."
-                        return False
-                    request.user = user
-                    return True
+                    return self._authenticate(request, user_id)
                 except (InvalidToken, TokenError):
                     self.message = "Access token invalide ou expiré."
                     return False
-                except User.DoesNotExist:
-                    self.message = "Utilisateur associé au token non trouvé."
-                    return False
 
         refresh_token = request.COOKIES.get('refresh_token')
 
@@ -43,23 +34,11 @@ class IsAuthenticatedByRefreshToken(permissions.BasePermission):
             return False
 
         try:
-            token = RefreshToken(refresh_token)
-            token.verify()  
-
-           
-            user_id = token.payload.get('user_id')
+            user_id = user_id_from_refresh_token(refresh_token)
             if not user_id:
                 self.message = "Utilisateur non trouvé dans le token."
                 return False
-
-            user = User.objects.get(id=user_id)
-            if not user.is_active:
-                self.message = "Cet utilisateur est désactivé."
-                return False
-
-            
-            request.user = user
-            return True
+            return self._authenticate(request, user_id)
 
         except InvalidToken:
             self.message = "token est invalide ou a expiré."
@@ -67,6 +46,14 @@ class IsAuthenticatedByRefreshToken(permissions.BasePermission):
         except TokenError:
             self.message = "Erreur lors de la validation du token."
             return False
-        except User.DoesNotExist:
+
+    def _authenticate(self, request, user_id):
+        user = get_cached_user(user_id)
+        if user is None:
             self.message = "Utilisateur associé au token non trouvé."
-            return False
\ No newline at end of file
+            return False
+        if not user.is_active:
+            self.message = "Cet utilisateur est désactivé."
+            return False
+        request.user = user
+        return True
@@ -0,0 +1,192 @@
+"""
+Recherche plein texte sur les posts.
+
+En production (PostgreSQL) : colonne `Post.search_vector` maintenue par un trigger
+(voir la migration 0004) avec la configuration `french`, index GIN, classement
+par `ts_rank` et surlignage par `ts_headline`.
+
+Ailleurs (SQLite pour les tests) : index inversé en mémoire, construit au premier
+appel et tenu à jour par les signaux de `Post`. Il est propre à chaque processus :
+c'est un repli pour le développement, pas pour la production.
+"""
+import html
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import connection
+
+from .models import Post
+
+SEARCH_CONFIG = 'french'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+TITLE_WEIGHT = 2.0
+
+# Suffixes retirés par la racinisation légère du repli (du plus long au plus court),
+# sans accents : `stem` reçoit des mots déjà passés par `normalize`
+FRENCH_SUFFIXES = (
+    'issements', 'issement', 'ations', 'ation', 'ements', 'ement', 'ments', 'ment',
+    'euses', 'euse', 'eurs', 'eur', 'ites', 'ite', 'ives', 'ive', 'ifs', 'if',
+    'es', 's', 'x', 'e',
+)
+STOP_WORDS = {
+    'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'et', 'ou', 'en', 'au', 'aux',
+    'a', 'à', 'l', 'd', 'pour', 'par', 'sur', 'dans', 'avec', 'que', 'qui', 'ce', 'se',
+}
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def search(query, limit):
+    """Renvoie au plus `limit` posts publiés, annotés `rank` et `headline`, du plus pertinent au moins pertinent."""
+    if uses_postgres():
+        return _postgres_search(query, limit)
+    return _fallback_index.search(query, limit)
+
+
+def _postgres_search(query, limit):
+    from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+    from django.db.models import F
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return list(
+        Post.objects.published()
+        .filter(search_vector=search_query)
+        .annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+            headline=SearchHeadline(
+                'content', search_query, config=SEARCH_CONFIG,
+                start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP, max_words=35, min_words=15,
+            ),
+        )
+        .select_related('author')
+        .prefetch_related('tags')
+        .order_by('-rank', '-published_at')[:limit]
+    )
+
+
+def normalize(word):
+    word = unicodedata.normalize('NFKD', word.lower())
+    return ''.join(c for c in word if not unicodedata.combining(c))
+
+
+def stem(word):
+    for suffix in FRENCH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def terms(text):
+    return [stem(normalize(w)) for w in WORD_RE.findall(text) if w.lower() not in STOP_WORDS]
+
+
+def highlight(text, query_terms, max_words=35):
+    """Extrait autour de la première occurrence, termes trouvés entourés de <mark>."""
+    words = text.split()
+    matches = [i for i, w in enumerate(words) if any(t in query_terms for t in terms(w))]
+    start = max(0, matches[0] - max_words // 3) if matches else 0
+    matched = set(matches)
+    fragment = []
+    for i in range(start, min(len(words), start + max_words)):
+        word = html.escape(words[i])
+        fragment.append(f'{HIGHLIGHT_START}{word}{HIGHLIGHT_STOP}' if i in matched else word)
+    return ' '.join(fragment)
+
+
+class InvertedIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._postings = defaultdict(set)
+        self._docs = {}
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._postings.clear()
+            self._docs.clear()
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            for post in Post.objects.only('id', 'title', 'content').iterator(chunk_size=1000):
+                self._add(post)
+            self._built = True
+
+    def _add(self, post):
+        self._remove(post.pk)
+        title, content = Counter(terms(post.title)), Counter(terms(post.content))
+        self._docs[post.pk] = (title, content)
+        for term in set(title) | set(content):
+            self._postings[term].add(post.pk)
+
+    def _remove(self, post_id):
+        doc = self._docs.pop(post_id, None)
+        if doc:
+            for term in set(doc[0]) | set(doc[1]):
+                self._postings[term].discard(post_id)
+
+    def update(self, post):
+        # Tant que l'index n'est pas construit, il sera lu depuis la base au premier appel
+        if self._built:
+            with self._lock:
+                self._add(post)
+
+    def remove(self, post_id):
+        if self._built:
+            with self._lock:
+                self._remove(post_id)
+
+    def search(self, query, limit):
+        query_terms = set(terms(query))
+        if not query_terms:
+            return []
+        self._ensure_built()
+        with self._lock:
+            candidates = set.intersection(*(self._postings.get(t, set()) for t in query_terms))
+            total = len(self._docs) or 1
+            scores = {}
+            for post_id in candidates:
+                title, content = self._docs[post_id]
+                scores[post_id] = sum(
+                    (TITLE_WEIGHT * title[t] + content[t]) * math.log(1 + total / len(self._postings[t]))
+                    for t in query_terms
+                )
+        posts = (
+            Post.objects.published()
+            .filter(pk__in=scores)
+            .select_related('author')
+            .prefetch_related('tags')
+        )
+        results = sorted(posts, key=lambda p: (-scores[p.pk], -p.published_at.timestamp()))[:limit]
+        for post in results:
+            post.rank = round(scores[post.pk], 4)
+            post.headline = highlight(post.content, query_terms)
+        return results
+
+
+_fallback_index = InvertedIndex()
+
+
+def index_post(post):
+    if not uses_postgres():
+        _fallback_index.update(post)
+
+
+def unindex_post(post_id):
+    if not uses_postgres():
+        _fallback_index.remove(post_id)
+
+
+def reset_index():
+    _fallback_index.reset()
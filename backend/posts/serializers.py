@@ -1,5 +1,8 @@
+from django.db import transaction
+from django.db.models import Q
 from rest_framework import serializers
-from .models import Post, Comment, Reaction , Tag
+from . import cache
+from .models import Post, Comment, Reaction , Tag, SuggestionJob, AuthorStats, reaction_count_field, tag_slug, COMMENT_PAGE_SIZE
 from users.serializers import UserSerializer
 
 class SuggestionSerializer(serializers.Serializer):
@@ -14,12 +17,26 @@ class SuggestionSerializer(serializers.Serializer):
     original = serializers.CharField(help_text="Segment de texte original")
     proposal = serializers.CharField(help_text="Proposition d'amélioration")
 
+class SuggestionJobSerializer(serializers.ModelSerializer):
+    réponse = serializers.CharField(source='result', read_only=True)
+
+    class Meta:
+        model = SuggestionJob
+        fields = ['id', 'post', 'status', 'réponse', 'cached', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug']
         read_only_fields = ['id', 'slug']
 
+class TagCountSerializer(TagSerializer):
+    """Tag du nuage de tags, avec son nombre de posts publiés."""
+    post_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['post_count']
 
 class ReactionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,9 +52,57 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'content', 'author', 'created_at', 'updated_at']
         read_only_fields = ['id', 'author', 'created_at', 'updated_at']
 
+class PostListSerializer(serializers.ModelSerializer):
+    """
+    Version allégée pour le fil des posts : extrait au lieu du contenu complet,
+    compteurs agrégés au lieu des commentaires et réactions.
+    Attend un queryset annoté avec `excerpt`.
+    """
+    author = UserSerializer(read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+    excerpt = serializers.CharField(read_only=True)
+    reaction_counts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'excerpt', 'author', 'published_at', 'tags', 'comment_count', 'reaction_counts']
+        read_only_fields = fields
+
+    def get_reaction_counts(self, obj):
+        return {
+            emoji: getattr(obj, reaction_count_field(emoji))
+            for emoji, _ in Reaction.EMOJI_CHOICES
+        }
+
+class AuthorStatsSerializer(serializers.ModelSerializer):
+    reaction_counts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AuthorStats
+        fields = ['post_count', 'comment_count', 'reaction_counts', 'last_published_at']
+        read_only_fields = fields
+
+    def get_reaction_counts(self, obj):
+        return {
+            emoji: getattr(obj, reaction_count_field(emoji))
+            for emoji, _ in Reaction.EMOJI_CHOICES
+        }
+
+class PostSearchResultSerializer(serializers.ModelSerializer):
+    """Résultat de recherche : `headline` contient l'extrait surligné avec <mark>."""
+    author = UserSerializer(read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'headline', 'rank', 'author', 'published_at', 'tags']
+        read_only_fields = fields
+
 class PostSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
     reactions = ReactionSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     tag_names = serializers.ListField(
@@ -49,35 +114,75 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'content', 'author', 'created_at', 'updated_at', 'published_at', 'comments', 'reactions', 'tags', 'tag_names', 'reaction_counts']
-        read_only_fields = ['id', 'author', 'created_at', 'updated_at', 'published_at', 'comments', 'reactions', 'tags']
+        fields = ['id', 'title', 'content', 'author', 'created_at', 'updated_at', 'published_at', 'comments', 'reactions', 'tags', 'tag_names', 'comment_count', 'reaction_counts']
+        read_only_fields = ['id', 'author', 'created_at', 'updated_at', 'published_at', 'comments', 'reactions', 'tags', 'comment_count']
 
 
     def get_reaction_counts(self, obj):
-        counts = {}
-        for emoji, _ in Reaction.EMOJI_CHOICES:
-            counts[emoji] = obj.reactions.filter(emoji=emoji).count()
-        return counts
+        return {
+            emoji: getattr(obj, reaction_count_field(emoji))
+            for emoji, _ in Reaction.EMOJI_CHOICES
+        }
+
+    def get_comments(self, obj):
+        # Première page seulement ; la suite via GET /api/posts/<pk>/comments/
+        comments = getattr(obj, 'first_comments', None)
+        if comments is None:
+            comments = obj.comments.select_related('author').order_by('created_at', 'id')[:COMMENT_PAGE_SIZE]
+        return CommentSerializer(comments, many=True).data
 
     def create(self, validated_data):
         tag_names = validated_data.pop('tag_names', [])
-        post = Post.objects.create(**validated_data)
-        self._add_tags(post, tag_names)
+        with transaction.atomic():
+            post = Post.objects.create(**validated_data)
+            self._set_tags(post, tag_names, current_ids=set())
         return post
 
     def update(self, instance, validated_data):
         tag_names = validated_data.pop('tag_names', None)
-        instance = super().update(instance, validated_data)
-        if tag_names is not None:
-            instance.tags.clear()  
-            self._add_tags(instance, tag_names)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if tag_names is not None:
+                self._set_tags(instance, tag_names)
         return instance
 
-    def _add_tags(self, post, tag_names):
-        for tag_name in tag_names:
-            tag, created = Tag.objects.get_or_create(
-                name=tag_name.strip(),
-                defaults={'slug': tag_name.lower().replace(' ', '-')}
+    def _set_tags(self, post, tag_names, current_ids=None):
+        """
+        Remplace les tags du post en quelques requêtes, quel que soit leur nombre :
+        tags manquants créés d'un seul `bulk_create`, puis seuls les liens ajoutés
+        ou retirés sont écrits dans la table de liaison.
+        """
+        wanted = {}
+        for name in tag_names:
+            name = name.strip()
+            if name:
+                # Même règle que Tag.save : deux noms de même slug désignent le même tag
+                wanted.setdefault(tag_slug(name), name)
+        tags = self._find_tags(wanted)
+        missing = {slug: name for slug, name in wanted.items() if slug not in tags}
+        if missing:
+            # ignore_conflicts : un tag créé entre-temps par une requête concurrente n'est pas une erreur
+            Tag.objects.bulk_create(
+                [Tag(name=name, slug=slug) for slug, name in missing.items()], ignore_conflicts=True
             )
-            post.tags.add(tag)
+            tags.update(self._find_tags(missing))
+            transaction.on_commit(lambda: cache.bump('global', 'tags'))
+
+        wanted_ids = {tag.pk for tag in tags.values()}
+        if current_ids is None:
+            current_ids = set(post.tags.values_list('pk', flat=True))
+        if current_ids - wanted_ids:
+            post.tags.remove(*(current_ids - wanted_ids))
+        if wanted_ids - current_ids:
+            post.tags.add(*(wanted_ids - current_ids))
+
+    def _find_tags(self, wanted):
+        """{slug: Tag} pour les slugs demandés, en retrouvant aussi un tag par son nom exact."""
+        if not wanted:
+            return {}
+        found = {}
+        for tag in Tag.objects.filter(Q(slug__in=wanted) | Q(name__in=wanted.values())):
+            slug = tag.slug if tag.slug in wanted else tag_slug(tag.name)
+            found.setdefault(slug, tag)
+        return found
 
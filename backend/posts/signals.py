@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import author_stats, cache, search, timeline
+from .models import Comment, Post, Reaction, Tag
+
+
+def _bump_after_commit(*scopes):
+    # Après le commit : un lecteur concurrent ne peut pas remettre en cache l'ancien état
+    transaction.on_commit(lambda: cache.bump(*scopes))
+
+
+def _post_scopes(post_id, author_id):
+    scopes = ['global', f'post:{post_id}']
+    if author_id is not None:
+        scopes.append(f'author:{author_id}')
+    return scopes
+
+
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    _bump_after_commit(*_post_scopes(instance.pk, instance.author_id))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Reaction)
+def invalidate_post_children(sender, instance, **kwargs):
+    # Le post peut déjà avoir été supprimé (cascade) : son propre signal s'en charge
+    author_id = Post.objects.filter(pk=instance.post_id).values_list('author_id', flat=True).first()
+    _bump_after_commit(*_post_scopes(instance.post_id, author_id))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # tag.posts.add(...) : chaque post concerné change
+        _bump_after_commit('global', 'tags', *[f'post:{pk}' for pk in pk_set or []])
+    else:
+        _bump_after_commit(*_post_scopes(instance.pk, instance.author_id))
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tags(sender, instance, **kwargs):
+    _bump_after_commit('global', 'tags')
+
+
+@receiver(post_save, sender=Post)
+def refresh_author_stats(sender, instance, **kwargs):
+    author_stats.refresh_after_commit(instance.author_id, check_author=False)
+
+
+@receiver(post_delete, sender=Post)
+def refresh_author_stats_after_delete(sender, instance, **kwargs):
+    # Suppression en cascade de l'auteur : ses statistiques disparaissent avec lui
+    author_stats.refresh_after_commit(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+    timeline.post_saved(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+    timeline.post_deleted(instance.pk)
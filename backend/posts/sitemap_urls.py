@@ -0,0 +1,8 @@
+from django.urls import path
+from . import sitemaps
+
+# Sitemaps, servis à la racine du site (voir posts/sitemaps.py)
+urlpatterns = [
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap_index'),
+    path('sitemap-posts-<int:shard>.xml', sitemaps.sitemap_posts, name='sitemap_posts'),
+]
@@ -0,0 +1,210 @@
+"""
+Sitemaps des posts publiés, pour les robots d'indexation.
+
+/sitemap.xml est un index qui liste des fichiers /sitemap-posts-<n>.xml. Le
+fichier n contient les posts d'ids [n * SITEMAP_LIMIT, (n + 1) * SITEMAP_LIMIT) :
+au plus 50 000 URLs (limite du protocole), et un post ne change jamais de
+fichier. Chaque fichier est écrit au fil d'un curseur (`iterator`) dans une
+`StreamingHttpResponse` : la mémoire ne dépend pas du nombre de posts.
+
+Les mêmes fichiers peuvent être pré-rendus, en clair et compressés, dans
+SITEMAP_ROOT (`manage.py render_sitemaps`) : les vues servent alors le fichier
+présent sur disque, sans requête SQL, avec des validateurs tirés de son `stat`.
+Un nouveau rendu, même serveur démarré, est servi dès qu'il est écrit.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F, Max
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import cache, timeline
+from .feeds import post_url
+from .models import Post
+
+# Limite du protocole sitemaps : 50 000 URLs par fichier
+SITEMAP_LIMIT = 50000
+CHUNK_SIZE = 2000
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def _lastmod(moment):
+    return moment.isoformat(timespec='seconds')
+
+
+def shard_posts(shard):
+    return Post.objects.published().filter(
+        pk__gte=shard * SITEMAP_LIMIT, pk__lt=(shard + 1) * SITEMAP_LIMIT
+    )
+
+
+def shards():
+    """[(n, lastmod)] des fichiers non vides, en une requête groupée."""
+    rows = (
+        Post.objects.published()
+        .annotate(shard=F('id') / SITEMAP_LIMIT)
+        .values('shard')
+        .annotate(lastmod=Max('updated_at'))
+        .order_by('shard')
+    )
+    return [(row['shard'], row['lastmod']) for row in rows]
+
+
+def render_index(shard_url, entries):
+    """Index des sitemaps ; `shard_url(n)` donne l'URL absolue du fichier n."""
+    yield f'{XML_HEADER}<sitemapindex xmlns="{NAMESPACE}">\n'
+    for shard, lastmod in entries:
+        yield (
+            f'<sitemap><loc>{escape(shard_url(shard))}</loc>'
+            f'<lastmod>{_lastmod(lastmod)}</lastmod></sitemap>\n'
+        )
+    yield '</sitemapindex>\n'
+
+
+def render_shard(shard):
+    """Fichier n, produit par lots de CHUNK_SIZE posts."""
+    yield f'{XML_HEADER}<urlset xmlns="{NAMESPACE}">\n'
+    rows = shard_posts(shard).order_by('id').values_list('id', 'updated_at').iterator(chunk_size=CHUNK_SIZE)
+    lines = []
+    for post_id, updated_at in rows:
+        lines.append(
+            f'<url><loc>{escape(post_url(post_id))}</loc><lastmod>{_lastmod(updated_at)}</lastmod></url>\n'
+        )
+        if len(lines) == CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+    yield '</urlset>\n'
+
+
+def sitemap_etag(request, **kwargs):
+    # Toute écriture sur un post incrémente la version globale
+    [version] = cache.get_versions(['global'])
+    raw = f'{version}|{request.path}'
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def sitemap_last_modified(request, **kwargs):
+    return cache.last_bumped('global')
+
+
+def prerendered_file(request):
+    """(chemin, encodage) du fichier pré-rendu de SITEMAP_ROOT pour cette URL, ou None."""
+    if not settings.SITEMAP_ROOT:
+        return None
+    path = os.path.join(settings.SITEMAP_ROOT, os.path.basename(request.path))
+    if 'gzip' in request.headers.get('Accept-Encoding', '') and os.path.exists(f'{path}.gz'):
+        return f'{path}.gz', 'gzip'
+    if os.path.exists(path):
+        return path, None
+    return None
+
+
+def _file_stat(request):
+    if not hasattr(request, '_sitemap_stat'):
+        request._sitemap_stat = os.stat(request._sitemap_file[0])
+    return request._sitemap_stat
+
+
+def file_etag(request, **kwargs):
+    stat = _file_stat(request)
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def file_last_modified(request, **kwargs):
+    return datetime.fromtimestamp(_file_stat(request).st_mtime, tz=dt_timezone.utc)
+
+
+@condition(etag_func=file_etag, last_modified_func=file_last_modified)
+def serve_file(request, **kwargs):
+    path, encoding = request._sitemap_file
+    # Fichier remplacé par os.replace : le descripteur ouvert garde l'ancienne version entière
+    response = FileResponse(open(path, 'rb'), content_type=CONTENT_TYPE, filename=os.path.basename(request.path))
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def conditional_sitemap(view):
+    """
+    Fichier pré-rendu s'il existe, sinon rendu en flux ; 304 sur le `stat` du fichier
+    ou sur la version globale du cache. Les posts programmés sont publiés avant.
+    """
+    handler = condition(etag_func=sitemap_etag, last_modified_func=sitemap_last_modified)(view)
+
+    def wrapper(request, **kwargs):
+        timeline.publish_due()
+        request._sitemap_file = prerendered_file(request)
+        if request._sitemap_file:
+            response = serve_file(request, **kwargs)
+        else:
+            response = handler(request, **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    return wrapper
+
+
+@conditional_sitemap
+def sitemap_index(request):
+    def shard_url(shard):
+        return request.build_absolute_uri(reverse('sitemap_posts', args=[shard]))
+
+    return StreamingHttpResponse(render_index(shard_url, shards()), content_type=CONTENT_TYPE)
+
+
+@conditional_sitemap
+def sitemap_posts(request, shard):
+    if not shard_posts(shard).exists():
+        raise Http404("Sitemap vide")
+    return StreamingHttpResponse(render_shard(shard), content_type=CONTENT_TYPE)
+
+
+def _write(directory, name, chunks):
+    """Écrit `name` et sa version `name.gz`, servie aux clients qui acceptent gzip."""
+    # Fichiers temporaires renommés à la fin : jamais de sitemap partiel servi
+    paths = []
+    fd, plain = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    compressed = f'{plain}.gz'
+    with os.fdopen(fd, 'wb') as out, gzip.open(compressed, 'wb') as gz:
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            out.write(data)
+            gz.write(data)
+    for temp, final in ((plain, name), (compressed, f'{name}.gz')):
+        os.chmod(temp, 0o644)
+        os.replace(temp, os.path.join(directory, final))
+        paths.append(final)
+    return paths
+
+
+def write_files(directory, base_url):
+    """Pré-rend l'index et tous les fichiers dans `directory` ; renvoie les noms écrits."""
+    os.makedirs(directory, exist_ok=True)
+    base_url = base_url.rstrip('/')
+    entries = shards()
+    written = []
+    for shard, _ in entries:
+        written += _write(directory, f'sitemap-posts-{shard}.xml', render_shard(shard))
+    written += _write(
+        directory, 'sitemap.xml', render_index(lambda shard: f'{base_url}/sitemap-posts-{shard}.xml', entries)
+    )
+    # Fichiers d'anciens découpages devenus vides
+    current = set(written)
+    for name in os.listdir(directory):
+        if name.startswith('sitemap-posts-') and name not in current:
+            os.remove(os.path.join(directory, name))
+    return written
@@ -0,0 +1,160 @@
+"""
+Streaming Server-Sent Events des suggestions IA.
+
+Le flux OpenAI est ouvert dans la vue, avant la réponse : une erreur à l'ouverture
+(limite de débit, timeout...) garde donc le statut HTTP de l'appel bloquant. Les
+erreurs survenues ensuite arrivent en événement `error`.
+
+Servi par l'application ASGI (blog_backend/asgi.py), le flux est relayé par un
+générateur asynchrone et n'occupe aucun thread pendant la génération. Sous WSGI,
+un générateur synchrone équivalent occupe le worker le temps du flux.
+
+Événements : `token` {"text"}, puis `done` {"cached"} ou `error` {"status", "error"}.
+"""
+import json
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework.renderers import BaseRenderer
+
+from . import ai, limits, metrics
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Permet la négociation `Accept: text/event-stream` ; les erreurs DRF deviennent un événement `error`."""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        payload = data if isinstance(data, dict) else {'error': data}
+        if response is not None:
+            payload = {'status': response.status_code, **payload}
+        return event('error', payload).encode(self.charset)
+
+
+def event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def is_asgi(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def open_stream(request, kwargs):
+    """Ouvre le flux de complétion ; lève les mêmes exceptions que `ai.rewrite`."""
+    if is_asgi(request):
+        # Ouvert sur la boucle d'événements du serveur, qui relaiera ensuite le flux
+        return async_to_sync(ai.get_async_client().completions.create)(**kwargs)
+    return ai.get_client().completions.create(**kwargs)
+
+
+def _chunk_text(chunk):
+    return (chunk.choices[0].text or '') if chunk.choices else ''
+
+
+class StreamedCall:
+    """
+    Un appel en streaming admis par posts/limits.py : la place du limiteur est
+    gardée jusqu'à la fin du flux et les tokens reçus sont décomptés du budget,
+    même si le client se déconnecte avant la fin.
+    """
+
+    def __init__(self, cache_key, user_id, prompt_tokens):
+        self.cache_key = cache_key
+        self.user_id = user_id
+        self.prompt_tokens = prompt_tokens
+        self.parts = []
+        self.started = time.perf_counter()
+
+    def token(self, chunk):
+        text = _chunk_text(chunk)
+        if not text:
+            return None
+        self.parts.append(text)
+        return event('token', {'text': text})
+
+    def fail(self, exc):
+        limits.record_failure(exc)
+        status_code, body, _ = ai.error_response(exc)
+        return event('error', {'status': status_code, **body})
+
+    def finish(self):
+        """Événement final ; le texte complet est mémorisé comme pour l'appel bloquant."""
+        limits.record_success()
+        rewritten = ''.join(self.parts).strip()
+        if not rewritten:
+            status_code, body, _ = ai.error_response(ai.EmptyCompletionError())
+            return event('error', {'status': status_code, **body})
+        ai.store_rewrite(self.cache_key, rewritten)
+        return event('done', {'cached': False})
+
+    def close(self):
+        limits.release_slot()
+        metrics.record_duration('ai.completion', time.perf_counter() - self.started)
+        limits.charge(self.user_id, self.prompt_tokens + ai.count_tokens(''.join(self.parts)))
+
+
+def relay(stream, call):
+    try:
+        try:
+            for chunk in stream:
+                data = call.token(chunk)
+                if data:
+                    yield data
+        except Exception as exc:
+            yield call.fail(exc)
+            return
+        finally:
+            # Client déconnecté ou flux terminé : libérer la connexion vers OpenRouter
+            stream.close()
+        yield call.finish()
+    finally:
+        call.close()
+
+
+async def arelay(stream, call):
+    try:
+        try:
+            async for chunk in stream:
+                data = call.token(chunk)
+                if data:
+                    yield data
+        except Exception as exc:
+            yield await sync_to_async(call.fail)(exc)
+            return
+        finally:
+            await stream.close()
+        yield await sync_to_async(call.finish)()
+    finally:
+        await sync_to_async(call.close)()
+
+
+def cached_events(rewritten):
+    yield event('token', {'text': rewritten})
+    yield event('done', {'cached': True})
+
+
+async def acached_events(rewritten):
+    for chunk in cached_events(rewritten):
+        yield chunk
+
+
+def event_stream(request, text):
+    """Itérable d'événements adapté au serveur (ASGI ou WSGI) ; lève les erreurs d'ouverture."""
+    cache_key = ai.suggestion_cache_key(text)
+    cached = ai.get_cached_rewrite(cache_key)
+    if cached is not None:
+        return acached_events(cached) if is_asgi(request) else cached_events(cached)
+    kwargs = ai.completion_kwargs(text, stream=True)
+    call = StreamedCall(cache_key, request.user.pk, ai.count_tokens(kwargs['prompt']))
+    limits.admit(call.user_id, call.prompt_tokens, ai.MAX_RESPONSE_TOKENS)
+    try:
+        stream = open_stream(request, kwargs)
+    except Exception as exc:
+        limits.release_slot()
+        limits.record_failure(exc)
+        raise
+    return arelay(stream, call) if is_asgi(request) else relay(stream, call)
@@ -0,0 +1,27 @@
+# posts/tests/test_benchmarks.py
+from unittest import mock
+from django.test import TestCase, override_settings
+from posts import benchmarks
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+# tiktoken télécharge ses tables BPE au premier appel : pas de réseau dans les tests
+@mock.patch('posts.ai.truncate_text', lambda text, max_tokens: text)
+@mock.patch('posts.ai.count_tokens', lambda text: len(text.split()))
+@override_settings(RATELIMIT_ENABLE=False, SUGGESTION_WORKER_MODE='external', EMAIL_OUTBOX_MODE='external')
+class RouteBenchmarkTests(TestCase):
+    def test_every_route_has_a_scenario_and_a_budget(self):
+        self.assertEqual(benchmarks.uncovered_routes(), [])
+        self.assertEqual(
+            {scenario.name for scenario in benchmarks.scenarios()}, set(benchmarks.ROUTE_BUDGETS)
+        )
+
+    def test_routes_stay_within_query_budgets(self):
+        results = benchmarks.run(iterations=1)
+        for name, result in results.items():
+            # Les budgets de latence dépendent de la machine : seuls statuts et requêtes sont vérifiés ici
+            violations = [v for v in result['violations'] if not v.startswith('p95')]
+            self.assertEqual(violations, [], name)
+            self.assertGreater(result['bytes'], 0, name)
@@ -0,0 +1,91 @@
+# posts/tests/test_feeds.py
+import json
+from datetime import timedelta
+from django.test import TestCase
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from users.models import User
+from posts.models import Post, Tag
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', 'author@example.com', 'TestPassword123')
+        self.other = User.objects.create_user('other', 'other@example.com', 'TestPassword123')
+        self.tag = Tag.objects.create(name='Django')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(title='Post tagué', content='Contenu ' * 200, author=self.author)
+            self.post.tags.add(self.tag)
+            self.other_post = Post.objects.create(title='Post de other', content='Contenu', author=self.other)
+            self.scheduled = Post.objects.create(
+                title='Programmé', content='Contenu', author=self.author,
+                published_at=timezone.now() + timedelta(hours=1),
+            )
+
+    def test_formats_and_content_types(self):
+        response = self.client.get(reverse('feed_rss'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('application/rss+xml'))
+        self.assertContains(response, 'Post tagué')
+        self.assertContains(response, '<category>Django</category>')
+        self.assertNotContains(response, 'Programmé')
+
+        response = self.client.get(reverse('feed_atom'))
+        self.assertTrue(response['Content-Type'].startswith('application/atom+xml'))
+        self.assertContains(response, 'Post de other')
+
+        response = self.client.get(reverse('feed_json'))
+        self.assertTrue(response['Content-Type'].startswith('application/feed+json'))
+        feed = json.loads(response.content)
+        self.assertEqual(feed['version'], 'https://jsonfeed.org/version/1.1')
+        self.assertEqual([item['title'] for item in feed['items']], ['Post de other', 'Post tagué'])
+        item = feed['items'][1]
+        self.assertTrue(item['url'].endswith(f'/posts/{self.post.pk}'))
+        self.assertEqual(item['tags'], ['Django'])
+        self.assertEqual(item['authors'], [{'name': 'author'}])
+        # Extrait seulement : le texte complet reste sur le site
+        self.assertLessEqual(len(item['content_text']), 500)
+
+    def test_tag_and_author_variants(self):
+        feed = json.loads(self.client.get(reverse('tag_feed_json', args=[self.tag.slug])).content)
+        self.assertEqual([item['title'] for item in feed['items']], ['Post tagué'])
+        feed = json.loads(self.client.get(reverse('author_feed_json', args=[self.other.pk])).content)
+        self.assertEqual([item['title'] for item in feed['items']], ['Post de other'])
+
+        self.assertEqual(self.client.get(reverse('tag_feed_rss', args=['inconnu'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('author_feed_atom', args=[999999])).status_code, 404)
+
+    def test_conditional_get_costs_no_query(self):
+        url = reverse('feed_rss')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Sans validateur, le flux rendu est servi depuis le cache
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_write_invalidates_the_feed(self):
+        url = reverse('author_feed_rss', args=[self.author.pk])
+        etag = self.client.get(url)['ETag']
+        other_etag = self.client.get(reverse('author_feed_rss', args=[self.other.pk]))['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Titre modifié'
+            self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Titre modifié')
+        # Le flux d'un autre auteur reste valide
+        response = self.client.get(reverse('author_feed_rss', args=[self.other.pk]), HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(response.status_code, 304)
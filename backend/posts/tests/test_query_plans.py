@@ -0,0 +1,86 @@
+# posts/tests/test_query_plans.py
+"""
+Vérifie avec EXPLAIN que les requêtes les plus fréquentes utilisent un index.
+Échoue si l'une d'elles retombe sur un parcours complet de table ou un tri.
+"""
+import re
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from users.models import User
+from posts.models import Post, Comment, Reaction, Tag
+
+PLAN_MARKERS = {
+    'sqlite': {
+        'scan': re.compile(r'\bSCAN\b'),
+        'sort': re.compile(r'USE TEMP B-TREE'),
+    },
+    'postgresql': {
+        'scan': re.compile(r'Seq Scan'),
+        'sort': re.compile(r'(^|->)\s*(Incremental )?Sort\b', re.MULTILINE),
+    },
+}
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author', email='author@example.com')
+        cls.reader = User.objects.create(username='reader', email='reader@example.com')
+        tags = [Tag.objects.create(name=name) for name in ('Django', 'React', 'DevOps', 'UX', 'Data')]
+        now = timezone.now()
+        posts = Post.objects.bulk_create([
+            Post(title=f'Post {i}', content='Contenu', author=cls.author if i % 2 else cls.reader,
+                 published_at=now - timedelta(hours=i))
+            for i in range(500)
+        ])
+        cls.post = posts[0]
+        Post.tags.through.objects.bulk_create([
+            Post.tags.through(post_id=post.id, tag_id=tags[i % len(tags)].id) for i, post in enumerate(posts)
+        ])
+        Comment.objects.bulk_create([
+            Comment(post=post, author=cls.reader, content='Bravo') for post in posts for _ in range(3)
+        ])
+        Reaction.objects.bulk_create([
+            Reaction(post=post, user=cls.reader, emoji=emoji) for post in posts for emoji in ('LIKE', 'WOW')
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        if connection.vendor not in PLAN_MARKERS:
+            self.skipTest(f'Pas de règles EXPLAIN pour {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            # Sur une petite table le planificateur préfère un Seq Scan : on l'interdit
+            # pour vérifier qu'un index utilisable existe bien.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_bitmapscan = off')
+
+    def assertIndexedPlan(self, queryset, allow_sort=False):
+        plan = queryset.explain()
+        markers = PLAN_MARKERS[connection.vendor]
+        self.assertIsNone(markers['scan'].search(plan), f'Parcours complet de table :\n{plan}')
+        if not allow_sort:
+            self.assertIsNone(markers['sort'].search(plan), f'Tri non couvert par un index :\n{plan}')
+
+    def test_feed(self):
+        self.assertIndexedPlan(Post.objects.published().order_by('-published_at', '-id')[:10])
+
+    def test_author_feed(self):
+        self.assertIndexedPlan(
+            Post.objects.filter(author=self.author).published().order_by('-published_at', '-id')[:10]
+        )
+
+    def test_post_comments(self):
+        self.assertIndexedPlan(Comment.objects.filter(post=self.post).order_by('created_at', 'id')[:10])
+
+    def test_post_reactions_by_emoji(self):
+        self.assertIndexedPlan(Reaction.objects.filter(post=self.post, emoji='LIKE'))
+
+    def test_tag_filter(self):
+        # Le tri ne porte que sur les posts du tag, déjà trouvés par index
+        self.assertIndexedPlan(
+            Post.objects.filter(tags__slug='django').order_by('-published_at', '-id')[:10],
+            allow_sort=True,
+        )
@@ -0,0 +1,86 @@
+# posts/tests/test_server_timing.py
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+from users.models import User
+from posts.models import Post
+from utils.server_timing import RequestTimings, _current, install, sql_shape
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user('author', 'author@example.com', 'TestPassword123', is_staff=True)
+        self.client.force_authenticate(self.author)
+        self.post = Post.objects.create(title='Post', content='Contenu', author=self.author)
+
+    def metrics(self, response):
+        return {part.split(';')[0].strip(): part for part in response['Server-Timing'].split(',')}
+
+    def count(self, metric):
+        return int(metric.split('desc="')[1].split(' ')[0])
+
+    def test_header_reports_db_cache_and_serializer(self):
+        response = self.client.get(reverse('post_detail', args=[self.post.pk]))
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {'db', 'cache', 'ser', 'http', 'app'})
+        self.assertIn('misses', metrics['cache'])
+        cold_queries, cold_hits = self.count(metrics['db']), self.count(metrics['cache'])
+        self.assertGreater(cold_queries, 0)
+
+        # Deuxième lecture servie par le cache des réponses : moins de SQL, plus de hits
+        metrics = self.metrics(self.client.get(reverse('post_detail', args=[self.post.pk])))
+        self.assertLess(self.count(metrics['db']), cold_queries)
+        self.assertGreater(self.count(metrics['cache']), cold_hits)
+
+    def test_request_header_toggles_instrumentation(self):
+        response = self.client.get(reverse('post_list'), HTTP_X_SERVER_TIMING='0')
+        self.assertNotIn('Server-Timing', response)
+        with override_settings(SERVER_TIMING_ENABLED=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('post_list')))
+            response = self.client.get(reverse('post_list'), HTTP_X_SERVER_TIMING='1')
+            self.assertIn('Server-Timing', response)
+
+    def test_header_is_hidden_from_the_public(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse('post_list'), HTTP_X_SERVER_TIMING='1')
+        self.assertNotIn('Server-Timing', response)
+        with override_settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get(reverse('post_list')))
+
+    def test_get_many_is_counted_once(self):
+        install()
+        cache.set_many({'a': 1})
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            cache.get_many(['a', 'b', 'c'])
+        finally:
+            _current.reset(token)
+        self.assertEqual((timings.cache_hits, timings.cache_misses), (1, 2))
+
+    def test_repeated_query_shapes_are_grouped(self):
+        self.assertEqual(
+            sql_shape('SELECT * FROM t WHERE id IN (%s, %s, %s)'), sql_shape('SELECT * FROM t WHERE id IN (%s)')
+        )
+        timings = RequestTimings()
+        for _ in range(4):
+            timings.record_query('SELECT * FROM tag WHERE name = %s', 0.001)
+        timings.record_query('SELECT * FROM post', 0.001)
+        self.assertEqual(timings.repeated_queries(3), [('SELECT * FROM tag WHERE name = %s', 4)])
+
+    @override_settings(SERVER_TIMING_N_PLUS_ONE_THRESHOLD=0)
+    def test_n_plus_one_warning_is_structured(self):
+        with mock.patch('utils.server_timing.logger.warning') as warning:
+            self.client.get(reverse('post_detail', args=[self.post.pk]))
+        self.assertTrue(warning.called)
+        details = warning.call_args.kwargs['extra']
+        self.assertEqual(details['event'], 'n_plus_one')
+        self.assertEqual(details['view'], 'post_detail')
+        self.assertEqual(details['method'], 'GET')
@@ -0,0 +1,122 @@
+# posts/tests/test_sitemaps.py
+import gzip
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from xml.etree import ElementTree
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from users.models import User
+from posts.models import Post
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', 'author@example.com', 'TestPassword123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [
+                Post.objects.create(title=f'Post {i}', content='Contenu', author=self.author) for i in range(5)
+            ]
+            self.scheduled = Post.objects.create(
+                title='Programmé', content='Contenu', author=self.author,
+                published_at=timezone.now() + timedelta(hours=1),
+            )
+        # Fichiers de 3 ids pour tester le découpage sans 50 000 posts
+        patcher = mock.patch('posts.sitemaps.SITEMAP_LIMIT', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def shard_of(self, post):
+        return post.pk // 3
+
+    def test_index_lists_non_empty_shards(self):
+        response = self.client.get(reverse('sitemap_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('application/xml'))
+        body = self.content(response)
+        ElementTree.fromstring(body)
+        shards = sorted({self.shard_of(post) for post in self.posts})
+        self.assertEqual(body.count('<sitemap>'), len(shards))
+        for shard in shards:
+            self.assertIn(f'http://testserver/sitemap-posts-{shard}.xml', body)
+
+    def test_shards_stream_every_published_post(self):
+        seen = ''
+        for shard in sorted({self.shard_of(post) for post in self.posts}):
+            # Existence puis curseur, quel que soit le nombre de posts du fichier
+            with self.assertNumQueries(2):
+                body = self.content(self.client.get(reverse('sitemap_posts', args=[shard])))
+            ElementTree.fromstring(body)
+            seen += body
+        for post in self.posts:
+            self.assertIn(f'/posts/{post.pk}</loc>', seen)
+        self.assertNotIn(f'/posts/{self.scheduled.pk}</loc>', seen)
+
+        response = self.client.get(reverse('sitemap_posts', args=[self.shard_of(self.scheduled) + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get(self):
+        url = reverse('sitemap_index')
+        response = self.client.get(url)
+        self.content(response)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_render_command_writes_plain_and_gzipped_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stale = os.path.join(directory, 'sitemap-posts-999.xml')
+            open(stale, 'w').close()
+            out = StringIO()
+            call_command('render_sitemaps', output=directory, base_url='https://api.example.com/', stdout=out)
+
+            shards = sorted({self.shard_of(post) for post in self.posts})
+            expected = {f'sitemap-posts-{shard}.xml' for shard in shards} | {'sitemap.xml'}
+            expected |= {f'{name}.gz' for name in expected}
+            self.assertEqual(set(os.listdir(directory)), expected)
+            self.assertIn(f'Sitemap files written: {len(expected)}', out.getvalue())
+
+            with open(os.path.join(directory, 'sitemap.xml')) as index:
+                self.assertIn(f'https://api.example.com/sitemap-posts-{shards[0]}.xml', index.read())
+            with open(os.path.join(directory, f'sitemap-posts-{shards[0]}.xml'), 'rb') as plain:
+                with gzip.open(os.path.join(directory, f'sitemap-posts-{shards[0]}.xml.gz')) as compressed:
+                    self.assertEqual(plain.read(), compressed.read())
+
+    def test_prerendered_files_are_served_and_follow_new_renders(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(SITEMAP_ROOT=directory):
+            call_command('render_sitemaps', base_url='https://api.example.com', stdout=StringIO())
+            url = reverse('sitemap_index')
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+                body = gzip.decompress(b''.join(response.streaming_content)).decode()
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('https://api.example.com/sitemap-posts-', body)
+            etag = response['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response.status_code, 304)
+
+            # Nouveau rendu serveur démarré : nouveau fichier de posts servi, nouvel ETag
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(title='Nouveau', content='Contenu', author=self.author)
+            Post.objects.filter(pk=post.pk).update(id=post.pk + 30)
+            call_command('render_sitemaps', base_url='https://api.example.com', stdout=StringIO())
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(url)
+            shard = (post.pk + 30) // 3
+            self.assertIn(f'sitemap-posts-{shard}.xml', self.content(response))
+            response = self.client.get(reverse('sitemap_posts', args=[shard]))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(f'/posts/{post.pk + 30}</loc>', self.content(response))
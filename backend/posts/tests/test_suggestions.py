@@ -0,0 +1,336 @@
+# posts/tests/test_suggestions.py
+from unittest import mock
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.urls import reverse
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.utils import timezone
+from io import StringIO
+import json
+import subprocess
+import sys
+import time
+import httpx
+from openai import RateLimitError, APITimeoutError
+from users.models import User
+from posts.models import Post, SuggestionJob
+from posts import ai, jobs, limits
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+def rate_limit_error():
+    request = httpx.Request('POST', 'https://openrouter.ai/api/v1/completions')
+    response = httpx.Response(429, headers={'Retry-After': '30'}, request=request)
+    return RateLimitError('rate limited', response=response, body=None)
+
+# tiktoken télécharge ses tables BPE au premier appel : pas de réseau dans les tests
+@mock.patch('posts.ai.truncate_text', lambda text, max_tokens: text)
+@override_settings(SUGGESTION_WORKER_MODE='inline')
+class SuggestionJobTests(TestCase):
+    def setUp(self):
+        caches['suggestions'].clear()
+        self.client = APIClient()
+        self.admin = User(username='admin', email='admin@example.com', is_staff=True)
+        self.admin.set_password('TestPassword123')
+        self.admin.save()
+        self.post = Post.objects.create(title='Post', content='Texte à réécrire', author=self.admin)
+        self.url = reverse('post-suggestions', args=[self.post.id])
+        self.client.force_authenticate(self.admin)
+
+    def enqueue(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response
+
+    @mock.patch('posts.ai.rewrite', return_value='Texte réécrit')
+    def test_enqueue_then_poll(self, rewrite):
+        response = self.enqueue(text='Mon texte')
+        self.assertEqual(response.data['status'], SuggestionJob.PENDING)
+        rewrite.assert_called_once_with('Mon texte', self.admin.pk)
+
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], SuggestionJob.DONE)
+        self.assertEqual(response.data['réponse'], 'Texte réécrit')
+
+    @mock.patch('posts.ai.rewrite', side_effect=rate_limit_error())
+    def test_failed_job_keeps_error_mapping(self, rewrite):
+        response = self.client.get(self.enqueue()['Location'])
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(response.data['status'], SuggestionJob.FAILED)
+        self.assertEqual(response.data['error'], 'Limite de débit atteinte')
+
+    @mock.patch('posts.ai.rewrite', side_effect=APITimeoutError(httpx.Request('POST', 'https://openrouter.ai')))
+    def test_timeout_maps_to_504(self, rewrite):
+        response = self.client.get(self.enqueue()['Location'])
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+
+    def test_job_is_private_to_its_user(self):
+        with mock.patch('posts.ai.rewrite', return_value='ok'):
+            location = self.enqueue()['Location']
+        other = User(username='other', email='other@example.com', is_staff=True)
+        other.set_password('TestPassword123')
+        other.save()
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(location).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(SUGGESTION_WORKER_MODE='external')
+    @mock.patch('posts.ai.rewrite', return_value='Texte réécrit')
+    def test_external_worker_drains_queue(self, rewrite):
+        self.enqueue()
+        self.enqueue()
+        rewrite.assert_not_called()
+        out = StringIO()
+        call_command('process_suggestion_jobs', stdout=out)
+        self.assertIn('Jobs processed: 2', out.getvalue())
+        self.assertEqual(SuggestionJob.objects.filter(status=SuggestionJob.DONE).count(), 2)
+
+    @override_settings(SUGGESTION_WORKER_MODE='thread')
+    def test_orphaned_jobs_are_recovered_in_thread_mode(self):
+        orphan = SuggestionJob.objects.create(
+            post=self.post, user=self.admin, text='Orphelin', status=SuggestionJob.RUNNING,
+            started_at=timezone.now() - jobs.STALE_AFTER * 2,
+        )
+        waiting = SuggestionJob.objects.create(post=self.post, user=self.admin, text='En attente')
+        running = SuggestionJob.objects.create(
+            post=self.post, user=self.admin, text='En cours', status=SuggestionJob.RUNNING, started_at=timezone.now()
+        )
+        with mock.patch('posts.jobs._get_executor') as executor, mock.patch('posts.jobs._arm_timer') as arm:
+            jobs.start()
+        submitted = [call.args[1] for call in executor.return_value.submit.call_args_list]
+        self.assertEqual(submitted, [orphan.pk, waiting.pk])
+        arm.assert_called_once()
+        running.refresh_from_db()
+        self.assertEqual(running.status, SuggestionJob.RUNNING)
+
+# tiktoken télécharge ses tables BPE au premier appel : pas de réseau dans les tests
+@mock.patch('posts.ai.truncate_text', lambda text, max_tokens: text)
+@override_settings(SUGGESTION_WORKER_MODE='inline')
+class SuggestionMemoizationTests(TestCase):
+    def setUp(self):
+        caches['suggestions'].clear()
+        self.client = APIClient()
+        self.admin = User(username='admin', email='admin@example.com', is_staff=True)
+        self.admin.set_password('TestPassword123')
+        self.admin.save()
+        self.post = Post.objects.create(title='Post', content='Texte à réécrire', author=self.admin)
+        self.url = reverse('post-suggestions', args=[self.post.id])
+        self.client.force_authenticate(self.admin)
+
+    def post_text(self, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {'text': text}, format='json')
+
+    @mock.patch('posts.ai.rewrite', return_value='Texte réécrit')
+    def test_identical_request_is_served_from_cache(self, rewrite):
+        first = self.post_text('Mon texte')
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(self.client.get(first['Location']).data['cached'])
+
+        second = self.post_text('Mon texte')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertTrue(second.data['cached'])
+        self.assertEqual(second.data['réponse'], 'Texte réécrit')
+        rewrite.assert_called_once()
+
+    @mock.patch('posts.ai.rewrite', return_value='Texte réécrit')
+    def test_key_depends_on_text_and_model(self, rewrite):
+        self.post_text('Mon texte')
+        self.post_text('Un autre texte')
+        with mock.patch('posts.ai.MODEL_NAME', 'autre/modele'):
+            self.post_text('Mon texte')
+        self.assertEqual(rewrite.call_count, 3)
+
+    @mock.patch('posts.ai.rewrite', side_effect=rate_limit_error())
+    def test_failures_are_not_cached(self, rewrite):
+        self.post_text('Mon texte')
+        self.post_text('Mon texte')
+        self.assertEqual(rewrite.call_count, 2)
+
+
+def completion_chunks(*texts):
+    return [mock.Mock(choices=[mock.Mock(text=text)]) for text in texts]
+
+
+@mock.patch('posts.ai.truncate_text', lambda text, max_tokens: text)
+@mock.patch('posts.ai.count_tokens', lambda text: len(text.split()))
+class SuggestionStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['suggestions'].clear()
+        self.client = APIClient()
+        self.admin = User(username='admin', email='admin@example.com', is_staff=True)
+        self.admin.set_password('TestPassword123')
+        self.admin.save()
+        self.post = Post.objects.create(title='Post', content='Texte à réécrire', author=self.admin)
+        self.url = reverse('post-suggestions-stream', args=[self.post.id])
+        self.client.force_authenticate(self.admin)
+
+    def stream(self, **data):
+        return self.client.post(self.url, data, format='json', HTTP_ACCEPT='text/event-stream')
+
+    def events(self, response):
+        body = b''.join(response.streaming_content).decode()
+        return [
+            (block.split('\n')[0][len('event: '):], json.loads(block.split('\n')[1][len('data: '):]))
+            for block in body.strip().split('\n\n')
+        ]
+
+    @mock.patch('posts.ai._client')
+    def test_tokens_are_streamed_then_memoized(self, client):
+        create = client.completions.create
+        stream = mock.MagicMock()
+        stream.__iter__.return_value = iter(completion_chunks('Texte', ' réécrit'))
+        create.return_value = stream
+        response = self.stream(text='Mon texte')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(self.events(response), [
+            ('token', {'text': 'Texte'}),
+            ('token', {'text': ' réécrit'}),
+            ('done', {'cached': False}),
+        ])
+        self.assertTrue(create.call_args.kwargs['stream'])
+        stream.close.assert_called_once()
+
+        # Deuxième demande identique : servie par le cache, sans appel à l'IA
+        response = self.stream(text='Mon texte')
+        self.assertEqual(self.events(response), [
+            ('token', {'text': 'Texte réécrit'}),
+            ('done', {'cached': True}),
+        ])
+        create.assert_called_once()
+
+    @mock.patch('posts.ai._client')
+    def test_error_before_first_token_keeps_http_status(self, client):
+        client.completions.create.side_effect = rate_limit_error()
+        response = self.stream()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+    @mock.patch('posts.ai._client')
+    def test_error_mid_stream_is_an_event(self, client):
+        create = client.completions.create
+        def chunks():
+            yield from completion_chunks('Début')
+            raise APITimeoutError(httpx.Request('POST', 'https://openrouter.ai'))
+        stream = mock.MagicMock()
+        stream.__iter__.return_value = chunks()
+        create.return_value = stream
+        events = self.events(self.stream())
+        self.assertEqual(events[0], ('token', {'text': 'Début'}))
+        self.assertEqual(events[-1][0], 'error')
+        self.assertEqual(events[-1][1]['status'], status.HTTP_504_GATEWAY_TIMEOUT)
+        stream.close.assert_called_once()
+
+
+class LazyInitializationTests(TestCase):
+    def test_heavy_clients_are_not_imported_at_startup(self):
+        # Processus neuf : les autres tests ont déjà importé openai et tiktoken
+        code = (
+            "import django, sys; django.setup(); "
+            "import posts.urls, posts.jobs; "
+            "print('tiktoken' in sys.modules, 'openai' in sys.modules)"
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.split(), ['False', 'False'])
+
+    def test_client_is_created_once(self):
+        with mock.patch('posts.ai._client', None):
+            self.assertIs(ai.get_client(), ai.get_client())
+
+    @mock.patch('posts.ai._client')
+    @mock.patch('posts.ai.truncate_text', lambda text, max_tokens: text)
+    @mock.patch('posts.ai.count_tokens', lambda text: len(text.split()))
+    def test_completion_timings_are_recorded(self, client):
+        cache.clear()
+        client.completions.create.return_value = mock.Mock(choices=[mock.Mock(text='Texte réécrit')])
+        ai.rewrite('Mon texte')
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        api = APIClient()
+        api.force_authenticate(admin)
+        response = api.get(reverse('suggestion_metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['ai.completion']['count'], 1)
+        self.assertIsNotNone(response.data['ai.completion']['avg_ms'])
+
+
+def completion(text):
+    return mock.Mock(choices=[mock.Mock(text=text)])
+
+
+@mock.patch('posts.ai.truncate_text', lambda text, max_tokens: text)
+@mock.patch('posts.ai.count_tokens', lambda text: len(text.split()))
+@mock.patch('posts.ai._client')
+class OutboundLimitsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='x')
+
+    @override_settings(AI_BREAKER_THRESHOLD=2)
+    def test_breaker_fails_fast_after_repeated_errors(self, client):
+        create = client.completions.create
+        create.side_effect = APITimeoutError(httpx.Request('POST', 'https://openrouter.ai'))
+        for _ in range(2):
+            with self.assertRaises(APITimeoutError):
+                ai.rewrite('Mon texte')
+        with self.assertRaises(limits.CircuitOpenError) as raised:
+            ai.rewrite('Mon texte')
+        self.assertEqual(create.call_count, 2)
+        status_code, body, headers = ai.error_response(raised.exception)
+        self.assertEqual(status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', headers)
+
+    @override_settings(AI_BREAKER_THRESHOLD=1, AI_BREAKER_COOLDOWN=0)
+    def test_breaker_closes_after_successful_probe(self, client):
+        client.completions.create.side_effect = APITimeoutError(httpx.Request('POST', 'https://openrouter.ai'))
+        with self.assertRaises(APITimeoutError):
+            ai.rewrite('Mon texte')
+        client.completions.create.side_effect = None
+        client.completions.create.return_value = completion('Texte réécrit')
+        self.assertEqual(ai.rewrite('Mon texte'), 'Texte réécrit')
+        self.assertIsNone(cache.get(limits.BREAKER_OPEN_UNTIL_KEY))
+
+    def test_daily_token_budget(self, client):
+        client.completions.create.return_value = completion('Texte réécrit')
+        ai.rewrite('Mon texte', self.user.pk)
+        spent = limits.tokens_spent_today(self.user.pk)
+        self.assertGreater(spent, 0)
+        with override_settings(AI_DAILY_TOKEN_BUDGET=spent + 1):
+            with self.assertRaises(limits.TokenBudgetExceeded) as raised:
+                ai.rewrite('Mon texte', self.user.pk)
+        self.assertEqual(ai.error_response(raised.exception)[0], status.HTTP_429_TOO_MANY_REQUESTS)
+        client.completions.create.assert_called_once()
+
+    @override_settings(AI_MAX_CONCURRENT_CALLS=1, AI_QUEUE_TIMEOUT=0)
+    def test_concurrency_cap(self, client):
+        client.completions.create.return_value = completion('Texte réécrit')
+        limits.acquire_slot()
+        with self.assertRaises(limits.ConcurrencyLimitError):
+            ai.rewrite('Mon texte')
+        limits.release_slot()
+        self.assertEqual(ai.rewrite('Mon texte'), 'Texte réécrit')
+        # La place est rendue après l'appel
+        self.assertEqual(cache.get(limits.INFLIGHT_KEY), 0)
+
+    @override_settings(AI_MAX_CONCURRENT_CALLS=2, AI_QUEUE_TIMEOUT=0)
+    def test_slot_counter_lives_while_calls_keep_coming(self, client):
+        now = time.time()
+        with mock.patch('time.time', return_value=now):
+            limits.acquire_slot()
+        with mock.patch('time.time', return_value=now + limits.SLOT_TTL - 10):
+            limits.acquire_slot()
+        # Le premier appel n'a pas expiré le compteur : pas de troisième place
+        with mock.patch('time.time', return_value=now + limits.SLOT_TTL + 10):
+            self.assertEqual(cache.get(limits.INFLIGHT_KEY), 2)
+            with self.assertRaises(limits.ConcurrencyLimitError):
+                limits.acquire_slot()
+        limits.release_slot()
+        limits.release_slot()
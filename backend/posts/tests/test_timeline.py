@@ -0,0 +1,239 @@
+# posts/tests/test_timeline.py
+import os
+from unittest import mock, skipUnless
+from datetime import timedelta
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import User
+from posts.models import Post
+from posts import timeline
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+
+def redis_cache():
+    """
+    Cache django-redis pour les tests de l'index : TEST_REDIS_URL (base vidée à
+    chaque test), sinon fakeredis avec lupa pour les scripts Lua, sinon None.
+    """
+    if os.environ.get('TEST_REDIS_URL'):
+        return {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': os.environ['TEST_REDIS_URL']}
+    try:
+        import fakeredis
+        import lupa  # noqa: F401
+    except ImportError:
+        return None
+    return {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://fakeredis:6379/0',
+        'OPTIONS': {
+            'CONNECTION_POOL_KWARGS': {'connection_class': fakeredis.FakeConnection, 'server': fakeredis.FakeServer()},
+        },
+    }
+
+
+REDIS_CACHE = redis_cache()
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user('author', 'author@example.com', 'TestPassword123')
+        self.now = timezone.now()
+        # Deux posts à la même microseconde : l'id départage
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [
+                Post.objects.create(
+                    title=f'Post {i}', content='Contenu', author=self.author,
+                    published_at=self.now - timedelta(minutes=i // 2 * 2 + 1),
+                )
+                for i in range(7)
+            ]
+            self.scheduled = Post.objects.create(
+                title='Programmé', content='Contenu', author=self.author, published_at=self.now + timedelta(hours=1)
+            )
+        self.url = reverse('post_list')
+        # Ordre attendu du fil : published_at puis id décroissants
+        self.expected = [p.id for p in sorted(self.posts, key=lambda p: (p.published_at, p.id), reverse=True)]
+
+    def ids(self, response):
+        return [p['id'] for p in response.data['results']]
+
+    def test_pages_follow_published_at_then_id(self):
+        response = self.client.get(self.url, {'page_size': 3})
+        seen = self.ids(response)
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += self.ids(response)
+        self.assertEqual(seen, self.expected)
+
+        # Retour en arrière depuis la dernière page
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.ids(response), self.expected[3:6])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.ids(response), self.expected[:3])
+        self.assertIsNone(response.data['previous'])
+
+    def test_scheduled_post_enters_the_feed_when_due(self):
+        self.assertNotIn(self.scheduled.id, self.ids(self.client.get(self.url)))
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+        later = self.now + timedelta(hours=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.ids(response)[0], self.scheduled.id)
+
+    def test_reads_follow_writes(self):
+        post = self.posts[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            post.published_at = self.now + timedelta(days=1)
+            post.save()
+            self.posts[1].delete()
+        keys = timeline.read(limit=20)
+        self.assertEqual([timeline.parse_key(key)[1] for key in keys], self.expected[2:])
+
+    def test_posts_written_elsewhere_reach_the_feed(self):
+        # Sans signaux, comme un post écrit par un autre processus (seed_data, shell, autre worker)
+        self.client.get(self.url)
+        [post] = Post.objects.bulk_create([
+            Post(title='Ailleurs', content='Contenu', author=self.author, published_at=self.now)
+        ])
+        self.assertEqual(timeline.parse_key(timeline.read(limit=1)[0])[1], post.id)
+        cache.clear()
+        self.assertEqual(self.ids(self.client.get(self.url))[0], post.id)
+
+    def test_database_keyset_reads(self):
+        keys = timeline._read_database(None, None, 20)
+        self.assertEqual([timeline.parse_key(key)[1] for key in keys], self.expected)
+        self.assertEqual(timeline._read_database(keys[2], None, 3), keys[3:6])
+        self.assertEqual(timeline._read_database(None, keys[4], 3), keys[1:4])
+
+    def test_scheduled_post_from_another_process_is_picked_up(self):
+        self.client.get(self.url)
+        [post] = Post.objects.bulk_create([
+            Post(title='Programmé ailleurs', content='Contenu', author=self.author,
+                 published_at=self.now + timedelta(minutes=5))
+        ])
+        later = self.now + timedelta(minutes=10)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertIn(post.id, timeline.publish_due())
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.ids(response)[0], post.id)
+
+    def test_feed_page_cost_is_constant(self):
+        self.client.get(self.url)
+        cache.clear()
+        timeline.ensure_built()
+        # Posts de la page, tags préchargés
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(self.url, {'cursor': 'pas-un-curseur'})
+        self.assertEqual(response.status_code, 404)
+
+@skipUnless(REDIS_CACHE, "ni TEST_REDIS_URL ni fakeredis (avec lupa)")
+class RedisTimelineTests(TestCase):
+    """Le fil de production : index Redis et TimelinePagination."""
+
+    def setUp(self):
+        override = override_settings(CACHES={**settings.CACHES, 'default': REDIS_CACHE})
+        override.enable()
+        self.addCleanup(override.disable)
+        timeline._backend = None
+        self.addCleanup(setattr, timeline, '_backend', None)
+        cache.clear()
+
+        self.client = APIClient()
+        self.author = User.objects.create_user('author', 'author@example.com', 'TestPassword123')
+        self.now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [
+                Post.objects.create(
+                    title=f'Post {i}', content='Contenu', author=self.author,
+                    published_at=self.now - timedelta(minutes=i // 2 * 2 + 1),
+                )
+                for i in range(7)
+            ]
+            self.scheduled = Post.objects.create(
+                title='Programmé', content='Contenu', author=self.author, published_at=self.now + timedelta(hours=1)
+            )
+        self.url = reverse('post_list')
+        self.expected = [p.id for p in sorted(self.posts, key=lambda p: (p.published_at, p.id), reverse=True)]
+        self.assertTrue(timeline.uses_index())
+        self.assertTrue(timeline.ensure_built())
+
+    def ids(self, response):
+        return [p['id'] for p in response.data['results']]
+
+    def index_ids(self):
+        return [timeline.parse_key(key)[1] for key in timeline.read(limit=20)]
+
+    def test_cursors_cross_page_boundaries_both_ways(self):
+        response = self.client.get(self.url, {'page_size': 3})
+        self.assertIsNone(response.data['previous'])
+        seen = self.ids(response)
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += self.ids(response)
+        self.assertEqual(seen, self.expected)
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.ids(response), self.expected[3:6])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.ids(response), self.expected[:3])
+        self.assertIsNone(response.data['previous'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.ids(response), self.expected[3:6])
+
+    def test_scheduled_post_enters_after_publish_due(self):
+        self.assertNotIn(self.scheduled.id, self.index_ids())
+        later = self.now + timedelta(hours=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(timeline.publish_due(), [self.scheduled.id])
+            response = self.client.get(self.url)
+        self.assertEqual(self.ids(response)[0], self.scheduled.id)
+        self.assertEqual(timeline.publish_due(), [])
+
+    def test_unpublish_and_delete_leave_the_feed(self):
+        gone = [self.posts[0].id, self.posts[1].id]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].published_at = self.now + timedelta(days=1)
+            self.posts[0].save()
+            self.posts[1].delete()
+        self.assertEqual(self.index_ids(), [pk for pk in self.expected if pk not in gone])
+        self.assertEqual(self.ids(self.client.get(self.url)), [pk for pk in self.expected if pk not in gone])
+
+    def test_rebuild_keeps_writes_committed_during_the_read(self):
+        backend = timeline.get_backend()
+        timeline.reset()
+        [late] = Post.objects.bulk_create([
+            Post(title='Pendant la reconstruction', content='Contenu', author=self.author, published_at=self.now)
+        ])
+        removed = self.expected[0]
+
+        def rows():
+            # Lecture de la base faite, puis deux écritures commitées avant la fin de la reconstruction
+            read = list(Post.objects.exclude(pk=late.pk).order_by().values_list('id', 'published_at'))
+            backend.add(late.pk, late.published_at)
+            Post.objects.filter(pk=removed).delete()
+            backend.remove(removed)
+            # Le fil en place reste lisible, et à jour, pendant la reconstruction
+            live = [timeline.parse_key(key)[1] for key in backend.read(limit=20)]
+            self.assertEqual(live, [late.pk, *self.expected[1:]])
+            yield from read
+
+        self.assertTrue(backend.rebuild(rows()))
+        self.assertTrue(backend.is_built())
+        ids = self.index_ids()
+        self.assertEqual(ids[0], late.pk)
+        self.assertNotIn(removed, ids)
+        self.assertEqual(ids[1:], self.expected[1:])
@@ -0,0 +1,589 @@
+# posts/tests/test_views.py
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.urls import reverse
+from django.core.management import call_command
+from django.core.cache import cache
+from io import StringIO
+import time
+from django.utils.http import http_date
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.models import User
+from posts.models import Post, Comment, Reaction, Tag, AuthorStats
+from posts import search, timeline
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+class PostListViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.list_url = reverse('post_list')
+        self.author = User(username='author', email='author@example.com')
+        self.author.set_password('TestPassword123')
+        self.author.save()
+        self.reader = User(username='reader', email='reader@example.com')
+        self.reader.set_password('TestPassword123')
+        self.reader.save()
+        self.tag = Tag.objects.create(name='Django')
+        now = timezone.now()
+        self.posts = []
+        for i in range(12):
+            post = Post.objects.create(
+                title=f'Post {i}',
+                content='x' * 1000,
+                author=self.author,
+                published_at=now - timedelta(minutes=i),
+            )
+            self.posts.append(post)
+        self.posts[0].tags.add(self.tag)
+        Comment.objects.create(post=self.posts[0], author=self.reader, content='Bravo')
+        Reaction.objects.create(post=self.posts[0], user=self.reader, emoji='LIKE')
+        Reaction.objects.create(post=self.posts[0], user=self.author, emoji='LIKE')
+        call_command('recount_posts', stdout=StringIO())
+
+    def test_list_is_paginated_with_cursor(self):
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(response.data['results'][0]['id'], self.posts[0].id)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.posts[10].id, self.posts[11].id])
+        self.assertIsNone(response.data['next'])
+
+    def test_list_returns_summary_only(self):
+        response = self.client.get(self.list_url)
+        first = response.data['results'][0]
+        self.assertNotIn('content', first)
+        self.assertNotIn('comments', first)
+        self.assertNotIn('reactions', first)
+        self.assertEqual(len(first['excerpt']), 300)
+        self.assertEqual(first['comment_count'], 1)
+        self.assertEqual(first['reaction_counts']['LIKE'], 2)
+        self.assertEqual(first['reaction_counts']['LOVE'], 0)
+        self.assertEqual(first['tags'][0]['slug'], 'django')
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.list_url, {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+        response = self.client.get(self.list_url, {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_filter_by_tag(self):
+        response = self.client.get(self.list_url, {'tag': 'django'})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.posts[0].id])
+
+    def test_filter_by_several_tags(self):
+        python = Tag.objects.create(name='Python')
+        self.posts[0].tags.add(python)
+        self.posts[1].tags.add(python)
+        ids = lambda response: [p['id'] for p in response.data['results']]
+
+        response = self.client.get(self.list_url, {'tags': 'django,python'})
+        self.assertEqual(ids(response), [self.posts[0].id, self.posts[1].id])
+        response = self.client.get(self.list_url, {'tags': 'django,python', 'match': 'all'})
+        self.assertEqual(ids(response), [self.posts[0].id])
+        response = self.client.get(self.list_url, {'tags': 'django,inconnu', 'match': 'all'})
+        self.assertEqual(ids(response), [])
+        response = self.client.get(self.list_url, {'tags': 'django', 'match': 'some'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tag_list_counts_published_posts(self):
+        Tag.objects.create(name='Vide')
+        Post.objects.create(
+            title='Brouillon', content='x', author=self.author, published_at=timezone.now() + timedelta(days=1)
+        ).tags.add(self.tag)
+        timeline.ensure_built()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tag_list'))
+        self.assertEqual(
+            [(t['slug'], t['post_count']) for t in response.data], [('django', 1), ('vide', 0)]
+        )
+
+        # Nouveau post publié sous ce tag : le nuage mis en cache est invalidé
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[1].tags.add(self.tag)
+        response = self.client.get(reverse('tag_list'))
+        self.assertEqual(response.data[0]['post_count'], 2)
+
+class PostDetailViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User(username='author', email='author@example.com')
+        self.author.set_password('TestPassword123')
+        self.author.save()
+        self.post = Post.objects.create(title='Post', content='Contenu complet', author=self.author)
+
+    def test_detail_returns_full_post(self):
+        response = self.client.get(reverse('post_detail', args=[self.post.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['content'], 'Contenu complet')
+        self.assertIn('comments', response.data)
+        self.assertIn('reaction_counts', response.data)
+
+class PostQueryCountTests(TestCase):
+    """Le nombre de requêtes ne doit pas dépendre du nombre de posts (pas de N+1)."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User(username='author', email='author@example.com')
+        self.author.set_password('TestPassword123')
+        self.author.save()
+        self.reader = User(username='reader', email='reader@example.com')
+        self.reader.set_password('TestPassword123')
+        self.reader.save()
+        self.tag = Tag.objects.create(name='Django')
+
+    def create_posts(self, count):
+        # Statistiques auteur recalculées au commit, comme en production
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_posts(count)
+
+    def _create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(title=f'Post {i}', content='Contenu', author=self.author)
+            post.tags.add(self.tag)
+            Comment.objects.create(post=post, author=self.reader, content='Bravo')
+            Comment.objects.create(post=post, author=self.author, content='Merci')
+            Reaction.objects.create(post=post, user=self.reader, emoji='LIKE')
+            Reaction.objects.create(post=post, user=self.reader, emoji='WOW')
+        call_command('recount_posts', stdout=StringIO())
+
+    def count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant(self):
+        urls = [reverse('post_list'), reverse('about_author', args=[self.author.id])]
+        self.create_posts(2)
+        small = [self.count_queries(url) for url in urls]
+        self.create_posts(20)
+        large = [self.count_queries(url) for url in urls]
+        self.assertEqual(small, large)
+
+    def test_detail_query_count(self):
+        self.create_posts(1)
+        post = Post.objects.get()
+        # 1 requête pour l'ETag, 1 pour le post, 3 préchargements
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('post_detail', args=[post.id]))
+        self.assertEqual(response.data['reaction_counts']['WOW'], 1)
+        self.assertEqual(len(response.data['comments']), 2)
+
+class PostTagWriteTests(TestCase):
+    """Écriture des tags d'un post : nombre de requêtes indépendant du nombre de tags."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'TestPassword123')
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.client.cookies['refresh_token'] = str(refresh)
+        self.post = Post.objects.create(title='Post', content='Contenu', author=self.admin)
+
+    def put_tags(self, names):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.put(reverse('post_update', args=[self.post.pk]), {'tag_names': names}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len([q for q in ctx.captured_queries if 'posts_tag' in q['sql'] or 'posts_post_tags' in q['sql']])
+
+    def test_tag_queries_do_not_grow_with_tag_count(self):
+        few = self.put_tags(['Tag 0', 'Tag 1'])
+        many = self.put_tags([f'Tag {i}' for i in range(20)])
+        self.assertEqual(few, many)
+        self.assertEqual(self.post.tags.count(), 20)
+
+    def test_only_changed_links_are_written(self):
+        self.put_tags(['Django', 'Python'])
+        link = Post.tags.through.objects.get(post=self.post, tag__name='Django')
+        self.put_tags(['Django', 'React'])
+        self.assertTrue(Post.tags.through.objects.filter(pk=link.pk).exists())
+        self.assertEqual(sorted(self.post.tags.values_list('name', flat=True)), ['Django', 'React'])
+
+    def test_names_are_matched_on_the_tag_slug(self):
+        Tag.objects.create(name='Machine Learning')
+        self.put_tags(['machine learning', '  Django ', 'django'])
+        self.assertEqual(
+            sorted(self.post.tags.values_list('slug', flat=True)), ['django', 'machine-learning']
+        )
+        self.assertEqual(Tag.objects.count(), 2)
+
+class PostCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User(username='reader', email='reader@example.com')
+        self.user.set_password('TestPassword123')
+        self.user.save()
+        self.post = Post.objects.create(title='Post', content='Contenu', author=self.user)
+        self.client.force_authenticate(self.user)
+
+    def test_reaction_toggle_updates_counter(self):
+        url = reverse('reaction_toggle', args=[self.post.id, 'LOVE'])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reaction_counts']['LOVE'], 1)
+        response = self.client.post(url)
+        self.assertEqual(response.data['reaction_counts']['LOVE'], 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.love_count, 0)
+
+    def test_comment_create_updates_counter(self):
+        url = reverse('comment_create', args=[self.post.id])
+        response = self.client.post(url, {'content': 'Bravo'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_recount_repairs_drift(self):
+        Reaction.objects.create(post=self.post, user=self.user, emoji='SAD')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+        out = StringIO()
+        call_command('recount_posts', '--dry-run', stdout=out)
+        self.assertIn('would be repaired: 1', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 7)
+
+        call_command('recount_posts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(self.post.sad_count, 1)
+
+    def test_repaired_counts_show_up_in_the_next_get(self):
+        # Commentaire créé sans passer par la vue : compteur resté à 0
+        Comment.objects.create(post=self.post, author=self.user, content='Bravo')
+        list_url, detail_url = reverse('post_list'), reverse('post_detail', args=[self.post.id])
+        self.assertEqual(self.client.get(list_url).data['results'][0]['comment_count'], 0)
+        etag = self.client.get(detail_url)['ETag']
+
+        call_command('recount_posts', stdout=StringIO())
+        self.assertEqual(self.client.get(list_url).data['results'][0]['comment_count'], 1)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comment_count'], 1)
+        self.assertEqual(AuthorStats.objects.get(pk=self.user.pk).comment_count, 1)
+
+class AboutAuthorViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user('author', 'author@example.com', 'TestPassword123')
+        self.reader = User.objects.create_user('reader', 'reader@example.com', 'TestPassword123')
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [
+                Post.objects.create(
+                    title=f'Post {i}', content='x' * 1000, author=self.author, published_at=now - timedelta(days=i)
+                )
+                for i in range(12)
+            ]
+            Post.objects.create(title='Programmé', content='x', author=self.author, published_at=now + timedelta(days=1))
+        self.url = reverse('about_author', args=[self.author.id])
+
+    def test_posts_are_paginated_summaries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['author']['id'], self.author.id)
+        page = response.data['posts']
+        self.assertEqual([p['id'] for p in page['results']], [p.id for p in self.posts[:10]])
+        self.assertNotIn('comments', page['results'][0])
+        response = self.client.get(page['next'])
+        self.assertEqual([p['id'] for p in response.data['posts']['results']], [p.id for p in self.posts[10:]])
+
+    def test_stats_are_stored_and_follow_writes(self):
+        stats = self.client.get(self.url).data['stats']
+        self.assertEqual(stats['post_count'], 12)
+        self.assertEqual(stats['comment_count'], 0)
+        self.assertEqual(stats['last_published_at'], self.posts[0].published_at.isoformat().replace('+00:00', 'Z'))
+
+        self.client.force_authenticate(self.reader)
+        self.client.post(reverse('comment_create', args=[self.posts[3].id]), {'content': 'Bravo'}, format='json')
+        self.client.post(reverse('reaction_toggle', args=[self.posts[5].id, 'WOW']))
+        stored = AuthorStats.objects.get(pk=self.author.pk)
+        self.assertEqual((stored.comment_count, stored.wow_count), (1, 1))
+        self.client.post(reverse('reaction_toggle', args=[self.posts[5].id, 'WOW']))
+        self.assertEqual(AuthorStats.objects.get(pk=self.author.pk).wow_count, 0)
+
+    def test_page_cost_does_not_depend_on_author_size(self):
+        self.client.get(self.url)
+        cache.clear()
+        timeline.ensure_built()
+        # Auteur, statistiques stockées, page de posts, tags préchargés
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+    def test_refresh_command_picks_up_drift_and_scheduled_posts(self):
+        AuthorStats.objects.filter(pk=self.author.pk).update(post_count=0, like_count=9)
+        out = StringIO()
+        AuthorStats.objects.create(author=self.reader)
+        call_command('refresh_author_stats', '--batch-size', '1', stdout=out)
+        self.assertIn('Authors refreshed: 1', out.getvalue())
+        stored = AuthorStats.objects.get(pk=self.author.pk)
+        self.assertEqual((stored.post_count, stored.like_count), (12, 0))
+        # Pas de ligne pour un utilisateur sans post
+        self.assertFalse(AuthorStats.objects.filter(pk=self.reader.pk).exists())
+
+    def test_due_publication_is_served_without_writing(self):
+        self.client.get(self.url)
+        later = timezone.now() + timedelta(days=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+        writes = [q['sql'] for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertEqual(writes, [])
+        self.assertEqual(response.data['posts']['results'][0]['title'], 'Programmé')
+        # Statistiques à jour au prochain passage de la commande
+        self.assertEqual(response.data['stats']['post_count'], 12)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            call_command('refresh_author_stats', stdout=StringIO())
+        self.assertEqual(AuthorStats.objects.get(pk=self.author.pk).post_count, 13)
+
+    def test_author_without_stats_row_is_computed_without_writing(self):
+        AuthorStats.objects.all().delete()
+        cache.clear()
+        stats = self.client.get(self.url).data['stats']
+        self.assertEqual(stats['post_count'], 12)
+        stats = self.client.get(reverse('about_author', args=[self.reader.id])).data['stats']
+        self.assertEqual(stats['post_count'], 0)
+        self.assertFalse(AuthorStats.objects.exists())
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User(username='reader', email='reader@example.com')
+        self.user.set_password('TestPassword123')
+        self.user.save()
+        self.post = Post.objects.create(title='Post', content='Contenu', author=self.user)
+        self.other = Post.objects.create(title='Autre', content='Contenu', author=self.user)
+
+    def test_second_request_is_served_from_cache(self):
+        url = reverse('post_detail', args=[self.post.id])
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        # Seul le calcul de l'ETag touche la base
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['title'], 'Post')
+
+    def test_query_params_are_part_of_the_key(self):
+        url = reverse('post_list')
+        self.client.get(url, {'page_size': 1})
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_write_invalidates_only_dependent_entries(self):
+        detail_url = reverse('post_detail', args=[self.post.id])
+        other_url = reverse('post_detail', args=[self.other.id])
+        self.client.get(detail_url)
+        self.client.get(other_url)
+        self.client.get(reverse('post_list'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.user, content='Bravo')
+
+        response = self.client.get(detail_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['comments']), 1)
+        self.assertEqual(self.client.get(other_url)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(reverse('post_list'))['X-Cache'], 'MISS')
+
+    def test_tag_change_invalidates_tag_list(self):
+        url = reverse('tag_list')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.add(Tag.objects.create(name='Django'))
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['slug'], 'django')
+
+    def test_stats_are_admin_only(self):
+        self.client.get(reverse('tag_list'))
+        self.client.get(reverse('tag_list'))
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('cache_stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('cache_stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['hits'], 1)
+        self.assertEqual(response.data['misses'], 1)
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User(username='reader', email='reader@example.com')
+        self.user.set_password('TestPassword123')
+        self.user.save()
+        self.post = Post.objects.create(title='Post', content='Contenu', author=self.user)
+        self.detail_url = reverse('post_detail', args=[self.post.id])
+
+    def test_detail_sends_validators(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_detail_if_none_match_returns_304_without_serializing(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_detail_if_modified_since_alone_never_returns_stale_304(self):
+        reaction = Reaction.objects.create(post=self.post, user=self.user, emoji='LIKE')
+        self.post.increment_counter('like_count')
+        since = http_date(time.time() + 60)
+        reaction.delete()
+        self.post.increment_counter('like_count', -1)
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reaction_counts']['LIKE'], 0)
+
+    def test_detail_etag_changes_when_reaction_is_removed(self):
+        reaction = Reaction.objects.create(post=self.post, user=self.user, emoji='LIKE')
+        self.post.increment_counter('like_count')
+        etag = self.client.get(self.detail_url)['ETag']
+        reaction.delete()
+        self.post.increment_counter('like_count', -1)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_of_missing_post_is_404(self):
+        response = self.client.get(reverse('post_detail', args=[self.post.id + 1]), HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+
+    def test_list_etag_follows_writes(self):
+        url = reverse('post_list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Nouveau', content='Contenu', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+
+class CommentListViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User(username='reader', email='reader@example.com')
+        self.user.set_password('TestPassword123')
+        self.user.save()
+        self.post = Post.objects.create(title='Post', content='Contenu', author=self.user)
+        self.comments = [
+            Comment.objects.create(post=self.post, author=self.user, content=f'Commentaire {i}')
+            for i in range(12)
+        ]
+        call_command('recount_posts', stdout=StringIO())
+
+    def test_comments_are_paginated_with_cursor(self):
+        url = reverse('comment_list', args=[self.post.id])
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [c['id'] for c in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [c.id for c in self.comments])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(reverse('comment_list', args=[self.post.id]), {'page_size': 500})
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_unpublished_post_is_404(self):
+        Post.objects.filter(pk=self.post.pk).update(published_at=timezone.now() + timedelta(days=1))
+        response = self.client.get(reverse('comment_list', args=[self.post.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail_embeds_first_page_and_total(self):
+        response = self.client.get(reverse('post_detail', args=[self.post.id]))
+        self.assertEqual([c['id'] for c in response.data['comments']], [c.id for c in self.comments[:5]])
+        self.assertEqual(response.data['comment_count'], 12)
+
+class PostSearchViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        search.reset_index()
+        self.client = APIClient()
+        self.url = reverse('post_search')
+        self.user = User(username='author', email='author@example.com')
+        self.user.set_password('TestPassword123')
+        self.user.save()
+        self.django_post = Post.objects.create(
+            title='Optimiser les performances Django',
+            content='La mise en cache et les index rendent les requêtes rapides.',
+            author=self.user,
+        )
+        self.react_post = Post.objects.create(
+            title='React et Vite',
+            content='Pourquoi Vite accélère le développement. Django sert l’API.',
+            author=self.user,
+        )
+        self.future_post = Post.objects.create(
+            title='Django à venir',
+            content='Brouillon programmé.',
+            author=self.user,
+            published_at=timezone.now() + timedelta(days=1),
+        )
+
+    def test_results_are_ranked_and_highlighted(self):
+        response = self.client.get(self.url, {'q': 'django'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [r['id'] for r in response.data['results']]
+        # Le titre pèse plus que le contenu ; le post programmé est exclu
+        self.assertEqual(ids, [self.django_post.id, self.react_post.id])
+        self.assertIn('<mark>Django</mark>', response.data['results'][1]['headline'])
+
+    def test_stemming_and_accents(self):
+        response = self.client.get(self.url, {'q': 'requete performance'})
+        self.assertEqual([r['id'] for r in response.data['results']], [self.django_post.id])
+
+    def test_accented_suffixes_are_stemmed(self):
+        self.assertEqual(search.terms('Qualité qualités QUALITES'), ['qual'] * 3)
+        self.assertEqual(search.terms('rapidité'), search.terms('rapidités'))
+        self.assertEqual(search.terms('rapidité'), ['rapid'])
+
+    def test_index_follows_writes(self):
+        self.client.get(self.url, {'q': 'django'})
+        self.react_post.title = 'Kubernetes'
+        self.react_post.content = 'Déploiement.'
+        self.react_post.save()
+        cache.clear()
+        response = self.client.get(self.url, {'q': 'django'})
+        self.assertEqual([r['id'] for r in response.data['results']], [self.django_post.id])
+
+    def test_missing_query(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
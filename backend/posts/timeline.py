@@ -0,0 +1,378 @@
+"""
+Index du fil : ids des posts publiés, triés par (published_at, id).
+
+Chaque post est une clé triable `<published_at en µs sur 16 chiffres>:<id sur 12
+chiffres>` : l'ordre lexicographique des clés est celui du fil, sans ambiguïté
+entre posts publiés à la même microseconde. Une page du fil est une lecture de
+plage en O(page) (ZREVRANGEBYLEX), suivie d'une requête `pk IN (...)` pour les posts de la page.
+
+Les posts programmés attendent dans un second ensemble trié par date. À chaque
+lecture, `publish_due` fait passer dans le fil ceux dont l'heure est venue et
+invalide les réponses en cache qui en dépendent : entre deux publications, les
+pages du fil restent valides et peuvent être servies par le cache.
+
+L'index n'existe que dans Redis, quand le cache par défaut est django-redis :
+il est alors partagé par tous les processus (workers, `manage.py`, shell), dont
+les signaux de `Post` le tiennent à jour. Il est reconstruit depuis la base quand
+il manque (premier accès, cache vidé, après `seed_data`), dans des ensembles à
+part renommés à la fin : les écritures commitées pendant la reconstruction y
+sont reportées au fil de l'eau, aucune n'est perdue.
+
+Sans cache partagé (locmem), un index en mémoire ne verrait pas les posts écrits
+par les autres processus : le fil est lu par l'index SQL (published_at, id), et
+les posts programmés sont repérés par une requête au plus toutes les
+DUE_CHECK_INTERVAL secondes (voir `_publish_due_database`).
+"""
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import cache as response_cache
+from .models import Post
+
+KEY_PREFIX = 'posts:timeline'
+BUILT_KEY = f'{KEY_PREFIX}:built'
+REBUILD_LOCK_TIMEOUT = 60
+REBUILD_CHUNK_SIZE = 5000
+# Sans index : état des posts programmés (dernière vérification, prochaine publication)
+DUE_KEY = f'{KEY_PREFIX}:due'
+DUE_CHECK_INTERVAL = 60
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def to_micros(moment):
+    return max(0, (moment - EPOCH) // timedelta(microseconds=1))
+
+
+def make_key(post_id, published_at):
+    return f'{to_micros(published_at):016d}:{post_id:012d}'
+
+
+def parse_key(key):
+    """(published_at, id) d'une clé du fil."""
+    micros, post_id = key.split(':')
+    return EPOCH + timedelta(microseconds=int(micros)), int(post_id)
+
+
+def _now_micros():
+    return to_micros(timezone.now())
+
+
+class RedisTimeline:
+    """Index partagé dans Redis : fil en ZSET lexicographique, posts programmés en ZSET par date."""
+
+    PUBLISHED = f'{KEY_PREFIX}:published'
+    SCHEDULED = f'{KEY_PREFIX}:scheduled'
+    KEYS = f'{KEY_PREFIX}:keys'
+    LOCK = f'{KEY_PREFIX}:lock'
+    # Reconstruction dans des ensembles à part, renommés sur les ensembles du fil à la fin
+    BUILD_PUBLISHED = f'{KEY_PREFIX}:build:published'
+    BUILD_SCHEDULED = f'{KEY_PREFIX}:build:scheduled'
+    BUILD_KEYS = f'{KEY_PREFIX}:build:keys'
+
+    # Les scripts Lua rendent chaque écriture atomique face aux lectures et aux autres processus.
+    # Pendant une reconstruction (verrou posé), add et remove écrivent aussi dans les
+    # ensembles en construction : une écriture commitée après la lecture de la base y figure,
+    # et la ligne lue avant elle ne l'écrase pas (BUILD_SCRIPT n'écrit que les ids absents ;
+    # un post supprimé y laisse un id à clé vide).
+    ADD_SCRIPT = """
+        local function add(published, scheduled, keys)
+            local old = redis.call('HGET', keys, ARGV[1])
+            if old then
+                redis.call('ZREM', published, old)
+                redis.call('ZREM', scheduled, old)
+            end
+            redis.call('HSET', keys, ARGV[1], ARGV[2])
+            if tonumber(ARGV[3]) <= tonumber(ARGV[4]) then
+                redis.call('ZADD', published, 0, ARGV[2])
+            else
+                redis.call('ZADD', scheduled, ARGV[3], ARGV[2])
+            end
+        end
+        add(KEYS[1], KEYS[2], KEYS[3])
+        if redis.call('EXISTS', KEYS[7]) == 1 then
+            add(KEYS[4], KEYS[5], KEYS[6])
+        end
+    """
+    REMOVE_SCRIPT = """
+        local old = redis.call('HGET', KEYS[3], ARGV[1])
+        if old then
+            redis.call('ZREM', KEYS[1], old)
+            redis.call('ZREM', KEYS[2], old)
+            redis.call('HDEL', KEYS[3], ARGV[1])
+        end
+        if redis.call('EXISTS', KEYS[7]) == 1 then
+            old = redis.call('HGET', KEYS[6], ARGV[1])
+            if old then
+                redis.call('ZREM', KEYS[4], old)
+                redis.call('ZREM', KEYS[5], old)
+            end
+            redis.call('HSET', KEYS[6], ARGV[1], '')
+        end
+    """
+    # ARGV : instant présent, puis (id, clé, published_at en µs) par post du lot
+    BUILD_SCRIPT = """
+        for i = 2, #ARGV, 3 do
+            if redis.call('HSETNX', KEYS[3], ARGV[i], ARGV[i + 1]) == 1 then
+                if tonumber(ARGV[i + 2]) <= tonumber(ARGV[1]) then
+                    redis.call('ZADD', KEYS[1], 0, ARGV[i + 1])
+                else
+                    redis.call('ZADD', KEYS[2], ARGV[i + 2], ARGV[i + 1])
+                end
+            end
+        end
+    """
+    PUBLISH_DUE_SCRIPT = """
+        local due = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+        for _, key in ipairs(due) do
+            redis.call('ZADD', KEYS[1], 0, key)
+        end
+        if #due > 0 then
+            redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+        end
+        return due
+    """
+    # Bascule atomique, seulement si le verrou est toujours celui de cette reconstruction
+    SWAP_SCRIPT = """
+        if redis.call('GET', KEYS[7]) ~= ARGV[1] then
+            return 0
+        end
+        for i = 1, 3 do
+            if redis.call('EXISTS', KEYS[i + 3]) == 1 then
+                redis.call('RENAME', KEYS[i + 3], KEYS[i])
+            else
+                redis.call('DEL', KEYS[i])
+            end
+        end
+        redis.call('DEL', KEYS[7])
+        return 1
+    """
+    UNLOCK_SCRIPT = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then
+            redis.call('DEL', KEYS[1])
+        end
+    """
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.redis = get_redis_connection('default')
+        self._add = self.redis.register_script(self.ADD_SCRIPT)
+        self._remove = self.redis.register_script(self.REMOVE_SCRIPT)
+        self._publish_due = self.redis.register_script(self.PUBLISH_DUE_SCRIPT)
+        self._build = self.redis.register_script(self.BUILD_SCRIPT)
+        self._swap = self.redis.register_script(self.SWAP_SCRIPT)
+        self._unlock = self.redis.register_script(self.UNLOCK_SCRIPT)
+
+    @property
+    def _sets(self):
+        return [self.PUBLISHED, self.SCHEDULED, self.KEYS]
+
+    @property
+    def _all_keys(self):
+        return [*self._sets, self.BUILD_PUBLISHED, self.BUILD_SCHEDULED, self.BUILD_KEYS, self.LOCK]
+
+    def is_built(self):
+        return cache.get(BUILT_KEY) is not None
+
+    def rebuild(self, rows):
+        # Un seul processus reconstruit ; les autres lisent la base en attendant
+        token = uuid.uuid4().hex
+        if not self.redis.set(self.LOCK, token, nx=True, ex=REBUILD_LOCK_TIMEOUT):
+            return False
+        try:
+            # Le fil en place reste servi jusqu'à la bascule
+            build_keys = [self.BUILD_PUBLISHED, self.BUILD_SCHEDULED, self.BUILD_KEYS]
+            self.redis.delete(*build_keys)
+            now = _now_micros()
+            chunk = []
+            for count, (post_id, published_at) in enumerate(rows, start=1):
+                chunk += [post_id, make_key(post_id, published_at), to_micros(published_at)]
+                if count % REBUILD_CHUNK_SIZE == 0:
+                    self._build(keys=build_keys, args=[now, *chunk])
+                    chunk = []
+            if chunk:
+                self._build(keys=build_keys, args=[now, *chunk])
+            if not self._swap(keys=self._all_keys, args=[token]):
+                # Verrou expiré en route : un autre processus a pu reprendre la reconstruction
+                return False
+            cache.set(BUILT_KEY, uuid.uuid4().hex, None)
+            return True
+        finally:
+            self._unlock(keys=[self.LOCK], args=[token])
+
+    def add(self, post_id, published_at):
+        key = make_key(post_id, published_at)
+        self._add(keys=self._all_keys, args=[post_id, key, to_micros(published_at), _now_micros()])
+
+    def remove(self, post_id):
+        self._remove(keys=self._all_keys, args=[post_id])
+
+    def publish_due(self):
+        return [key.decode() for key in self._publish_due(keys=self._sets, args=[_now_micros()])]
+
+    def read(self, before=None, after=None, limit=10):
+        if after is not None:
+            keys = self.redis.zrangebylex(self.PUBLISHED, f'({after}', '+', start=0, num=limit)
+            keys.reverse()
+        else:
+            upper = f'({before}' if before is not None else '+'
+            keys = self.redis.zrevrangebylex(self.PUBLISHED, upper, '-', start=0, num=limit)
+        return [key.decode() for key in keys]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Index Redis partagé, ou None sans cache partagé (lectures par la base)."""
+    global _backend
+    if _backend is None and settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+        with _backend_lock:
+            if _backend is None:
+                _backend = RedisTimeline()
+    return _backend
+
+
+def ensure_built():
+    """
+    Reconstruit l'index depuis la base s'il manque ; False si les lectures doivent
+    passer par la base (pas d'index partagé, ou reconstruction par un autre processus).
+    """
+    backend = get_backend()
+    if backend is None:
+        _due_state()
+        return False
+    if backend.is_built():
+        return True
+    rows = Post.objects.order_by().values_list('id', 'published_at').iterator(chunk_size=REBUILD_CHUNK_SIZE)
+    return backend.rebuild(rows)
+
+
+def uses_index():
+    return get_backend() is not None
+
+
+def reset():
+    """Force une reconstruction au prochain accès (après des `bulk_create`, qui n'envoient pas de signaux)."""
+    cache.delete_many([BUILT_KEY, DUE_KEY])
+
+
+def read(before=None, after=None, limit=10):
+    """
+    Clés du fil, de la plus récente à la plus ancienne : les `limit` plus proches
+    avant `before` (ou depuis le début), ou les `limit` plus proches après `after`.
+    """
+    if ensure_built():
+        return get_backend().read(before=before, after=after, limit=limit)
+    return _read_database(before, after, limit)
+
+
+def _read_database(before, after, limit):
+    # Sans index ou pendant sa reconstruction : même lecture, par l'index SQL du fil
+    posts = Post.objects.published().order_by('-published_at', '-id')
+    if before is not None:
+        published_at, pk = parse_key(before)
+        posts = posts.filter(Q(published_at__lt=published_at) | Q(published_at=published_at, pk__lt=pk))
+    elif after is not None:
+        published_at, pk = parse_key(after)
+        posts = posts.filter(
+            Q(published_at__gt=published_at) | Q(published_at=published_at, pk__gt=pk)
+        ).order_by('published_at', 'id')
+    keys = [make_key(pk, published_at) for pk, published_at in posts.values_list('id', 'published_at')[:limit]]
+    if after is not None:
+        keys.reverse()
+    return keys
+
+
+def post_saved(post):
+    backend = get_backend()
+    if backend is None:
+        if post.published_at > timezone.now():
+            transaction.on_commit(lambda: _schedule(post.published_at))
+        return
+    # Même pendant une reconstruction : un post commité après sa lecture de la base y serait perdu
+    transaction.on_commit(lambda: backend.add(post.pk, post.published_at))
+
+
+def post_deleted(post_id):
+    backend = get_backend()
+    if backend is not None:
+        transaction.on_commit(lambda: backend.remove(post_id))
+
+
+def _next_due(now):
+    return Post.objects.filter(published_at__gt=now).order_by('published_at').values_list(
+        'published_at', flat=True
+    ).first()
+
+
+def _due_state():
+    """(dernière vérification, prochaine publication programmée ou None), calculé s'il manque."""
+    state = cache.get(DUE_KEY)
+    if state is None:
+        now = timezone.now()
+        state = (now, _next_due(now))
+        cache.set(DUE_KEY, state, None)
+    return state
+
+
+def _schedule(published_at):
+    # Post programmé par ce processus : connu sans attendre la prochaine vérification
+    checked_at, next_due = _due_state()
+    if next_due is None or published_at < next_due:
+        cache.set(DUE_KEY, (checked_at, published_at), None)
+
+
+def _publish_due_database():
+    """
+    Posts dont l'heure est venue depuis la dernière vérification. Le cache
+    n'étant pas partagé, les posts programmés par d'autres processus sont vus à
+    la vérification suivante : au plus DUE_CHECK_INTERVAL secondes de retard.
+    """
+    now = timezone.now()
+    checked_at, next_due = _due_state()
+    if (next_due is None or next_due > now) and (now - checked_at).total_seconds() < DUE_CHECK_INTERVAL:
+        return []
+    cache.set(DUE_KEY, (now, _next_due(now)), None)
+    return list(
+        Post.objects.filter(published_at__gt=checked_at, published_at__lte=now).values_list('id', flat=True)
+    )
+
+
+def publish_due():
+    """
+    Fait entrer dans le fil les posts dont l'heure est venue ; renvoie leurs ids.
+    Appelée au début des GET : déplace des entrées d'index et des versions de
+    cache, sans écrire en base (AuthorStats suit via `refresh_author_stats`).
+    """
+    backend = get_backend()
+    if backend is None:
+        due = _publish_due_database()
+    elif backend.is_built():
+        due = [parse_key(key)[1] for key in backend.publish_due()]
+    else:
+        # Index en reconstruction : les lectures passent par la base, qui filtre déjà sur la date
+        return []
+    if due:
+        author_ids = set(Post.objects.filter(pk__in=due).values_list('author_id', flat=True))
+        response_cache.bump(
+            'global', 'tags', *[f'post:{pk}' for pk in due], *[f'author:{pk}' for pk in author_ids]
+        )
+    return due
+
+
+def publishes_due_posts(method):
+    """Pour les `get` d'APIView dont la réponse dépend des posts publiés : à placer avant les caches."""
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        publish_due()
+        return method(view, request, *args, **kwargs)
+    return wrapper
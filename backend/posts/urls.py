@@ -1,14 +1,22 @@
 from django.urls import path
 from .views import (
-    PostListView, PostDetailView, PostCreateView, PostUpdateView,
-    CommentCreateView, ReactionToggleView, AboutAuthorView , TagListView ,  SuggestImprovementsView
+    PostListView, PostSearchView, PostDetailView, PostCreateView, PostUpdateView,
+    CommentListView, CommentCreateView, ReactionToggleView, AboutAuthorView , TagListView ,  SuggestImprovementsView,
+    SuggestImprovementsStreamView, SuggestionJobView, SuggestionMetricsView, CacheStatsView
 )
 
 urlpatterns = [
     
     path('<int:pk>/suggestions/', SuggestImprovementsView.as_view(), name='post-suggestions'),
 
+    path('suggestions/metrics/', SuggestionMetricsView.as_view(), name='suggestion_metrics'),
+    path('<int:pk>/suggestions/stream/', SuggestImprovementsStreamView.as_view(), name='post-suggestions-stream'),
+
+    path('<int:pk>/suggestions/<uuid:job_id>/', SuggestionJobView.as_view(), name='post-suggestion-job'),
+
     path('', PostListView.as_view(), name='post_list'),
+
+    path('search/', PostSearchView.as_view(), name='post_search'),
    
     path('<int:pk>/', PostDetailView.as_view(), name='post_detail'),
     
@@ -16,6 +24,8 @@ urlpatterns = [
 
     path('<int:pk>/update/', PostUpdateView.as_view(), name='post_update'),
     
+    path('<int:pk>/comments/', CommentListView.as_view(), name='comment_list'),
+
     path('<int:pk>/comment/', CommentCreateView.as_view(), name='comment_create'),
    
     path('<int:pk>/react/<str:emoji>/', ReactionToggleView.as_view(), name='reaction_toggle'),
@@ -23,4 +33,6 @@ urlpatterns = [
     path('author/<int:author_id>/', AboutAuthorView.as_view(), name='about_author'),
 
     path('tags/', TagListView.as_view(), name='tag_list'),
+
+    path('cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
 ]
\ No newline at end of file
@@ -1,55 +1,48 @@
-import os
-import json
 import logging
-import openai
-import tiktoken
-from openai import OpenAI,OpenAIError, RateLimitError, APIError, Timeout
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+from base64 import b64decode, b64encode
+from rest_framework.renderers import JSONRenderer
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from django.conf import settings
 from django.utils import timezone
-from .models import Post, Comment, Reaction , Tag
-from .serializers import PostSerializer, CommentSerializer, ReactionSerializer , TagSerializer, SuggestionSerializer
+from django.db import transaction
+from .models import Post, Comment, Reaction , Tag, SuggestionJob, reaction_count_field, COMMENT_PAGE_SIZE
+from .serializers import PostSerializer, PostListSerializer, PostSearchResultSerializer, CommentSerializer, ReactionSerializer , TagCountSerializer, SuggestionJobSerializer, AuthorStatsSerializer
 from users.models import User
 from .permissions import IsAuthenticatedByRefreshToken
+from .cache import cache_response, cache_stats
+from . import search, jobs, ai, streaming, metrics, limits, author_stats, timeline
+from .streaming import EventStreamRenderer
+from .conditional import (
+    conditional_response, post_detail_etag,
+    post_list_etag, post_list_last_modified,
+)
 from users.serializers import UserSerializer
 import logging
-from django.db.models import Count
+from django.db.models import Count, Q
+from django.db.models.functions import Left
 
 logger = logging.getLogger('posts')
 
-# Limites de tokens pour réduire les coûts
-MAX_INPUT_TOKENS = 3000
-MAX_RESPONSE_TOKENS = 500
-ENCODING_NAME = "cl100k_base"
-
-# Instanciation du client OpenAI via OpenRouter (Deepseek)
-openai_client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=settings.OPENROUTER_API_KEY,
-    timeout=30
-)
-
-def truncate_text(text: str, max_tokens: int) -> str:
-    """
-    Tronque le texte pour qu'il ne dépasse pas max_tokens.
-    """
-    encoding = tiktoken.get_encoding(ENCODING_NAME)
-    tokens = encoding.encode(text)
-    if len(tokens) <= max_tokens:
-        return text
-    truncated = encoding.decode(tokens[:max_tokens])
-    logger.info(f"Texte tronqué de {len(tokens)} à {max_tokens} tokens pour optimiser les coûts.")
-    return truncated
+# Longueur de l'extrait renvoyé dans le fil des posts
+EXCERPT_LENGTH = 300
+# Nombre maximal de tags dans un filtre ?tags= du fil
+MAX_FILTER_TAGS = 10
 
 
 class SuggestImprovementsView(APIView):
     """
     POST /api/posts/<pk>/suggestions/
-    Renvoie dans "réponse" le texte réécrit via Deepseek, pur et sans code.
+    Met en file la réécriture du texte via Deepseek et répond 202 avec l'id du job,
+    à suivre sur GET /api/posts/<pk>/suggestions/<job_id>/. Si la même demande
+    est déjà en cache, répond 200 avec "réponse" et "cached": true.
     """
     permission_classes = [IsAuthenticatedByRefreshToken, permissions.IsAdminUser]
 
@@ -57,101 +50,197 @@ class SuggestImprovementsView(APIView):
         # Récupérer et vérifier l'auteur
         post = get_object_or_404(Post, pk=pk, author=request.user)
         original_text = request.data.get("text", post.content)
+        job = jobs.enqueue(post, request.user, original_text)
+        location = {"Location": reverse('post-suggestion-job', args=[post.pk, job.id])}
+        if job.cached:
+            # Même texte, même prompt, même modèle : réponse immédiate depuis le cache
+            return Response(SuggestionJobSerializer(job).data, status=status.HTTP_200_OK, headers=location)
+        logger.info(f"Suggestion IA {job.id} mise en file par {request.user.username} pour le post {post.pk}")
+        return Response(SuggestionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED, headers=location)
+
+class SuggestImprovementsStreamView(APIView):
+    """
+    POST /api/posts/<pk>/suggestions/stream/
+    Variante en streaming : le texte réécrit arrive token par token en
+    Server-Sent Events (voir posts/streaming.py).
+    """
+    permission_classes = [IsAuthenticatedByRefreshToken, permissions.IsAdminUser]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def post(self, request, pk):
+        post = get_object_or_404(Post, pk=pk, author=request.user)
+        original_text = request.data.get("text", post.content)
+        try:
+            events = streaming.event_stream(request, original_text)
+        except Exception as exc:
+            status_code, body, headers = ai.error_response(exc)
+            return Response(body, status=status_code, headers=headers)
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Pas de mise en tampon par un éventuel proxy nginx
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class SuggestionMetricsView(APIView):
+    """
+    GET /api/posts/suggestions/metrics/
+    Durées moyennes des appels IA (chargement de l'encodeur, création du client,
+    troncature, attente d'une place, complétion), tokens consommés et appels
+    refusés par les garde-fous, cumulés sur tous les workers.
+    """
+    permission_classes = [IsAuthenticatedByRefreshToken, permissions.IsAdminUser]
 
-        # Tronquer pour limiter la consommation de tokens
-        safe_text = truncate_text(original_text, MAX_INPUT_TOKENS)
+    def get(self, request):
+        data = metrics.snapshot(durations=ai.TIMING_METRICS, totals=limits.TOTAL_METRICS)
+        return Response(data, status=status.HTTP_200_OK)
 
-        # Construire un prompt clair pour que le modèle renvoie uniquement le texte réécrit
-        prompt = (
-            "Réécris ce paragraphe en français, de manière fluide et enrichie, "
-            "prêt à être publié. Ne renvoie que le texte, sans balises, sans code, "
-            "sans explications :\n\n"
-            f"{safe_text}"
-        )
+class SuggestionJobView(APIView):
+    """
+    GET /api/posts/<pk>/suggestions/<job_id>/
+    État du job ; une fois terminé, le texte réécrit est dans "réponse".
+    Un job échoué renvoie le statut HTTP de l'erreur IA (429, 502, 504...).
+    """
+    permission_classes = [IsAuthenticatedByRefreshToken, permissions.IsAdminUser]
 
-        try:
-            # Appel à l'endpoint completions de Deepseek
-            response = openai_client.completions.create(
-                model="deepseek/deepseek-r1-0528:free",
-                prompt=prompt,
-                max_tokens=MAX_RESPONSE_TOKENS,
-                temperature=0.5,
-                top_p=1.0,
-                frequency_penalty=0.0,
-                presence_penalty=0.0,
-                timeout=60,
-            )
-
-            rewritten = (response.choices[0].text or "").strip()
-            if not rewritten:
-                logger.error("Deepseek a renvoyé un texte vide")
-                return Response(
-                    {"error": "Réponse IA vide"},
-                    status=status.HTTP_502_BAD_GATEWAY
-                )
-
-            # Répondre dans la propriété "réponse"
-            return Response({"réponse": rewritten}, status=status.HTTP_200_OK)
-
-        except RateLimitError as e:
-            retry_after = e.headers.get("Retry-After", "60")
-            logger.warning(f"Rate limit atteint, retry_after={retry_after}s")
-            return Response(
-                {"error": "Limite de débit atteinte", "retry_after": retry_after},
-                status=status.HTTP_429_TOO_MANY_REQUESTS,
-                headers={"Retry-After": retry_after},
-            )
-
-        except APIError as e:
-            logger.error(f"Erreur API Deepseek : {e}")
-            return Response(
-                {"error": "Service IA temporairement indisponible"},
-                status=status.HTTP_502_BAD_GATEWAY
-            )
-
-        except Timeout as e:
-            logger.error(f"Timeout IA : {e}")
-            return Response(
-                {"error": "Le service IA a mis trop de temps à répondre"},
-                status=status.HTTP_504_GATEWAY_TIMEOUT
-            )
-
-        except OpenAIError as e:
-            logger.exception(f"OpenAIError : {e}")
-            return Response(
-                {"error": "Erreur interne IA"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-
-        except Exception as e:
-            logger.exception(f"Erreur inattendue : {e}")
-            return Response(
-                {"error": "Erreur serveur inattendue"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-
-# 5 pour les commentaires
-class CommentPagination(PageNumberPagination):
-    page_size = 5
+    def get(self, request, pk, job_id):
+        job = get_object_or_404(SuggestionJob, pk=job_id, post_id=pk, user=request.user)
+        data = SuggestionJobSerializer(job).data
+        if job.status == SuggestionJob.FAILED:
+            # Même corps que l'ancien appel bloquant : {"error": ..., "retry_after": ...}
+            data.update(job.error)
+            headers = {}
+            if 'retry_after' in job.error:
+                headers['Retry-After'] = job.error['retry_after']
+            return Response(data, status=job.error_status, headers=headers)
+        return Response(data, status=status.HTTP_200_OK)
+
+# 5 pour les commentaires, par curseur sur (created_at, id)
+class CommentPagination(CursorPagination):
+    page_size = COMMENT_PAGE_SIZE
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = ('created_at', 'id')
+
+# Pagination par curseur (keyset) pour le fil : pas d'OFFSET, coût constant quelle que soit la page
+class PostCursorPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('-published_at', '-id')
+
+class TimelinePagination(PostCursorPagination):
+    """
+    Fil sans filtre, lu dans l'index Redis de posts/timeline.py : une lecture de
+    plage puis `pk IN (...)`. Le curseur porte la clé (published_at, id) du bord de la page ;
+    la réponse a la même forme que celle de PostCursorPagination.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        direction, key = self.decode_timeline_cursor(request)
+        keys = timeline.read(
+            before=key if direction == 'n' else None, after=key if direction == 'p' else None, limit=size + 1
+        )
+        has_more = len(keys) > size
+        if direction == 'p':
+            # Les plus proches du curseur sont à la fin ; le premier signale une page précédente
+            keys = keys[1:] if has_more else keys
+            self.next_key = keys[-1] if keys else None
+            self.previous_key = keys[0] if has_more else None
+        else:
+            keys = keys[:size]
+            self.next_key = keys[-1] if has_more else None
+            self.previous_key = keys[0] if direction == 'n' and keys else None
+
+        ids = [timeline.parse_key(key)[1] for key in keys]
+        posts = {post.pk: post for post in queryset.filter(pk__in=ids)}
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def decode_timeline_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, None
+        try:
+            direction, key = b64decode(encoded.encode(), altchars=b'-_').decode().split('|')
+            timeline.parse_key(key)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in ('n', 'p'):
+            raise NotFound(self.invalid_cursor_message)
+        return direction, key
+
+    def timeline_link(self, direction, key):
+        if key is None:
+            return None
+        encoded = b64encode(f'{direction}|{key}'.encode(), altchars=b'-_').decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        return self.timeline_link('n', self.next_key)
+
+    def get_previous_link(self):
+        return self.timeline_link('p', self.previous_key)
 
 class PostListView(APIView):
     permission_classes = [permissions.AllowAny] 
 
+    @timeline.publishes_due_posts
+    @conditional_response(post_list_etag, post_list_last_modified)
+    @cache_response('global')
     def get(self, request):
-        tag_slug = request.query_params.get('tag', None)
-        posts = Post.objects.all()
-        if tag_slug:
-            posts = posts.filter(tags__slug=tag_slug)
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # ?tags=django,python&match=all|any (any par défaut) ; ?tag=<slug> reste accepté
+        tags = request.query_params.get('tags') or request.query_params.get('tag') or ''
+        slugs = {slug.strip() for slug in tags.split(',') if slug.strip()}
+        match = request.query_params.get('match', 'any')
+        if match not in ('all', 'any'):
+            return Response({'error': 'match doit valoir all ou any'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(slugs) > MAX_FILTER_TAGS:
+            return Response({'error': f'{MAX_FILTER_TAGS} tags au maximum'}, status=status.HTTP_400_BAD_REQUEST)
+        posts = (
+            Post.objects.published()
+            .select_related('author')
+            .prefetch_related('tags')
+            .annotate(excerpt=Left('content', EXCERPT_LENGTH))
+            .defer('content')
+        )
+        if slugs:
+            posts = posts.tagged(slugs, match_all=match == 'all')
+        # Sans index partagé (cache locmem), le curseur SQL lit directement l'index (published_at, id)
+        paginator = TimelinePagination() if not slugs and timeline.uses_index() else PostCursorPagination()
+        page = paginator.paginate_queryset(posts, request, view=self)
+        serializer = PostListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+class PostSearchView(APIView):
+    """
+    GET /api/posts/search/?q=...&limit=20
+    Recherche plein texte (racinisation française), résultats classés et surlignés.
+    """
+    permission_classes = [permissions.AllowAny]
+    default_limit = 20
+    max_limit = 50
+
+    @cache_response('global')
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Paramètre q requis'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        results = search.search(query, max(limit, 1))
+        serializer = PostSearchResultSerializer(results, many=True)
+        return Response({'query': query, 'results': serializer.data}, status=status.HTTP_200_OK)
 
 class PostDetailView(APIView):
     permission_classes = [permissions.AllowAny]  
 
+    @conditional_response(post_detail_etag, None)
+    @cache_response('post:{pk}', 'tags')
     def get(self, request, pk):
-        post = get_object_or_404(Post, pk=pk, published_at__lte=timezone.now())
+        post = get_object_or_404(Post.objects.published().with_details(), pk=pk)
         serializer = PostSerializer(post)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -183,13 +272,32 @@ class PostUpdateView(APIView):
         logger.warning(f"Échec de la mise à jour du post : {serializer.errors}")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class CommentListView(APIView):
+    """
+    GET /api/posts/<pk>/comments/
+    Commentaires d'un post publié, paginés par curseur (voir CommentPagination).
+    """
+    permission_classes = [permissions.AllowAny]
+
+    @cache_response('post:{pk}')
+    def get(self, request, pk):
+        post = get_object_or_404(Post.objects.published(), pk=pk)
+        comments = Comment.objects.filter(post=post).select_related('author')
+        paginator = CommentPagination()
+        page = paginator.paginate_queryset(comments, request, view=self)
+        serializer = CommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
 class CommentCreateView(APIView):
     permission_classes = [IsAuthenticatedByRefreshToken]  
     def post(self, request, pk):
         post = get_object_or_404(Post, pk=pk, published_at__lte=timezone.now())
         serializer = CommentSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(author=request.user, post=post)
+            with transaction.atomic():
+                serializer.save(author=request.user, post=post)
+                post.increment_counter('comment_count')
+                author_stats.increment(post.author_id, 'comment_count')
             logger.info(f"Commentaire ajouté par {request.user.username} sur le post {post.title}")
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         logger.warning(f"Échec de la création du commentaire : {serializer.errors}")
@@ -206,33 +314,65 @@ class ReactionToggleView(APIView):
         if emoji not in dict(Reaction.EMOJI_CHOICES).keys():
             return Response({'error': 'Emoji invalide'}, status=status.HTTP_400_BAD_REQUEST)
         
-        reaction = Reaction.objects.filter(post=post, user=request.user, emoji=emoji).first()
-        if reaction:
-            reaction.delete()
-        else:
-            Reaction.objects.create(post=post, user=request.user, emoji=emoji)
-
-        
+        with transaction.atomic():
+            deleted, _ = Reaction.objects.filter(post=post, user=request.user, emoji=emoji).delete()
+            delta = -1 if deleted else 1
+            if not deleted:
+                Reaction.objects.create(post=post, user=request.user, emoji=emoji)
+            post.increment_counter(reaction_count_field(emoji), delta)
+            author_stats.increment(post.author_id, reaction_count_field(emoji), delta)
+
+        post = Post.objects.with_details().get(pk=post.pk)
         serializer = PostSerializer(post, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class AboutAuthorView(APIView):
     permission_classes = [permissions.AllowAny]  
 
+    @timeline.publishes_due_posts
+    @cache_response('author:{author_id}', 'tags')
     def get(self, request, author_id):
         author = get_object_or_404(User, pk=author_id)
-        posts = Post.objects.filter(author=author, published_at__lte=timezone.now())
-        author_data = UserSerializer(author).data
-        posts_data = PostSerializer(posts, many=True).data
+        # Résumés paginés comme le fil ; le détail complet reste sur /api/posts/<pk>/
+        posts = (
+            Post.objects.filter(author=author).published()
+            .select_related('author')
+            .prefetch_related('tags')
+            .annotate(excerpt=Left('content', EXCERPT_LENGTH))
+            .defer('content')
+        )
+        paginator = PostCursorPagination()
+        page = paginator.paginate_queryset(posts, request, view=self)
         return Response({
-            'author': author_data,
-            'posts': posts_data
+            'author': UserSerializer(author).data,
+            'stats': AuthorStatsSerializer(author_stats.get(author.pk)).data,
+            'posts': {
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+                'results': PostListSerializer(page, many=True).data,
+            },
         }, status=status.HTTP_200_OK)
 
 class TagListView(APIView):
     permission_classes = [permissions.AllowAny]
 
+    # Les comptes changent avec les posts (portée global) comme avec les tags
+    @timeline.publishes_due_posts
+    @cache_response('tags', 'global')
+    def get(self, request):
+        tags = (
+            Tag.objects.annotate(post_count=Count('posts', filter=Q(posts__published_at__lte=timezone.now())))
+            .order_by('-post_count', 'name')
+        )
+        serializer = TagCountSerializer(tags, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class CacheStatsView(APIView):
+    """
+    GET /api/posts/cache/stats/
+    Compteurs de hits/miss du cache des réponses publiques, pour régler les TTL.
+    """
+    permission_classes = [IsAuthenticatedByRefreshToken, permissions.IsAdminUser]
+
     def get(self, request):
-        tags = Tag.objects.all()
-        serializer = TagSerializer(tags, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(cache_stats(), status=status.HTTP_200_OK)
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import User, PasswordResetToken
+from .models import User, PasswordResetToken, OutboundEmail
 
 admin.site.register(User)
-admin.site.register(PasswordResetToken)
\ No newline at end of file
+admin.site.register(PasswordResetToken)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    ordering = ('-created_at',)
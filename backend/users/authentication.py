@@ -0,0 +1,99 @@
+"""
+Résolution de l'utilisateur authentifié, mise en cache quelques secondes.
+
+Chaque requête authentifiée relisait l'utilisateur en base (JWTAuthentication),
+puis une seconde fois dans IsAuthenticatedByRefreshToken. Les champs dont
+l'authentification, les permissions et UserSerializer ont besoin
+(AUTH_USER_FIELDS) sont gardés dans le cache par défaut pendant
+AUTH_USER_CACHE_TIMEOUT secondes et invalidés à chaque enregistrement de
+l'utilisateur (voir users/signals.py). Les autres champs restent chargés à la
+demande, comme pour un `.only()`.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+# Authentification et permissions, plus les champs de UserSerializer : l'auteur
+# d'un post ou d'un commentaire créé est sérialisé depuis `request.user`
+AUTH_USER_FIELDS = ('id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser')
+KEY_PREFIX = 'users:auth'
+
+
+def user_cache_key(user_id):
+    return f'{KEY_PREFIX}:user:{user_id}'
+
+
+def refresh_cache_key(raw_token):
+    return f'{KEY_PREFIX}:refresh:{hashlib.sha256(raw_token.encode()).hexdigest()}'
+
+
+def _build_user(values):
+    # Instance « chargée depuis la base » : les champs absents sont différés
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    return User.from_db('default', fields, [values[name] for name in fields])
+
+
+def get_cached_user(user_id):
+    """Utilisateur limité à AUTH_USER_FIELDS, depuis le cache si possible ; None s'il n'existe pas."""
+    key = user_cache_key(user_id)
+    values = cache.get(key)
+    if values is None:
+        values = User.objects.filter(pk=user_id).values(*AUTH_USER_FIELDS).first()
+        if values is None:
+            return None
+        cache.set(key, values, settings.AUTH_USER_CACHE_TIMEOUT)
+    return _build_user(values)
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def user_id_from_refresh_token(raw_token):
+    """
+    Identifiant de l'utilisateur d'un refresh token valide et non blacklisté.
+    Le résultat est mis en cache jusqu'à l'expiration du token (au plus
+    AUTH_USER_CACHE_TIMEOUT) et invalidé quand le token est blacklisté.
+    Lève TokenError si le token est invalide.
+    """
+    key = refresh_cache_key(raw_token)
+    user_id = cache.get(key)
+    if user_id is None:
+        # Le constructeur vérifie signature, expiration et blacklist
+        token = RefreshToken(raw_token)
+        user_id = token.payload.get(api_settings.USER_ID_CLAIM)
+        if not user_id:
+            return None
+        ttl = min(settings.AUTH_USER_CACHE_TIMEOUT, int(token.payload['exp'] - time.time()))
+        if ttl > 0:
+            cache.set(key, user_id, ttl)
+    return user_id
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication dont l'utilisateur est résolu par `get_cached_user`."""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Le contrôle compare le hash du mot de passe, absent du cache
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,102 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from users.models import PasswordResetToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired refresh tokens (outstanding and blacklisted) and password-reset "
+        "tokens in bounded batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Maximum number of rows deleted per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches, to leave room for other writers.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report expired rows without deleting anything.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, purging every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=3600.0,
+            help="Seconds to wait between purges in --loop mode.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.purge(options)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def purge(self, options):
+        start = time.monotonic()
+        now = timezone.now()
+        # Les BlacklistedToken sont supprimés en cascade avec leur OutstandingToken
+        removed = {
+            OutstandingToken._meta.label: 0,
+            BlacklistedToken._meta.label: 0,
+            PasswordResetToken._meta.label: 0,
+        }
+        expired = [
+            OutstandingToken.objects.filter(expires_at__lte=now),
+            PasswordResetToken.objects.filter(expires_at__lte=now),
+        ]
+        for queryset in expired:
+            if options["dry_run"]:
+                removed[queryset.model._meta.label] = queryset.count()
+                if queryset.model is OutstandingToken:
+                    removed[BlacklistedToken._meta.label] = BlacklistedToken.objects.filter(
+                        token__expires_at__lte=now
+                    ).count()
+                continue
+            for label, count in self.delete_in_batches(queryset, options).items():
+                removed[label] = removed.get(label, 0) + count
+
+        elapsed = time.monotonic() - start
+        verb = "would be removed" if options["dry_run"] else "removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"Outstanding tokens {verb}: {removed[OutstandingToken._meta.label]}, "
+            f"blacklisted tokens {verb}: {removed[BlacklistedToken._meta.label]}, "
+            f"password reset tokens {verb}: {removed[PasswordResetToken._meta.label]} "
+            f"({elapsed:.2f}s)"
+        ))
+
+    def delete_in_batches(self, queryset, options):
+        """Supprime par lots courts : chaque transaction ne verrouille que `batch_size` lignes."""
+        removed = {}
+        model = queryset.model
+        while True:
+            # Sans tri : le parcours suit l'index sur expires_at
+            pks = list(queryset.order_by().values_list("pk", flat=True)[:options["batch_size"]])
+            if not pks:
+                break
+            with transaction.atomic():
+                _, counts = model.objects.filter(pk__in=pks).delete()
+            for label, count in counts.items():
+                removed[label] = removed.get(label, 0) + count
+            if options["pause"]:
+                time.sleep(options["pause"])
+        return removed
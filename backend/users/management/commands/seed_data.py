@@ -1,14 +1,76 @@
+import os
+import time
+
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from users import seeding
 from users.models import User
+from posts import cache
 from posts.models import Tag, Post, Comment, Reaction
 
 
 class Command(BaseCommand):
-    help = "Seed database with realistic demo data."
+    help = (
+        "Seed database with realistic demo data. With --users/--posts, generate a large "
+        "synthetic dataset instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=0, help="Number of synthetic users to create.")
+        parser.add_argument("--posts", type=int, default=0, help="Number of synthetic posts to create.")
+        parser.add_argument(
+            "--comments-per-post",
+            type=float,
+            default=3.0,
+            help="Mean comments per synthetic post (long-tailed distribution).",
+        )
+        parser.add_argument(
+            "--reactions-per-post",
+            type=float,
+            default=5.0,
+            help="Mean reactions per synthetic post (long-tailed distribution).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes writing in parallel (forced to 1 on SQLite).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Users or posts written per task, each task in its own transaction.",
+        )
+        parser.add_argument("--seed", type=int, default=None, help="Random seed, for reproducible datasets.")
 
     def handle(self, *args, **options):
+        if options["users"] or options["posts"]:
+            return self.generate(options)
+        self.seed_demo()
+
+    def generate(self, options):
+        start = time.monotonic()
+        totals = seeding.generate(
+            users=options["users"],
+            posts=options["posts"],
+            comments_per_post=options["comments_per_post"],
+            reactions_per_post=options["reactions_per_post"],
+            workers=max(1, options["workers"]),
+            chunk_size=max(1, options["chunk_size"]),
+            seed=options["seed"],
+            stdout=self.stdout,
+        )
+        # bulk_create n'envoie pas de signaux : invalider le cache des réponses à la main
+        cache.bump("global", "tags")
+        self.stdout.write(self.style.SUCCESS(
+            f"Users created: {totals['users']}, posts: {totals['posts']}, comments: {totals['comments']}, "
+            f"reactions: {totals['reactions']} ({time.monotonic() - start:.1f}s)"
+        ))
+
+    def seed_demo(self):
         users_data = [
             ("alice", "alice@example.com"),
             ("bruno", "bruno@example.com"),
@@ -115,5 +177,8 @@ class Command(BaseCommand):
             user = User.objects.get(username=username)
             Reaction.objects.get_or_create(post=post, user=user, emoji=emoji)
 
+        # Les commentaires et réactions sont créés directement : recalculer les compteurs
+        call_command("recount_posts", stdout=self.stdout)
+
         self.stdout.write(self.style.SUCCESS(f"Users created: {created_users}"))
         self.stdout.write(self.style.SUCCESS(f"Posts created: {created_posts}"))
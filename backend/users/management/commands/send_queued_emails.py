@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users import outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox (for EMAIL_OUTBOX_MODE=external)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new emails instead of exiting when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls in --loop mode.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maximum number of emails handled per poll.",
+        )
+
+    def handle(self, *args, **options):
+        retention = timedelta(seconds=settings.EMAIL_OUTBOX_RETENTION)
+        total = 0
+        while True:
+            requeued = outbox.requeue_stale(outbox.STALE_AFTER)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Requeued stale emails: {requeued}"))
+            sent = outbox.send_pending(limit=options["limit"])
+            total += sent
+            outbox.purge(retention)
+            if not options["loop"]:
+                break
+            if not sent:
+                time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(f"Emails sent: {total}"))
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='passwordresettoken',
+            index=models.Index(fields=['expires_at'], name='password_reset_expires_idx'),
+        ),
+        # Table de simplejwt : pas de Meta.indexes possible, d'où le SQL brut
+        migrations.RunSQL(
+            'CREATE INDEX outstanding_token_expires_idx ON token_blacklist_outstandingtoken (expires_at);',
+            reverse_sql='DROP INDEX outstanding_token_expires_idx;',
+        ),
+    ]
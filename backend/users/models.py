@@ -74,4 +74,45 @@ class PasswordResetToken(models.Model):
         super().save(*args, **kwargs)
 
     def is_valid(self):
-        return timezone.now() <= self.expires_at
\ No newline at end of file
+        return timezone.now() <= self.expires_at
+
+    class Meta:
+        # Purge des tokens expirés (voir la commande purge_expired_tokens)
+        indexes = [models.Index(fields=['expires_at'], name='password_reset_expires_idx')]
+
+
+class OutboundEmail(models.Model):
+    """Email en attente d'envoi, expédié par le worker de users/outbox.py."""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'En attente'),
+        (SENDING, 'En cours d’envoi'),
+        (SENT, 'Envoyé'),
+        (FAILED, 'Échoué'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = "Email sortant"
+        verbose_name_plural = "Emails sortants"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.recipients)} ({self.status})"
@@ -0,0 +1,209 @@
+"""
+File d'envoi des emails, stockée en base (OutboundEmail).
+
+La requête HTTP ne fait qu'insérer une ligne ; l'envoi est fait par lots, sur une
+seule connexion SMTP réutilisée, par :
+- `thread` (défaut) : un thread d'envoi dans chaque worker gunicorn, réveillé à
+  chaque nouvel email et par un minuteur (voir `drain`) ;
+- `external` : un processus séparé, `manage.py send_queued_emails --loop` ;
+- `inline` : envoi synchrone après commit (tests, développement).
+Un envoi échoué est retenté après EMAIL_OUTBOX_RETRY_DELAY secondes, délai doublé
+à chaque tentative, jusqu'à EMAIL_OUTBOX_MAX_ATTEMPTS.
+Le corps d'un email envoyé est effacé (il peut contenir un lien de
+réinitialisation encore valide) ; les lignes terminées sont supprimées après
+EMAIL_OUTBOX_RETENTION secondes.
+Le transport reste EMAIL_BACKEND : SMTP en production, locmem dans les tests.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger('users')
+
+# Un envoi SMTP ne dure pas dix minutes : au-delà, le worker a disparu
+STALE_AFTER = timedelta(minutes=10)
+
+_executor = None
+_executor_lock = threading.Lock()
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def _get_executor():
+    # Un seul thread : les envois d'un worker partagent la même connexion SMTP
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='outbox')
+    return _executor
+
+
+def enqueue(subject, body, recipients, from_email=None):
+    email = OutboundEmail.objects.create(
+        subject=subject, body=body, recipients=list(recipients),
+        from_email=from_email or settings.EMAIL_HOST_USER,
+    )
+    mode = settings.EMAIL_OUTBOX_MODE
+    if mode == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_drain_in_thread))
+    elif mode == 'inline':
+        transaction.on_commit(send_pending)
+    return email
+
+
+def start():
+    """
+    Mode thread, au démarrage du worker (voir gunicorn.conf.py) : reprend les emails
+    laissés par un worker arrêté et lance le drainage périodique.
+    """
+    if settings.EMAIL_OUTBOX_MODE == 'thread':
+        _get_executor().submit(_drain_in_thread)
+
+
+def drain():
+    """
+    Un passage complet : emails orphelins remis en file, envois dus, purge.
+    Renvoie le délai en secondes avant le prochain passage utile.
+    """
+    requeue_stale(STALE_AFTER)
+    send_pending()
+    purge(timedelta(seconds=settings.EMAIL_OUTBOX_RETENTION))
+    return next_drain_delay()
+
+
+def next_drain_delay():
+    # Prochain essai programmé, mais au moins un passage par intervalle pour les emails orphelins
+    interval = settings.EMAIL_OUTBOX_POLL_INTERVAL
+    next_attempt_at = (
+        OutboundEmail.objects.filter(status=OutboundEmail.PENDING)
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )
+    if next_attempt_at is None:
+        return interval
+    return min(interval, max(1.0, (next_attempt_at - timezone.now()).total_seconds()))
+
+
+def _drain_in_thread():
+    close_old_connections()
+    delay = settings.EMAIL_OUTBOX_POLL_INTERVAL
+    try:
+        delay = drain()
+    except Exception:
+        logger.exception("Échec du drainage de la file d'emails")
+    finally:
+        close_old_connections()
+        _arm_timer(delay)
+
+
+def _arm_timer(delay):
+    # Un seul minuteur par worker, réarmé à chaque passage
+    global _timer
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(delay, lambda: _get_executor().submit(_drain_in_thread))
+        _timer.daemon = True
+        _timer.start()
+
+
+def claim(email_id):
+    """Passe l'email en `sending` ; False si un autre worker l'a déjà pris."""
+    return OutboundEmail.objects.filter(pk=email_id, status=OutboundEmail.PENDING).update(
+        status=OutboundEmail.SENDING, claimed_at=timezone.now()
+    ) == 1
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def _record_failure(email, exc):
+    email.attempts += 1
+    email.last_error = str(exc)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboundEmail.FAILED
+        logger.error(f"Email {email.pk} abandonné après {email.attempts} tentatives : {exc}")
+    else:
+        email.status = OutboundEmail.PENDING
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.warning(f"Échec de l'envoi de l'email {email.pk}, nouvel essai prévu : {exc}")
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _send(connection, email):
+    message = EmailMessage(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+    try:
+        message.send(fail_silently=False)
+    except Exception as exc:
+        _record_failure(email, exc)
+        return False
+    email.attempts += 1
+    email.status = OutboundEmail.SENT
+    email.sent_at = timezone.now()
+    email.body = ''
+    email.save(update_fields=['attempts', 'status', 'sent_at', 'body'])
+    return True
+
+
+def send_pending(limit=None):
+    """
+    Envoie les emails dus, par lots de EMAIL_OUTBOX_BATCH_SIZE sur une même connexion.
+    Renvoie le nombre d'emails envoyés.
+    """
+    batch_size = settings.EMAIL_OUTBOX_BATCH_SIZE
+    sent = handled = 0
+    while limit is None or handled < limit:
+        size = batch_size if limit is None else min(batch_size, limit - handled)
+        due = (
+            OutboundEmail.objects.filter(status=OutboundEmail.PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')
+            .values_list('pk', flat=True)[:size]
+        )
+        claimed = [pk for pk in due if claim(pk)]
+        if not claimed:
+            break
+        handled += len(claimed)
+        emails = OutboundEmail.objects.filter(pk__in=claimed)
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as exc:
+            # Serveur injoignable : tout le lot est reprogrammé
+            logger.warning(f"Connexion SMTP impossible : {exc}")
+            for email in emails:
+                _record_failure(email, exc)
+            break
+        try:
+            for email in emails:
+                sent += _send(connection, email)
+        finally:
+            connection.close()
+    return sent
+
+
+def requeue_stale(older_than):
+    """Remet en attente les emails `sending` abandonnés (worker arrêté en cours d'envoi)."""
+    return OutboundEmail.objects.filter(
+        status=OutboundEmail.SENDING, claimed_at__lt=timezone.now() - older_than
+    ).update(status=OutboundEmail.PENDING)
+
+
+def purge(older_than):
+    """Supprime les emails envoyés ou abandonnés depuis plus de `older_than` ; renvoie le nombre supprimé."""
+    cutoff = timezone.now() - older_than
+    deleted, _ = OutboundEmail.objects.filter(
+        Q(status=OutboundEmail.SENT, sent_at__lt=cutoff) | Q(status=OutboundEmail.FAILED, created_at__lt=cutoff)
+    ).delete()
+    return deleted
@@ -0,0 +1,231 @@
+"""
+Générateur de données synthétiques pour `manage.py seed_data --users N --posts M`.
+
+Les distributions imitent un vrai blog :
+- auteurs : loi de Zipf, quelques auteurs très prolifiques et une longue traîne ;
+- tags : regroupés en thèmes, un post prend surtout des tags de son thème
+  (co-occurrence), parfois un tag d'ailleurs ;
+- commentaires et réactions par post : loi de Pareto (longue traîne), emojis
+  selon une loi de Zipf (LIKE bien plus fréquent qu'ANGRY).
+
+Tout est écrit par `bulk_create`, par lots, en parallèle sur plusieurs processus.
+Les compteurs dénormalisés des posts sont calculés avant l'insertion, il n'y a
+donc rien à recompter ensuite ; seules les statistiques auteurs (AuthorStats)
+sont agrégées à la fin, depuis ces compteurs. Le mot de passe n'est haché
+qu'une fois, pour tous les utilisateurs. Chaque lot a sa propre graine : un
+même `--seed` redonne les mêmes données.
+
+`bulk_create` n'envoie pas de signaux : l'index du fil (`timeline.reset`) et le
+cache des réponses (`cache.bump`, dans la commande) sont invalidés à la main,
+dans le cache configuré du processus de la commande. Un serveur qui partage ce
+cache (Redis) voit aussitôt les données générées ; avec le cache locmem, propre
+à chaque processus, un serveur démarré n'en sait rien et sert ses réponses en
+cache jusqu'à leur expiration (POSTS_CACHE_TIMEOUT) ou à son redémarrage.
+"""
+import multiprocessing
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from posts import author_stats, timeline
+from posts.models import Comment, Post, Reaction, Tag, reaction_count_field, tag_slug
+from users.models import User
+
+SEED_PASSWORD = "Password123!"
+TOPICS = {
+    "Backend": ["Django", "Python", "PostgreSQL", "API", "Celery", "Redis"],
+    "Frontend": ["React", "Vite", "CSS", "TypeScript", "Accessibilité", "UX"],
+    "Ops": ["DevOps", "Docker", "Kubernetes", "CI", "Monitoring", "Sécurité"],
+    "Data": ["Data", "SQL", "Pandas", "Visualisation", "IA", "Statistiques"],
+}
+WORDS = (
+    "application serveur requête réponse cache index base données utilisateur "
+    "performance latence déploiement conteneur interface composant état rendu "
+    "test intégration migration schéma modèle vue route sécurité token session "
+    "pagination recherche article commentaire réaction tag auteur publication "
+    "rapide simple robuste lisible efficace moderne fiable sobre clair complet"
+).split()
+COMMENT_CAP = 5000
+MAX_TAGS_PER_POST = 4
+
+# Données partagées avec les processus du pool (héritées au fork)
+_shared = {}
+
+
+def zipf_cum_weights(n, s=1.1):
+    total, weights = 0.0, []
+    for rank in range(1, n + 1):
+        total += 1 / rank ** s
+        weights.append(total)
+    return weights
+
+
+def long_tail(rng, mean, alpha):
+    """Entier de moyenne `mean` suivant une loi de Pareto (X - 1, X ~ Pareto(alpha))."""
+    return int((rng.paretovariate(alpha) - 1) * mean * (alpha - 1))
+
+
+def sentence(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def ensure_tags():
+    """Crée les tags des thèmes manquants ; renvoie {thème: [id des tags]}."""
+    existing = set(Tag.objects.values_list("name", flat=True))
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=tag_slug(name)) for names in TOPICS.values() for name in names if name not in existing],
+        ignore_conflicts=True,
+    )
+    ids = dict(Tag.objects.values_list("name", "id"))
+    return {topic: [ids[name] for name in names] for topic, names in TOPICS.items()}
+
+
+def _new_pool(workers):
+    # Les processus forkés ne doivent pas hériter d'une connexion ouverte :
+    # chacun ouvrira la sienne au premier accès à la base
+    connections.close_all()
+    return multiprocessing.get_context("fork").Pool(workers)
+
+
+def create_users(task):
+    prefix, start, count = task
+    password = _shared["password"]
+    users = [
+        User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", password=password, is_active=True)
+        for i in range(start, start + count)
+    ]
+    User.objects.bulk_create(users, batch_size=_shared["batch_size"])
+    return count
+
+
+def create_posts(task):
+    """Un lot de posts avec leurs tags, commentaires et réactions, dans une transaction."""
+    start, count, seed = task
+    rng = random.Random(seed)
+    user_ids = _shared["user_ids"]
+    author_weights = _shared["author_weights"]
+    topics = _shared["topics"]
+    topic_names = list(topics)
+    topic_weights = zipf_cum_weights(len(topic_names), s=0.8)
+    all_tags = [tag for ids in topics.values() for tag in ids]
+    emojis = [emoji for emoji, _ in Reaction.EMOJI_CHOICES]
+    emoji_weights = zipf_cum_weights(len(emojis), s=1.5)
+    now = timezone.now()
+    options = _shared["options"]
+
+    posts, plans = [], []
+    for _ in range(count):
+        topic = rng.choices(topic_names, cum_weights=topic_weights)[0]
+        tag_ids = set(rng.sample(topics[topic], rng.randint(1, MAX_TAGS_PER_POST - 1)))
+        if rng.random() < 0.2:
+            tag_ids.add(rng.choice(all_tags))
+        n_comments = min(long_tail(rng, options["comments_per_post"], 1.5), COMMENT_CAP)
+        n_reactions = min(long_tail(rng, options["reactions_per_post"], 1.2), len(user_ids))
+        reaction_emojis = rng.choices(emojis, cum_weights=emoji_weights, k=n_reactions)
+        post = Post(
+            title=sentence(rng, rng.randint(3, 8))[:200],
+            content="\n\n".join(sentence(rng, rng.randint(12, 40)) for _ in range(rng.randint(2, 12))),
+            author_id=rng.choices(user_ids, cum_weights=author_weights)[0],
+            published_at=now - timedelta(seconds=rng.randint(0, 2 * 365 * 24 * 3600)),
+            comment_count=n_comments,
+        )
+        for emoji in reaction_emojis:
+            field = reaction_count_field(emoji)
+            setattr(post, field, getattr(post, field) + 1)
+        posts.append(post)
+        plans.append((tag_ids, n_comments, reaction_emojis))
+
+    batch_size = _shared["batch_size"]
+    created = {"posts": count, "comments": 0, "reactions": 0}
+    with transaction.atomic():
+        Post.objects.bulk_create(posts, batch_size=batch_size)
+        through = Post.tags.through
+        through.objects.bulk_create(
+            [through(post_id=post.pk, tag_id=tag_id) for post, (tag_ids, _, _) in zip(posts, plans) for tag_id in tag_ids],
+            batch_size=batch_size,
+        )
+        comments, reactions = [], []
+        for post, (_, n_comments, reaction_emojis) in zip(posts, plans):
+            comments.extend(
+                Comment(post_id=post.pk, author_id=rng.choice(user_ids), content=sentence(rng, rng.randint(4, 30)))
+                for _ in range(n_comments)
+            )
+            # Un utilisateur distinct par réaction : la contrainte (post, user, emoji) est respectée
+            reactors = rng.sample(user_ids, len(reaction_emojis))
+            reactions.extend(
+                Reaction(post_id=post.pk, user_id=user_id, emoji=emoji)
+                for user_id, emoji in zip(reactors, reaction_emojis)
+            )
+            if len(comments) >= batch_size:
+                Comment.objects.bulk_create(comments, batch_size=batch_size)
+                created["comments"] += len(comments)
+                comments = []
+            if len(reactions) >= batch_size:
+                Reaction.objects.bulk_create(reactions, batch_size=batch_size)
+                created["reactions"] += len(reactions)
+                reactions = []
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+        Reaction.objects.bulk_create(reactions, batch_size=batch_size)
+        created["comments"] += len(comments)
+        created["reactions"] += len(reactions)
+    return created
+
+
+def _run(pool, func, tasks):
+    return pool.imap_unordered(func, tasks) if pool else map(func, tasks)
+
+
+def generate(users, posts, comments_per_post, reactions_per_post, workers, chunk_size, seed, stdout):
+    """Insère `users` utilisateurs puis `posts` posts synthétiques ; renvoie les totaux créés."""
+    rng = random.Random(seed)
+    if connection.vendor == "sqlite":
+        # Un seul écrivain à la fois sous SQLite : le parallélisme n'apporterait que des verrous
+        workers = 1
+    _shared.update(
+        password=make_password(SEED_PASSWORD),
+        batch_size=min(chunk_size, 1000),
+        topics=ensure_tags(),
+        options={"comments_per_post": comments_per_post, "reactions_per_post": reactions_per_post},
+    )
+    prefix = f"seed{rng.getrandbits(24):06x}_"
+    totals = {"users": 0, "posts": 0, "comments": 0, "reactions": 0}
+
+    pool = _new_pool(workers) if workers > 1 else None
+    try:
+        user_tasks = [(prefix, start, count) for start, count in chunks(users, chunk_size)]
+        for count in _run(pool, create_users, user_tasks):
+            totals["users"] += count
+        stdout.write(f"Users created: {totals['users']}")
+
+        user_ids = list(User.objects.order_by("pk").values_list("pk", flat=True))
+        if not user_ids:
+            return totals
+        rng.shuffle(user_ids)
+        _shared.update(user_ids=user_ids, author_weights=zipf_cum_weights(len(user_ids)))
+        if pool:
+            # Les listes d'ids partagées ne sont connues qu'après la création des utilisateurs
+            pool.close()
+            pool.join()
+            pool = _new_pool(workers)
+
+        post_tasks = [(start, count, rng.random()) for start, count in chunks(posts, chunk_size)]
+        for done, created in enumerate(_run(pool, create_posts, post_tasks), start=1):
+            for key, value in created.items():
+                totals[key] += value
+            stdout.write(f"Post batches: {done}/{len(post_tasks)} ({totals['posts']} posts)")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    # bulk_create n'envoie pas de signaux : statistiques auteurs et index du fil sont refaits en fin de génération
+    author_stats.refresh_all(chunk_size)
+    timeline.reset()
+    return totals
@@ -0,0 +1,18 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import invalidate_user, refresh_cache_key
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def invalidate_cached_refresh_token(sender, instance, **kwargs):
+    # Un token blacklisté ne doit plus être accepté depuis le cache
+    cache.delete(refresh_cache_key(instance.token.token))
@@ -0,0 +1,67 @@
+# users/tests/test_authentication.py
+from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.authentication import CachedJWTAuthentication, get_cached_user
+from users.models import User
+from users.serializers import UserSerializer
+from posts.permissions import IsAuthenticatedByRefreshToken
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+class CachedUserResolutionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User(username='testuser', email='testuser@example.com', is_staff=True)
+        self.user.set_password('TestPassword123')
+        self.user.save()
+        self.refresh = RefreshToken.for_user(self.user)
+
+    def bearer_request(self):
+        request = self.factory.post('/', HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        return Request(request, authenticators=[CachedJWTAuthentication()])
+
+    def cookie_request(self):
+        request = self.factory.post('/')
+        request.COOKIES['refresh_token'] = str(self.refresh)
+        return Request(request, authenticators=[])
+
+    def test_warm_bearer_request_hits_no_database(self):
+        self.assertEqual(self.bearer_request().user.pk, self.user.pk)
+        with self.assertNumQueries(0):
+            request = self.bearer_request()
+            self.assertTrue(IsAuthenticatedByRefreshToken().has_permission(request, None))
+            self.assertTrue(request.user.is_staff)
+            self.assertEqual(request.user.username, 'testuser')
+
+    def test_warm_cookie_request_hits_no_database(self):
+        self.assertTrue(IsAuthenticatedByRefreshToken().has_permission(self.cookie_request(), None))
+        with self.assertNumQueries(0):
+            request = self.cookie_request()
+            self.assertTrue(IsAuthenticatedByRefreshToken().has_permission(request, None))
+            self.assertEqual(request.user.pk, self.user.pk)
+
+    def test_serialized_fields_come_from_the_cache(self):
+        get_cached_user(self.user.pk)
+        with self.assertNumQueries(0):
+            data = UserSerializer(get_cached_user(self.user.pk)).data
+        self.assertEqual(data['email'], 'testuser@example.com')
+
+    def test_other_fields_are_loaded_on_demand(self):
+        self.assertEqual(get_cached_user(self.user.pk).created_at, self.user.created_at)
+
+    def test_cache_is_invalidated_on_save(self):
+        get_cached_user(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(IsAuthenticatedByRefreshToken().has_permission(self.cookie_request(), None))
+
+    def test_blacklisted_refresh_token_is_rejected(self):
+        self.assertTrue(IsAuthenticatedByRefreshToken().has_permission(self.cookie_request(), None))
+        self.refresh.blacklist()
+        self.assertFalse(IsAuthenticatedByRefreshToken().has_permission(self.cookie_request(), None))
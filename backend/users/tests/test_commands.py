@@ -0,0 +1,63 @@
+# users/tests/test_commands.py
+from django.test import TestCase
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from users.models import User, PasswordResetToken
+from posts.models import Post
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+class PurgeExpiredTokensTests(TestCase):
+    def setUp(self):
+        self.user = User(username='testuser', email='testuser@example.com')
+        self.user.set_password('TestPassword123')
+        self.user.save()
+        now = timezone.now()
+        for i in range(5):
+            token = OutstandingToken.objects.create(
+                user=self.user, jti=f'expired-{i}', token=f'expired-{i}', expires_at=now - timedelta(days=1)
+            )
+            if i % 2 == 0:
+                BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.create(user=self.user, jti='fresh', token='fresh', expires_at=now + timedelta(days=1))
+        PasswordResetToken.objects.create(user=self.user, expires_at=now - timedelta(hours=2))
+        PasswordResetToken.objects.create(user=self.user)
+
+    def purge(self, *args):
+        out = StringIO()
+        call_command('purge_expired_tokens', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_purge_removes_only_expired_rows(self):
+        output = self.purge()
+        self.assertIn('Outstanding tokens removed: 5', output)
+        self.assertIn('blacklisted tokens removed: 3', output)
+        self.assertIn('password reset tokens removed: 1', output)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['fresh'])
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
+        self.assertEqual(PasswordResetToken.objects.count(), 1)
+
+    def test_dry_run_deletes_nothing(self):
+        output = self.purge('--dry-run')
+        self.assertIn('Outstanding tokens would be removed: 5', output)
+        self.assertIn('blacklisted tokens would be removed: 3', output)
+        self.assertEqual(OutstandingToken.objects.count(), 6)
+        self.assertEqual(PasswordResetToken.objects.count(), 2)
+
+class SyntheticSeedDataTests(TestCase):
+    def test_generates_requested_volume_with_consistent_counters(self):
+        out = StringIO()
+        call_command('seed_data', '--users', '50', '--posts', '120', '--chunk-size', '40', '--seed', '1', stdout=out)
+        self.assertIn('Users created: 50, posts: 120', out.getvalue())
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertTrue(Post.tags.through.objects.exists())
+
+        out = StringIO()
+        call_command('recount_posts', '--dry-run', stdout=out)
+        self.assertIn('would be repaired: 0', out.getvalue())
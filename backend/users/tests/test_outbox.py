@@ -0,0 +1,100 @@
+# users/tests/test_outbox.py
+from unittest import mock
+from smtplib import SMTPException
+from django.test import TestCase, override_settings
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import User, OutboundEmail
+from users import outbox
+import logging
+
+# Désactiver les logs pendant les tests pour éviter le bruit
+logging.disable(logging.CRITICAL)
+
+@override_settings(EMAIL_OUTBOX_MODE='external')
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User(username='testuser', email='testuser@example.com')
+        self.user.set_password('TestPassword123')
+        self.user.save()
+
+    def test_reset_request_only_queues_the_email(self):
+        response = self.client.post(reverse('password_reset_request'), {'email': 'testuser@example.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.PENDING)
+
+        out = StringIO()
+        call_command('send_queued_emails', stdout=out)
+        self.assertIn('Emails sent: 1', out.getvalue())
+        self.assertEqual(mail.outbox[0].to, ['testuser@example.com'])
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.SENT)
+
+    @override_settings(EMAIL_OUTBOX_MODE='inline')
+    def test_inline_mode_sends_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.enqueue('Sujet', 'Corps', ['a@example.com'])
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_OUTBOX_BATCH_SIZE=10)
+    def test_batch_reuses_one_connection(self):
+        for i in range(3):
+            outbox.enqueue('Sujet', 'Corps', [f'user{i}@example.com'])
+        with mock.patch('users.outbox.get_connection', wraps=get_connection) as connect:
+            self.assertEqual(outbox.send_pending(), 3)
+        connect.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_failed_send_is_retried_with_backoff(self):
+        email = outbox.enqueue('Sujet', 'Corps', ['a@example.com'])
+        with mock.patch('users.outbox.EmailMessage.send', side_effect=SMTPException('indisponible')):
+            self.assertEqual(outbox.send_pending(), 0)
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboundEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+            # Pas encore dû : rien n'est retenté
+            self.assertEqual(outbox.send_pending(), 0)
+            self.assertEqual(OutboundEmail.objects.get().attempts, 1)
+
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            outbox.send_pending()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertEqual(email.last_error, 'indisponible')
+
+    @override_settings(EMAIL_OUTBOX_RETRY_DELAY=60, EMAIL_OUTBOX_POLL_INTERVAL=300)
+    def test_drain_recovers_orphans_and_waits_for_next_retry(self):
+        self.assertEqual(outbox.next_drain_delay(), 300)
+        orphan = outbox.enqueue('Sujet', 'Corps', ['a@example.com'])
+        OutboundEmail.objects.filter(pk=orphan.pk).update(
+            status=OutboundEmail.SENDING, claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        failing = outbox.enqueue('Sujet', 'Corps', ['b@example.com'])
+        with mock.patch('users.outbox.EmailMessage.send', side_effect=[1, SMTPException('indisponible')]):
+            delay = outbox.drain()
+        # Le minuteur se réveille pour le prochain essai, pas à la fin de l'intervalle
+        self.assertAlmostEqual(delay, 60, delta=5)
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, OutboundEmail.SENT)
+        self.assertEqual(OutboundEmail.objects.get(pk=failing.pk).status, OutboundEmail.PENDING)
+
+    @override_settings(EMAIL_OUTBOX_RETENTION=3600)
+    def test_sent_emails_lose_their_body_and_are_purged(self):
+        email = outbox.enqueue('Sujet', 'Lien secret', ['a@example.com'])
+        outbox.drain()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.body), (OutboundEmail.SENT, ''))
+
+        OutboundEmail.objects.update(sent_at=timezone.now() - timedelta(hours=2))
+        outbox.drain()
+        self.assertFalse(OutboundEmail.objects.exists())
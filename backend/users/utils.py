@@ -1,9 +1,9 @@
 import secrets
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 from .models import User, PasswordResetToken
+from . import outbox
 
 
 def send_reset_email(user, token):
@@ -19,10 +19,5 @@ def send_reset_email(user, token):
 
     Si vous n'avez pas fait cette demande, ignorez cet email.
     """
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [user.email],
-        fail_silently=False,
-    )
\ No newline at end of file
+    # Mis en file : l'envoi SMTP se fait hors de la requête (voir users/outbox.py)
+    outbox.enqueue(subject, message, [user.email], settings.EMAIL_HOST_USER)
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""
+Instrumentation par requête, exposée dans l'en-tête `Server-Timing` :
+
+    Server-Timing: db;dur=12.4;desc="7 queries", cache;dur=0.8;desc="3 hits / 1 misses",
+                   ser;dur=4.1, http;dur=0.0, app;dur=25.3
+
+- db    : temps et nombre de requêtes SQL (`connection.execute_wrapper`) ;
+- cache : temps, hits et misses des backends de cache ;
+- ser   : temps passé dans `serializer.data` (DRF) ;
+- http  : temps des appels HTTP sortants faits par httpx (client OpenAI) ;
+- app   : durée totale de la vue et des middlewares suivants.
+
+Quand une même forme de requête SQL est exécutée plus de
+SERVER_TIMING_N_PLUS_ONE_THRESHOLD fois pendant une requête, un avertissement
+structuré (N+1) est journalisé.
+
+Actif par défaut (SERVER_TIMING_ENABLED) ; l'en-tête de requête `X-Server-Timing: 0`
+ou `1` le désactive ou l'active pour une requête. Les mesures révèlent le coût
+interne des endpoints : l'en-tête de réponse n'est renvoyé qu'en DEBUG ou aux
+membres du staff, l'avertissement N+1 est journalisé pour toutes les requêtes.
+Hors requête instrumentée, les points d'accroche se réduisent à la lecture d'une
+ContextVar.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('utils.server_timing')
+
+_current = ContextVar('server_timing', default=None)
+_MISSING = object()
+_installed = False
+
+# Listes de paramètres de longueur variable : `IN (%s, %s, %s)` -> `IN (...)`
+_PARAM_LIST_RE = re.compile(r'\((?:%s|\?)(?:,\s*(?:%s|\?))*\)')
+
+
+def sql_shape(sql):
+    return _PARAM_LIST_RE.sub('(...)', sql)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations = Counter()
+        self.queries = 0
+        self.shapes = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._serializer_depth = 0
+        self._cache_depth = 0
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def record_query(self, sql, seconds):
+        self.queries += 1
+        self.shapes[sql_shape(sql)] += 1
+        self.add('db', seconds)
+
+    def repeated_queries(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def header(self, total):
+        def ms(seconds):
+            return f'{seconds * 1000:.1f}'
+        return ', '.join([
+            f'db;dur={ms(self.durations["db"])};desc="{self.queries} queries"',
+            f'cache;dur={ms(self.durations["cache"])};desc="{self.cache_hits} hits / {self.cache_misses} misses"',
+            f'ser;dur={ms(self.durations["ser"])}',
+            f'http;dur={ms(self.durations["http"])}',
+            f'app;dur={ms(total)}',
+        ])
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.record_query(sql, time.perf_counter() - start)
+
+
+def _timed(name, method):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings.add(name, time.perf_counter() - start)
+    wrapper._server_timing = True
+    return wrapper
+
+
+def _outermost_cache_call(method):
+    """
+    Les méthodes par défaut de BaseCache s'appellent entre elles (`get_many` appelle
+    `get`, `set_many` appelle `set`...) : seul l'appel le plus externe est compté.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        timings = _current.get()
+        if timings is None or timings._cache_depth:
+            return method.__wrapped__(self, *args, **kwargs)
+        timings._cache_depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            timings._cache_depth -= 1
+    wrapper._server_timing = True
+    return wrapper
+
+
+def _instrument_cache_class(cls):
+    if getattr(cls.get, '_server_timing', False):
+        return
+    get, get_many = cls.get, cls.get_many
+
+    @wraps(get)
+    def timed_get(self, key, default=None, version=None):
+        timings = _current.get()
+        start = time.perf_counter()
+        value = get(self, key, _MISSING, version)
+        timings.add('cache', time.perf_counter() - start)
+        if value is _MISSING:
+            timings.cache_misses += 1
+            return default
+        timings.cache_hits += 1
+        return value
+
+    @wraps(get_many)
+    def timed_get_many(self, keys, version=None):
+        timings = _current.get()
+        keys = list(keys)
+        start = time.perf_counter()
+        values = get_many(self, keys, version)
+        timings.add('cache', time.perf_counter() - start)
+        timings.cache_hits += len(values)
+        timings.cache_misses += len(keys) - len(values)
+        return values
+
+    cls.get = _outermost_cache_call(timed_get)
+    cls.get_many = _outermost_cache_call(timed_get_many)
+    for name in ('set', 'add', 'delete', 'delete_many', 'set_many', 'incr', 'decr'):
+        setattr(cls, name, _outermost_cache_call(_timed('cache', getattr(cls, name))))
+
+
+def _instrument_serializers():
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data.fget
+
+    def timed_data(self):
+        timings = _current.get()
+        # Les serializers imbriqués passent aussi par ici : seul le plus externe est compté
+        if timings is None or timings._serializer_depth:
+            return data(self)
+        timings._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return data(self)
+        finally:
+            timings._serializer_depth -= 1
+            timings.add('ser', time.perf_counter() - start)
+
+    BaseSerializer.data = property(timed_data)
+
+
+def _instrument_http():
+    try:
+        import httpx
+    except ImportError:
+        return
+    httpx.Client.send = _timed('http', httpx.Client.send)
+    send = httpx.AsyncClient.send
+
+    @wraps(send)
+    async def timed_send(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return await send(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await send(*args, **kwargs)
+        finally:
+            timings.add('http', time.perf_counter() - start)
+
+    httpx.AsyncClient.send = timed_send
+
+
+def install():
+    """Pose les points d'accroche une fois par processus (cache, serializers, httpx)."""
+    global _installed
+    if _installed:
+        return
+    from django.core.cache import caches
+    for alias in settings.CACHES:
+        _instrument_cache_class(type(caches[alias]))
+    _instrument_serializers()
+    _instrument_http()
+    _installed = True
+
+
+def is_enabled(request):
+    flag = request.headers.get('X-Server-Timing')
+    if flag in ('0', '1'):
+        return flag == '1'
+    return settings.SERVER_TIMING_ENABLED
+
+
+def may_expose(request):
+    """L'en-tête de réponse n'est renvoyé qu'en DEBUG ou à un membre du staff (utilisateur authentifié par la vue)."""
+    if settings.DEBUG:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        if not is_enabled(request):
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if may_expose(request):
+            response['Server-Timing'] = timings.header(time.perf_counter() - start)
+        self.report_repeated_queries(request, timings)
+        return response
+
+    def report_repeated_queries(self, request, timings):
+        threshold = settings.SERVER_TIMING_N_PLUS_ONE_THRESHOLD
+        for shape, count in timings.repeated_queries(threshold):
+            match = getattr(request, 'resolver_match', None)
+            details = {
+                'event': 'n_plus_one',
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'count': count,
+                'sql': shape,
+            }
+            logger.warning(f"Requête SQL répétée {count} fois : {json.dumps(details, ensure_ascii=False)}",
+                           extra=details)
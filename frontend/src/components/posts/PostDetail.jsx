@@ -90,6 +90,7 @@ const PostDetail = () => {
       setPost((prevPost) => ({
         ...prevPost,
         comments: [...(prevPost.comments || []), newComment],
+        comment_count: (prevPost.comment_count || 0) + 1,
       }));
 
       setComment("");
@@ -266,7 +267,7 @@ const PostDetail = () => {
 
           <div className="border-t border-gray-200 dark:border-gray-700 pt-6">
             <h2 className="text-xl font-semibold text-gray-900 dark:text-white mb-4">
-              Commentaires ({post.comments?.length || 0})
+              Commentaires ({post.comment_count ?? post.comments?.length ?? 0})
             </h2>
 
             {currentUser && (
@@ -3,11 +3,19 @@ import { Link } from 'react-router-dom';
 import { useAuth } from '../../contexts/AuthContext';
 import postService from '../../services/postService';
 
+// Codes acceptés par l'API (Reaction.EMOJI_CHOICES) et leur affichage
+const REACTIONS = [
+  { code: 'LIKE', icon: '👍' },
+  { code: 'LOVE', icon: '❤️' },
+  { code: 'HAHA', icon: '😂' },
+];
+
 const PostList = () => {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
-  const [expandedPost, setExpandedPost] = useState(null);
   const { currentUser } = useAuth();
 
   useEffect(() => {
@@ -17,7 +25,8 @@ const PostList = () => {
   const fetchPosts = async () => {
     try {
       const data = await postService.getAllPosts();
-      setPosts(data);
+      setPosts(data.results);
+      setNextUrl(data.next);
     } catch (err) {
       setError(err.error || 'Erreur lors du chargement des posts');
     } finally {
@@ -25,22 +34,34 @@ const PostList = () => {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const data = await postService.getAllPosts(nextUrl);
+      setPosts(prev => [...prev, ...data.results]);
+      setNextUrl(data.next);
+    } catch (err) {
+      console.error('Erreur lors du chargement des posts suivants:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleReaction = async (postId, emoji) => {
     if (!currentUser) return;
     try {
-      const updatedPost = await postService.toggleReaction(postId, emoji);
-      setPosts(posts.map(post => post.id === postId ? updatedPost : post));
+      const updatedPost = await postService.toggleReaction(postId, { emoji });
+      // La réponse est le détail complet : on ne garde que les compteurs dans le résumé
+      setPosts(prev => prev.map(post => post.id === postId ? {
+        ...post,
+        comment_count: updatedPost.comment_count,
+        reaction_counts: updatedPost.reaction_counts,
+      } : post));
     } catch (err) {
       console.error('Erreur lors de la réaction:', err);
     }
   };
 
-  const truncateContent = (content, maxLines = 5) => {
-    const lines = content.split('\n');
-    if (lines.length <= maxLines) return content;
-    return lines.slice(0, maxLines).join('\n') + '...';
-  };
-
   if (loading) {
     return (
       <div className="flex justify-center items-center h-64">
@@ -81,25 +102,20 @@ const PostList = () => {
             <div className="flex items-center text-sm text-gray-500 dark:text-gray-400 mb-4">
               <span>Par {post.author.username}</span>
               <span className="mx-2">•</span>
-              <span>{new Date(post.created_at).toLocaleDateString()}</span>
+              <span>{new Date(post.published_at).toLocaleDateString()}</span>
             </div>
             
+            {/* Le fil ne renvoie qu'un extrait : le texte complet est sur la page du post */}
             <div className="prose dark:prose-invert max-w-none mb-4">
-              {expandedPost === post.id ? (
-                <p className="whitespace-pre-wrap">{post.content}</p>
-              ) : (
-                <p className="whitespace-pre-wrap">{truncateContent(post.content)}</p>
-              )}
+              <p className="whitespace-pre-wrap">{post.excerpt}</p>
             </div>
 
-            {post.content.split('\n').length > 5 && (
-              <button
-                onClick={() => setExpandedPost(expandedPost === post.id ? null : post.id)}
-                className="text-blue-600 hover:text-blue-800 dark:text-blue-400 dark:hover:text-blue-300 text-sm font-medium"
-              >
-                {expandedPost === post.id ? 'Voir moins' : 'Voir plus'}
-              </button>
-            )}
+            <Link
+              to={`/posts/${post.id}`}
+              className="text-blue-600 hover:text-blue-800 dark:text-blue-400 dark:hover:text-blue-300 text-sm font-medium"
+            >
+              Lire la suite
+            </Link>
 
             <div className="mt-4 flex flex-wrap gap-2">
               {post.tags.map(tag => (
@@ -113,48 +129,22 @@ const PostList = () => {
             </div>
 
             <div className="mt-4 flex items-center space-x-4">
-              <div className="flex items-center space-x-2">
-                <button
-                  onClick={() => handleReaction(post.id, '👍')}
-                  disabled={!currentUser}
-                  className={`p-2 rounded-full hover:bg-gray-100 dark:hover:bg-gray-700 ${
-                    !currentUser ? 'opacity-50 cursor-not-allowed' : ''
-                  }`}
-                >
-                  👍
-                </button>
-                <span className="text-sm text-gray-600 dark:text-gray-400">
-                  {post.reactions?.find(r => r.emoji === '👍')?.count || 0}
-                </span>
-              </div>
-              <div className="flex items-center space-x-2">
-                <button
-                  onClick={() => handleReaction(post.id, '❤️')}
-                  disabled={!currentUser}
-                  className={`p-2 rounded-full hover:bg-gray-100 dark:hover:bg-gray-700 ${
-                    !currentUser ? 'opacity-50 cursor-not-allowed' : ''
-                  }`}
-                >
-                  ❤️
-                </button>
-                <span className="text-sm text-gray-600 dark:text-gray-400">
-                  {post.reactions?.find(r => r.emoji === '❤️')?.count || 0}
-                </span>
-              </div>
-              <div className="flex items-center space-x-2">
-                <button
-                  onClick={() => handleReaction(post.id, '😂')}
-                  disabled={!currentUser}
-                  className={`p-2 rounded-full hover:bg-gray-100 dark:hover:bg-gray-700 ${
-                    !currentUser ? 'opacity-50 cursor-not-allowed' : ''
-                  }`}
-                >
-                  😂
-                </button>
-                <span className="text-sm text-gray-600 dark:text-gray-400">
-                  {post.reactions?.find(r => r.emoji === '😂')?.count || 0}
-                </span>
-              </div>
+              {REACTIONS.map(({ code, icon }) => (
+                <div key={code} className="flex items-center space-x-2">
+                  <button
+                    onClick={() => handleReaction(post.id, code)}
+                    disabled={!currentUser}
+                    className={`p-2 rounded-full hover:bg-gray-100 dark:hover:bg-gray-700 ${
+                      !currentUser ? 'opacity-50 cursor-not-allowed' : ''
+                    }`}
+                  >
+                    {icon}
+                  </button>
+                  <span className="text-sm text-gray-600 dark:text-gray-400">
+                    {post.reaction_counts?.[code] || 0}
+                  </span>
+                </div>
+              ))}
             </div>
 
             <div className="mt-4">
@@ -162,12 +152,24 @@ const PostList = () => {
                 to={`/posts/${post.id}`}
                 className="text-blue-600 hover:text-blue-800 dark:text-blue-400 dark:hover:text-blue-300 text-sm font-medium"
               >
-                Voir les commentaires ({post.comments?.length || 0})
+                Voir les commentaires ({post.comment_count || 0})
               </Link>
             </div>
           </div>
         </article>
       ))}
+
+      {nextUrl && (
+        <div className="flex justify-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 border border-gray-300 dark:border-gray-600 rounded-md text-sm font-medium text-gray-700 dark:text-gray-300 bg-white dark:bg-gray-800 hover:bg-gray-50 dark:hover:bg-gray-700 disabled:opacity-50 disabled:cursor-not-allowed"
+          >
+            {loadingMore ? 'Chargement...' : "Charger plus d'articles"}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -6,36 +6,43 @@ import postService from '../services/postService';
 const BlogCreations = () => {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [comments, setComments] = useState({});
   const [submitting, setSubmitting] = useState({});
-  const [commentPages, setCommentPages] = useState({});
+  // Commentaires chargés à l'ouverture de la section : { [postId]: { results, next } }
+  const [postComments, setPostComments] = useState({});
+  const [loadingComments, setLoadingComments] = useState({});
+  // Réactions de l'utilisateur connues depuis ses clics : { [postId]: { [emoji]: bool } }
+  const [reacted, setReacted] = useState({});
   const [expandedComments, setExpandedComments] = useState({});
   const { currentUser } = useAuth();
   const navigate = useNavigate();
 
-  const COMMENTS_PER_PAGE = 5;
-
   useEffect(() => {
     fetchPosts();
   }, [currentUser]);
 
+  // Initialiser les commentaires pour chaque post
+  const initPostState = (newPosts, reset) => {
+    const initialComments = {};
+    const initialExpanded = {};
+    newPosts.forEach(post => {
+      initialComments[post.id] = '';
+      initialExpanded[post.id] = false;
+    });
+    setComments(prev => (reset ? initialComments : { ...prev, ...initialComments }));
+    if (reset) setPostComments({});
+    setExpandedComments(prev => (reset ? initialExpanded : { ...prev, ...initialExpanded }));
+  };
+
   const fetchPosts = async () => {
     try {
       const data = await postService.getAllPosts();
-      setPosts(data);
-      // Initialiser les commentaires pour chaque post
-      const initialComments = {};
-      const initialPages = {};
-      const initialExpanded = {};
-      data.forEach(post => {
-        initialComments[post.id] = '';
-        initialPages[post.id] = 1;
-        initialExpanded[post.id] = false;
-      });
-      setComments(initialComments);
-      setCommentPages(initialPages);
-      setExpandedComments(initialExpanded);
+      setPosts(data.results);
+      setNextUrl(data.next);
+      initPostState(data.results, true);
     } catch (err) {
       setError(err.error || 'Erreur lors du chargement des posts');
     } finally {
@@ -43,40 +50,36 @@ const BlogCreations = () => {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const data = await postService.getAllPosts(nextUrl);
+      setPosts(prev => [...prev, ...data.results]);
+      setNextUrl(data.next);
+      initPostState(data.results, false);
+    } catch (err) {
+      console.error('Erreur lors du chargement des articles suivants:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleReaction = async (postId, emoji) => {
     if (!currentUser) return;
     try {
-      await postService.toggleReaction(postId, { emoji });
-      
-      // Mise à jour optimiste de l'état local
-      setPosts(posts.map(post => {
-        if (post.id === postId) {
-          // Créer une copie du post avec les réactions mises à jour
-          const updatedReactions = [...(post.reactions || [])];
-          
-          // Vérifier si l'utilisateur actuel a déjà réagi avec cet emoji
-          const userReactionIndex = updatedReactions.findIndex(
-            r => r.emoji === emoji && r.user === currentUser.id
-          );
+      const updatedPost = await postService.toggleReaction(postId, { emoji });
+      const before = posts.find(post => post.id === postId)?.reaction_counts?.[emoji] || 0;
 
-          if (userReactionIndex !== -1) {
-            // Si l'utilisateur a déjà réagi, supprimer sa réaction
-            updatedReactions.splice(userReactionIndex, 1);
-          } else {
-            // Si l'utilisateur n'a pas encore réagi, ajouter sa réaction
-            updatedReactions.push({
-              emoji,
-              user: currentUser.id,
-              created_at: new Date().toISOString()
-            });
-          }
-
-          return {
-            ...post,
-            reactions: updatedReactions
-          };
-        }
-        return post;
+      // La réponse est le détail complet : on ne garde que les compteurs dans le résumé
+      setPosts(prev => prev.map(post => post.id === postId ? {
+        ...post,
+        comment_count: updatedPost.comment_count,
+        reaction_counts: updatedPost.reaction_counts,
+      } : post));
+      // Compteur en hausse : la réaction de l'utilisateur vient d'être ajoutée
+      setReacted(prev => ({
+        ...prev,
+        [postId]: { ...prev[postId], [emoji]: updatedPost.reaction_counts[emoji] > before }
       }));
     } catch (err) {
       console.error('Erreur lors de la réaction:', err);
@@ -87,12 +90,29 @@ const BlogCreations = () => {
 
   // Fonction utilitaire pour compter les réactions
   const getReactionCount = (post, emoji) => {
-    return post.reactions?.filter(r => r.emoji === emoji).length || 0;
+    return post.reaction_counts?.[emoji] || 0;
   };
 
   // Fonction utilitaire pour vérifier si l'utilisateur a réagi
   const hasUserReacted = (post, emoji) => {
-    return post.reactions?.some(r => r.emoji === emoji && r.user === currentUser?.id);
+    return Boolean(reacted[post.id]?.[emoji]);
+  };
+
+  // Page de commentaires suivante (ou la première), ajoutée à celles déjà chargées
+  const loadComments = async (postId) => {
+    setLoadingComments(prev => ({ ...prev, [postId]: true }));
+    try {
+      const loaded = postComments[postId];
+      const data = await postService.getComments(postId, loaded?.next);
+      setPostComments(prev => ({
+        ...prev,
+        [postId]: { results: [...(prev[postId]?.results || []), ...data.results], next: data.next }
+      }));
+    } catch (err) {
+      console.error('Erreur lors du chargement des commentaires:', err);
+    } finally {
+      setLoadingComments(prev => ({ ...prev, [postId]: false }));
+    }
   };
 
   const handleCommentChange = (postId, value) => {
@@ -103,6 +123,9 @@ const BlogCreations = () => {
   };
 
   const toggleComments = (postId) => {
+    if (!expandedComments[postId] && !postComments[postId]) {
+      loadComments(postId);
+    }
     setExpandedComments(prev => ({
       ...prev,
       [postId]: !prev[postId]
@@ -115,22 +138,17 @@ const BlogCreations = () => {
 
     setSubmitting(prev => ({ ...prev, [postId]: true }));
     try {
-      await postService.addComment(postId, { content: comments[postId] });
-      // Mise à jour optimiste de l'état local
-      setPosts(posts.map(post => {
-        if (post.id === postId) {
-          return {
-            ...post,
-            comments: [...(post.comments || []), {
-              id: Date.now(), // ID temporaire
-              content: comments[postId],
-              author: currentUser,
-              created_at: new Date().toISOString()
-            }]
-          };
-        }
-        return post;
-      }));
+      const comment = await postService.addComment(postId, { content: comments[postId] });
+      setPosts(prev => prev.map(post => post.id === postId ? {
+        ...post,
+        comment_count: (post.comment_count || 0) + 1
+      } : post));
+      // Le nouveau commentaire est le plus récent : affiché seulement si la dernière page est chargée
+      setPostComments(prev => {
+        const loaded = prev[postId];
+        if (!loaded || loaded.next) return prev;
+        return { ...prev, [postId]: { ...loaded, results: [...loaded.results, comment] } };
+      });
       setComments(prev => ({ ...prev, [postId]: '' }));
     } catch (err) {
       console.error('Erreur lors de l\'ajout du commentaire:', err);
@@ -141,13 +159,6 @@ const BlogCreations = () => {
     }
   };
 
-  const handlePageChange = (postId, newPage) => {
-    setCommentPages(prev => ({
-      ...prev,
-      [postId]: newPage
-    }));
-  };
-
   const handleReadMore = (postId) => {
     navigate(`/posts/${postId}`);
   };
@@ -254,14 +265,14 @@ const BlogCreations = () => {
                     </div>
                     <div>
                       <p className="text-sm font-medium text-gray-900 dark:text-white">{post.author.username}</p>
-                      <p className="text-xs text-gray-500 dark:text-gray-400">{formatDate(post.created_at)}</p>
+                      <p className="text-xs text-gray-500 dark:text-gray-400">{formatDate(post.published_at)}</p>
                     </div>
                   </div>
                   
                   {/* Contenu */}
                   <div className="prose prose-sm dark:prose-invert mb-4 max-w-none">
                     <p className="text-gray-600 dark:text-gray-300 line-clamp-3">
-                      {post.content}
+                      {post.excerpt}
                     </p>
                   </div>
                   
@@ -332,7 +343,7 @@ const BlogCreations = () => {
                       <svg className="w-5 h-5 mr-1" fill="none" stroke="currentColor" viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg">
                         <path strokeLinecap="round" strokeLinejoin="round" strokeWidth="2" d="M8 12h.01M12 12h.01M16 12h.01M21 12c0 4.418-4.03 8-9 8a9.863 9.863 0 01-4.255-.949L3 20l1.395-3.72C3.512 15.042 3 13.574 3 12c0-4.418 4.03-8 9-8s9 3.582 9 8z"></path>
                       </svg>
-                      <span className="text-sm font-medium">{post.comments?.length || 0}</span>
+                      <span className="text-sm font-medium">{post.comment_count || 0}</span>
                     </button>
                   </div>
                   
@@ -343,7 +354,7 @@ const BlogCreations = () => {
                         <svg className="w-4 h-4 mr-1" fill="none" stroke="currentColor" viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg">
                           <path strokeLinecap="round" strokeLinejoin="round" strokeWidth="2" d="M7 8h10M7 12h4m1 8l-4-4H5a2 2 0 01-2-2V6a2 2 0 012-2h14a2 2 0 012 2v8a2 2 0 01-2 2h-3l-4 4z"></path>
                         </svg>
-                        Commentaires ({post.comments?.length || 0})
+                        Commentaires ({post.comment_count || 0})
                       </h3>
                       
                       {/* Formulaire de commentaire */}
@@ -383,69 +394,46 @@ const BlogCreations = () => {
                       
                       {/* Liste des commentaires */}
                       <div className="space-y-4">
-                        {post.comments?.length === 0 ? (
+                        {postComments[post.id]?.results.length === 0 ? (
                           <p className="text-center text-sm text-gray-500 dark:text-gray-400 py-2">
                             Aucun commentaire pour le moment. Soyez le premier à commenter !
                           </p>
                         ) : (
-                          post.comments
-                            ?.slice(
-                              (commentPages[post.id] - 1) * COMMENTS_PER_PAGE,
-                              commentPages[post.id] * COMMENTS_PER_PAGE
-                            )
-                            .map(comment => (
-                              <div key={comment.id} className="flex">
-                                <div className="flex-shrink-0 mr-3">
-                                  <div className="h-8 w-8 rounded-full bg-gray-200 dark:bg-gray-700 flex items-center justify-center text-gray-700 dark:text-gray-300 font-medium">
-                                    {comment.author.username.charAt(0).toUpperCase()}
-                                  </div>
+                          postComments[post.id]?.results.map(comment => (
+                            <div key={comment.id} className="flex">
+                              <div className="flex-shrink-0 mr-3">
+                                <div className="h-8 w-8 rounded-full bg-gray-200 dark:bg-gray-700 flex items-center justify-center text-gray-700 dark:text-gray-300 font-medium">
+                                  {comment.author.username.charAt(0).toUpperCase()}
                                 </div>
-                                <div className="flex-grow bg-white dark:bg-gray-700 rounded-lg p-3 shadow-sm">
-                                  <div className="flex items-center justify-between mb-1">
-                                    <span className="font-medium text-sm text-gray-900 dark:text-white">
-                                      {comment.author.username}
-                                    </span>
-                                    <span className="text-xs text-gray-500 dark:text-gray-400">
-                                      {formatDate(comment.created_at)}
-                                    </span>
-                                  </div>
-                                  <p className="text-gray-800 dark:text-gray-200 text-sm break-words whitespace-pre-wrap">
-                                    {comment.content}
-                                  </p>
+                              </div>
+                              <div className="flex-grow bg-white dark:bg-gray-700 rounded-lg p-3 shadow-sm">
+                                <div className="flex items-center justify-between mb-1">
+                                  <span className="font-medium text-sm text-gray-900 dark:text-white">
+                                    {comment.author.username}
+                                  </span>
+                                  <span className="text-xs text-gray-500 dark:text-gray-400">
+                                    {formatDate(comment.created_at)}
+                                  </span>
                                 </div>
+                                <p className="text-gray-800 dark:text-gray-200 text-sm break-words whitespace-pre-wrap">
+                                  {comment.content}
+                                </p>
                               </div>
-                            ))
+                            </div>
+                          ))
                         )}
                       </div>
-                      
-                      {/* Pagination des commentaires */}
-                      {post.comments?.length > COMMENTS_PER_PAGE && (
+
+                      {/* Commentaires paginés par curseur : page suivante à la demande */}
+                      {(loadingComments[post.id] || postComments[post.id]?.next) && (
                         <div className="flex justify-center mt-4">
-                          <nav className="inline-flex rounded-md shadow-sm -space-x-px" aria-label="Pagination">
-                            <button
-                              onClick={() => handlePageChange(post.id, commentPages[post.id] - 1)}
-                              disabled={commentPages[post.id] === 1}
-                              className="relative inline-flex items-center px-2 py-1 rounded-l-md border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-sm font-medium text-gray-500 dark:text-gray-300 hover:bg-gray-50 dark:hover:bg-gray-600 disabled:opacity-50 disabled:cursor-not-allowed"
-                            >
-                              <span className="sr-only">Précédent</span>
-                              <svg className="h-4 w-4" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 20" fill="currentColor" aria-hidden="true">
-                                <path fillRule="evenodd" d="M12.707 5.293a1 1 0 010 1.414L9.414 10l3.293 3.293a1 1 0 01-1.414 1.414l-4-4a1 1 0 010-1.414l4-4a1 1 0 011.414 0z" clipRule="evenodd" />
-                              </svg>
-                            </button>
-                            <span className="relative inline-flex items-center px-3 py-1 border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-sm font-medium text-gray-700 dark:text-gray-300">
-                              {commentPages[post.id]} / {Math.ceil(post.comments.length / COMMENTS_PER_PAGE)}
-                            </span>
-                            <button
-                              onClick={() => handlePageChange(post.id, commentPages[post.id] + 1)}
-                              disabled={commentPages[post.id] >= Math.ceil(post.comments.length / COMMENTS_PER_PAGE)}
-                              className="relative inline-flex items-center px-2 py-1 rounded-r-md border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-sm font-medium text-gray-500 dark:text-gray-300 hover:bg-gray-50 dark:hover:bg-gray-600 disabled:opacity-50 disabled:cursor-not-allowed"
-                            >
-                              <span className="sr-only">Suivant</span>
-                              <svg className="h-4 w-4" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 20" fill="currentColor" aria-hidden="true">
-                                <path fillRule="evenodd" d="M7.293 14.707a1 1 0 010-1.414L10.586 10 7.293 6.707a1 1 0 011.414-1.414l4 4a1 1 0 010 1.414l-4 4a1 1 0 01-1.414 0z" clipRule="evenodd" />
-                              </svg>
-                            </button>
-                          </nav>
+                          <button
+                            onClick={() => loadComments(post.id)}
+                            disabled={loadingComments[post.id]}
+                            className="px-3 py-1 border border-gray-300 dark:border-gray-600 rounded-md bg-white dark:bg-gray-700 text-sm font-medium text-gray-500 dark:text-gray-300 hover:bg-gray-50 dark:hover:bg-gray-600 disabled:opacity-50 disabled:cursor-not-allowed"
+                          >
+                            {loadingComments[post.id] ? 'Chargement...' : 'Plus de commentaires'}
+                          </button>
                         </div>
                       )}
                     </div>
@@ -455,6 +443,18 @@ const BlogCreations = () => {
             ))}
           </div>
         )}
+
+        {nextUrl && (
+          <div className="mt-10 flex justify-center">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 border border-gray-300 dark:border-gray-600 rounded-md text-sm font-medium text-gray-700 dark:text-gray-300 bg-white dark:bg-gray-800 hover:bg-gray-50 dark:hover:bg-gray-700 disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              {loadingMore ? 'Chargement...' : "Charger plus d'articles"}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -133,7 +133,11 @@ const EditPost = () => {
       
       // On utilise le service avec le texte modifié pour inclure le prompt
       const textWithPrompt = `${promptToUse}\n\n${content}`;
-      const data = await postService.explainPost(id, textWithPrompt);
+      // Le panneau s'ouvre au premier fragment et se remplit au fil du flux
+      const data = await postService.streamExplainPost(id, textWithPrompt, (partial) => {
+        setAiSuggestion(partial);
+        setShowAiSuggestion(true);
+      });
       setAiSuggestion(data.réponse);
       setShowAiSuggestion(true);
       setShowPromptOptions(false);
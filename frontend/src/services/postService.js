@@ -1,12 +1,13 @@
-import axiosInstance from "../utils/axiosConfig";
+import axiosInstance, { apiBaseUrl } from "../utils/axiosConfig";
 
 const API_URL = "";
 
 const postService = {
-  getAllPosts: async () => {
+  // Le fil est paginé par curseur : pour la page suivante, passer l'URL `next` renvoyée par l'API
+  getAllPosts: async (nextUrl = null) => {
     try {
-      const response = await axiosInstance.get(`${API_URL}/posts/`);
-      return response.data;
+      const response = await axiosInstance.get(nextUrl || `${API_URL}/posts/`);
+      return { results: response.data.results, next: response.data.next };
     } catch (error) {
       throw error.response
         ? error.response.data
@@ -76,6 +77,20 @@ const postService = {
     }
   },
 
+  // Page de commentaires suivante : passer l'URL `next` renvoyée par l'API
+  getComments: async (postId, nextUrl = null) => {
+    try {
+      const response = await axiosInstance.get(
+        nextUrl || `${API_URL}/posts/${postId}/comments/`
+      );
+      return response.data;
+    } catch (error) {
+      throw error.response
+        ? error.response.data
+        : { error: "Erreur de connexion au serveur" };
+    }
+  },
+
   addComment: async (postId, commentData) => {
     try {
       const response = await axiosInstance.post(
@@ -115,9 +130,63 @@ const postService = {
     }
   },
 
-  explainPost: async (postId, text) => {
+  // Suggestion IA en flux (SSE) : onToken reçoit chaque fragment ; fetch car axios ne lit pas les flux
+  streamExplainPost: async (postId, text, onToken) => {
+    const user = JSON.parse(localStorage.getItem("user") || "{}");
+    let response;
     try {
-      const response = await axiosInstance.post(
+      response = await fetch(`${apiBaseUrl}/posts/${postId}/suggestions/stream/`, {
+        method: "POST",
+        credentials: "include",
+        headers: {
+          "Content-Type": "application/json",
+          Accept: "text/event-stream",
+          ...(user.token ? { Authorization: `Bearer ${user.token}` } : {}),
+        },
+        body: JSON.stringify({ text }),
+      });
+    } catch {
+      throw { error: "Erreur de connexion au serveur" };
+    }
+    if (response.status === 403) {
+      throw { error: "Fonctionnalité réservée aux administrateurs" };
+    }
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
+      throw data.error ? data : { error: "Service d'explication temporairement indisponible" };
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let result = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const blocks = buffer.split("\n\n");
+      buffer = blocks.pop();
+      for (const block of blocks) {
+        const [eventLine, dataLine] = block.split("\n");
+        const event = eventLine.replace("event: ", "");
+        const data = JSON.parse(dataLine.replace("data: ", ""));
+        if (event === "token") {
+          result += data.text;
+          onToken(result);
+        } else if (event === "error") {
+          throw data;
+        } else if (event === "done") {
+          return { réponse: result, cached: data.cached };
+        }
+      }
+    }
+    throw { error: "Flux de suggestion interrompu" };
+  },
+
+  // La réécriture est traitée en arrière-plan : on interroge le job jusqu'à la fin
+  explainPost: async (postId, text, { interval = 1500, maxAttempts = 80 } = {}) => {
+    try {
+      const { data: job } = await axiosInstance.post(
         `${API_URL}/posts/${postId}/suggestions/`,
         { text },
         {
@@ -126,8 +195,24 @@ const postService = {
           },
         }
       );
-      return response.data;
+      // Réponse déjà en cache côté serveur : pas de job à suivre
+      if (job.status === "done") {
+        return job;
+      }
+      for (let attempt = 0; attempt < maxAttempts; attempt++) {
+        const response = await axiosInstance.get(
+          `${API_URL}/posts/${postId}/suggestions/${job.id}/`
+        );
+        if (response.data.status === "done") {
+          return response.data;
+        }
+        await new Promise((resolve) => setTimeout(resolve, interval));
+      }
+      throw { error: "Le service IA a mis trop de temps à répondre" };
     } catch (error) {
+      if (!error.response && error.error) {
+        throw error;
+      }
       if (error.response?.status === 403) {
         throw { error: "Fonctionnalité réservée aux administrateurs" };
       }